@@ -0,0 +1,208 @@
+import contextvars
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+import pandas as pd
+
+from result_cache import normalize_sql
+
+
+def job_status(future: Optional[Future]) -> dict:
+    """
+    Estado de um job para a API: "missing", "pending", "ready" (com `result`) ou
+    "error" (com `error`).
+    """
+    if future is None:
+        return {"status": "missing"}
+    if not future.done():
+        return {"status": "pending"}
+    if future.exception() is not None:
+        return {"status": "error", "error": str(future.exception())}
+    return {"status": "ready", "result": future.result()}
+
+
+def dataframe_fingerprint(df: Optional[pd.DataFrame]) -> str:
+    """
+    Hash das colunas e dos valores do DataFrame: o mesmo SQL com outros dados
+    precisa de outros follow-ups e de outro resumo.
+    """
+    if df is None:
+        return ""
+
+    columns = "\n".join(str(column) for column in df.columns).encode()
+    try:
+        values = pd.util.hash_pandas_object(df, index=True).values.tobytes()
+    except TypeError:
+        # Células com listas ou dicts não têm hash no pandas
+        values = df.to_json(orient="split", date_format="iso", default_handler=str).encode()
+
+    return hashlib.sha256(columns + b"\0" + values).hexdigest()
+
+
+class BackgroundJobs:
+    """
+    Fila de gerações secundárias (follow-ups e resumos) rodando fora das threads
+    das requisições.
+
+    Cada job tem uma chave; um job com a mesma chave, em andamento ou concluído,
+    é reaproveitado em vez de submetido de novo, então o resultado fica em cache
+    até expirar (`ttl`) ou sair pelo LRU (`max_entries`). Jobs que falharam são
+    refeitos no próximo pedido. O contexto da thread que submeteu (com o trace
+    ID dos logs) vai junto com o job.
+    """
+
+    def __init__(self, workers: int = 1, max_entries: int = 512, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.submitted = 0
+        self.hits = 0
+
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vanna-background")
+
+    def submit(self, key: str, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            self._evict_expired()
+
+            job = self._jobs.get(key)
+            if job is not None and not (job[0].done() and job[0].exception() is not None):
+                self.hits += 1
+                self._jobs.move_to_end(key)
+                return job[0]
+
+            future = self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+            self._jobs[key] = (future, time.monotonic())
+            self.submitted += 1
+
+            while len(self._jobs) > self.max_entries:
+                self._jobs.popitem(last=False)
+
+            return future
+
+    def get(self, key: str) -> Optional[Future]:
+        with self._lock:
+            self._evict_expired()
+            job = self._jobs.get(key)
+            return job[0] if job is not None else None
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(not future.done() for future, _ in self._jobs.values())
+            return {
+                "submitted": self.submitted,
+                "hits": self.hits,
+                "pending": pending,
+                "size": len(self._jobs),
+            }
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [
+            key
+            for key, (future, created_at) in self._jobs.items()
+            if future.done() and now - created_at > self.ttl
+        ]
+        for key in expired:
+            del self._jobs[key]
+
+
+class BackgroundGenerationMixin:
+    """
+    Gera os follow-ups e o resumo de uma resposta em segundo plano, com o
+    resultado em cache por pergunta, SQL e dados (`dataframe_fingerprint`): a
+    mesma pergunta com o mesmo SQL e o mesmo resultado não gera de novo.
+
+    `prefetch_secondary()` é chamado assim que o SQL roda, para as gerações
+    começarem enquanto o usuário lê o resultado; `followup_questions_job()` e
+    `summary_job()` devolvem o `Future` de cada uma. As chamadas ao Ollama
+    continuam com prioridade baixa no agendador.
+
+    Config:
+        - background_generation: Liga ou desliga a fila. Sem ela, os jobs rodam na
+          thread de quem pede. Padrão: True.
+        - background_workers: Threads da fila. Padrão: 1.
+        - background_cache_max_entries: Máximo de resultados em cache. Padrão: 512.
+        - background_cache_ttl: Tempo de vida de um resultado, em segundos. Padrão: 3600.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.background_jobs = None
+        if config.get("background_generation", True):
+            self.background_jobs = BackgroundJobs(
+                workers=config.get("background_workers", 1),
+                max_entries=config.get("background_cache_max_entries", 512),
+                ttl=config.get("background_cache_ttl", 3600),
+            )
+
+    def prefetch_secondary(
+        self, question: str, sql: str, df: pd.DataFrame, followup_questions: bool = True, summary: bool = True
+    ):
+        """
+        Example:
+        ```python
+        df = vn.run_sql(sql)
+        vn.prefetch_secondary(question, sql, df)
+        ```
+
+        Põe na fila os follow-ups e o resumo da resposta, se ainda não estão em
+        cache.
+
+        Args:
+            followup_questions (bool): Gera os follow-ups.
+            summary (bool): Gera o resumo.
+        """
+        if self.background_jobs is None:
+            return
+
+        if followup_questions:
+            self.followup_questions_job(question, sql, df)
+        if summary:
+            self.summary_job(question, sql, df)
+
+    def followup_questions_job(self, question: str, sql: str, df: pd.DataFrame) -> Future:
+        return self._background_job(
+            "followup_questions",
+            question,
+            sql,
+            df,
+            lambda: self.generate_followup_questions(question=question, sql=sql, df=df),
+        )
+
+    def summary_job(self, question: str, sql: str, df: pd.DataFrame) -> Future:
+        return self._background_job(
+            "summary", question, sql, df, lambda: self.generate_summary(question=question, df=df)
+        )
+
+    def get_background_job(self, kind: str, question: str, sql: str, df: pd.DataFrame) -> Optional[Future]:
+        # Só consulta, sem submeter: para a rota de polling
+        if self.background_jobs is None:
+            return None
+        return self.background_jobs.get(self._background_key(kind, question, sql, df))
+
+    def _background_job(self, kind: str, question: str, sql: str, df: pd.DataFrame, fn: Callable) -> Future:
+        if self.background_jobs is not None:
+            return self.background_jobs.submit(self._background_key(kind, question, sql, df), fn)
+
+        future = Future()
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    @staticmethod
+    def _background_key(kind: str, question: str, sql: str, df: pd.DataFrame) -> str:
+        return hashlib.sha256(
+            f"{kind}\n{question}\n{normalize_sql(sql or '')}\n{dataframe_fingerprint(df)}".encode()
+        ).hexdigest()
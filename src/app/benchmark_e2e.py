@@ -0,0 +1,387 @@
+import argparse
+import hashlib
+import json
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from qdrant_client import QdrantClient
+from vanna.exceptions import DependencyError
+
+import corpus
+from my_vanna import MyVanna
+
+STAGES = ["embed", "retrieve", "prompt", "llm", "sql", "chart", "total"]
+
+MODEL = "llama2:7b"
+
+PLOTLY_CODE = "fig = px.bar(df, x=df.columns[0], y=df.columns[-1])"
+
+# Esquema do corpus com as colunas usadas pelas perguntas de treino, em SQL que
+# roda tanto no PostgreSQL quanto no DuckDB
+SEED_SQL = """
+CREATE TABLE vendedor (
+    id_vendedor INTEGER PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    email VARCHAR(100) NOT NULL,
+    data_contratacao DATE NOT NULL,
+    status BOOLEAN DEFAULT true
+);
+CREATE TABLE clientes (
+    id_cliente INTEGER PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    email VARCHAR(100) NOT NULL,
+    telefone VARCHAR(20),
+    data_cadastro DATE NOT NULL,
+    id_vendedor INTEGER REFERENCES vendedor(id_vendedor),
+    idade INTEGER,
+    regiao VARCHAR(20)
+);
+CREATE TABLE produtos (
+    id_produto INTEGER PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    descricao TEXT,
+    preco_unitario DECIMAL(10,2) NOT NULL,
+    estoque INTEGER NOT NULL,
+    data_cadastro DATE NOT NULL,
+    categoria VARCHAR(50)
+);
+CREATE TABLE compras (
+    id_compra INTEGER PRIMARY KEY,
+    id_cliente INTEGER REFERENCES clientes(id_cliente),
+    id_produto INTEGER REFERENCES produtos(id_produto),
+    id_vendedor INTEGER REFERENCES vendedor(id_vendedor),
+    quantidade INTEGER NOT NULL,
+    valor_total DECIMAL(10,2) NOT NULL,
+    data_compra TIMESTAMP NOT NULL,
+    status VARCHAR(20),
+    metodo_pagamento VARCHAR(20)
+);
+INSERT INTO vendedor
+SELECT i, 'Vendedor ' || CAST(i AS VARCHAR), 'vendedor' || CAST(i AS VARCHAR) || '@empresa.com',
+       CAST(DATE '2020-01-01' + i * INTERVAL '30 days' AS DATE), i % 10 <> 0
+FROM generate_series(1, 20) AS t(i);
+INSERT INTO clientes
+SELECT i, 'Cliente ' || CAST(i AS VARCHAR), 'cliente' || CAST(i AS VARCHAR) || '@email.com', NULL,
+       CAST(DATE '2021-01-01' + (i % 700) * INTERVAL '1 day' AS DATE), 1 + i % 20, 18 + i % 60,
+       CASE i % 4 WHEN 0 THEN 'Norte' WHEN 1 THEN 'Sul' WHEN 2 THEN 'Leste' ELSE 'Oeste' END
+FROM generate_series(1, {clientes}) AS t(i);
+INSERT INTO produtos
+SELECT i, 'Produto ' || CAST(i AS VARCHAR), NULL, 10 + i, i % 50, DATE '2021-01-01',
+       CASE i % 3 WHEN 0 THEN 'Eletrônicos' WHEN 1 THEN 'Livros' ELSE 'Casa' END
+FROM generate_series(1, 100) AS t(i);
+INSERT INTO compras
+SELECT i, 1 + i % {clientes}, 1 + i % 100, 1 + i % 20, 1 + i % 5, 10 + i % 997,
+       TIMESTAMP '2023-01-01' + i * INTERVAL '7 minutes',
+       CASE i % 3 WHEN 0 THEN 'pago' WHEN 1 THEN 'cancelado' ELSE 'pendente' END,
+       CASE i % 3 WHEN 0 THEN 'pix' WHEN 1 THEN 'cartao' ELSE 'boleto' END
+FROM generate_series(1, {compras}) AS t(i);
+"""
+
+
+class HashEmbedding:
+    """
+    Embedding determinístico (bag of words com hash) para rodar sem baixar o
+    modelo do fastembed. Mede o pipeline, não a qualidade da busca.
+    """
+
+    dimension = 384
+
+    def embed(self, documents, batch_size: int = 256, **kwargs):
+        if isinstance(documents, str):
+            documents = [documents]
+
+        for document in documents:
+            vector = np.zeros(self.dimension, dtype=np.float32)
+            for word in document.lower().split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimension] += 1
+            yield vector / (np.linalg.norm(vector) or 1)
+
+
+class HashEmbeddingQdrantClient(QdrantClient):
+    def _get_or_init_model(self, model_name: str, **kwargs):
+        return HashEmbedding()
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Servidor HTTP com a API de chat do Ollama. Responde o SQL do corpus quando a
+    pergunta é do corpus e um código plotly simples quando o prompt pede gráfico,
+    simulando a latência de prefill (por token do prompt) e de geração (por token
+    da resposta).
+    """
+
+    prefill_ms = 0.5
+    token_ms = 5.0
+    answers = {pair["question"]: pair["sql"] for pair in corpus.QUESTION_SQL}
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._send_json({"models": [{"model": MODEL, "name": MODEL}]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        messages = body.get("messages", [])
+        question = messages[-1]["content"] if messages else ""
+
+        if "plotly" in question:
+            answer = f"```python\n{PLOTLY_CODE}\n```"
+        else:
+            answer = f"```sql\n{self.answers.get(question, 'SELECT 1')}\n```"
+
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        # Aproximação de 4 caracteres por token na resposta
+        tokens = [answer[i : i + 4] for i in range(0, len(answer), 4)]
+        time.sleep(prompt_tokens * self.prefill_ms / 1000)
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for token in tokens:
+                time.sleep(self.token_ms / 1000)
+                self._write_chunk({"model": MODEL, "message": {"role": "assistant", "content": token}, "done": False})
+            self._write_chunk(
+                {
+                    "model": MODEL,
+                    "message": {"role": "assistant", "content": ""},
+                    "done": True,
+                    "prompt_eval_count": prompt_tokens,
+                    "eval_count": len(tokens),
+                }
+            )
+            return
+
+        time.sleep(len(tokens) * self.token_ms / 1000)
+        self._send_json(
+            {
+                "model": MODEL,
+                "created_at": datetime.now().isoformat(),
+                "message": {"role": "assistant", "content": answer},
+                "done": True,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": len(tokens),
+            }
+        )
+
+    def _send_json(self, data: dict):
+        payload = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _write_chunk(self, data: dict):
+        self.wfile.write((json.dumps(data) + "\n").encode())
+        self.wfile.flush()
+
+
+def start_stub_ollama(prefill_ms: float, token_ms: float) -> ThreadingHTTPServer:
+    StubOllamaHandler.prefill_ms = prefill_ms
+    StubOllamaHandler.token_ms = token_ms
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@contextmanager
+def stage(timings: dict, name: str):
+    start = time.perf_counter()
+    yield
+    timings[name] = (time.perf_counter() - start) * 1000
+
+
+def ask(vn, question: str, timings: dict):
+    with stage(timings, "embed"):
+        embedding = vn.generate_embedding(question)
+
+    with stage(timings, "retrieve"):
+        context = vn.get_related_context(question, embedding=embedding)
+
+    with stage(timings, "prompt"):
+        prompt = vn.get_sql_prompt(
+            initial_prompt=vn.config.get("initial_prompt", None),
+            question=question,
+            question_sql_list=list(context.question_sql_list),
+            ddl_list=list(context.ddl_list),
+            doc_list=list(context.doc_list),
+            related_context=context,
+        )
+
+    with stage(timings, "llm"):
+        sql = vn.extract_sql(vn.submit_prompt(prompt))
+
+    with stage(timings, "sql"):
+        df = vn.run_sql(sql)
+
+    with stage(timings, "chart"):
+        plotly_code = vn.generate_plotly_code(
+            question=question, sql=sql, df_metadata=f"Running df.dtypes gives:\n {df.dtypes}", df=df
+        )
+        vn.get_plotly_figure(plotly_code=plotly_code, df=df)
+
+    timings["total"] = sum(timings.values())
+
+
+def summarize(samples: list) -> dict:
+    if len(samples) < 2:
+        return {"n": len(samples)}
+
+    percentiles = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.mean(samples),
+        "p50_ms": percentiles[49],
+        "p95_ms": percentiles[94],
+        "p99_ms": percentiles[98],
+    }
+
+
+def report(results: dict, baseline: dict = None):
+    for name in STAGES:
+        summary = results["stages"][name]
+        if "p50_ms" not in summary:
+            print(f"{name:<9} sem amostras suficientes ({summary['n']})")
+            continue
+
+        line = (
+            f"{name:<9} p50 {summary['p50_ms']:9.2f} ms | p95 {summary['p95_ms']:9.2f} ms | "
+            f"p99 {summary['p99_ms']:9.2f} ms"
+        )
+
+        previous = (baseline or {}).get("stages", {}).get(name, {})
+        if "p50_ms" in previous:
+            line += (
+                f" | p50 {summary['p50_ms'] - previous['p50_ms']:+9.2f} ms"
+                f" p95 {summary['p95_ms'] - previous['p95_ms']:+9.2f} ms vs baseline"
+            )
+        print(line)
+
+    for name, count in results["errors"].items():
+        print(f"Erros em {name}: {count}")
+
+
+def connect_database(vn, args):
+    if args.duckdb:
+        try:
+            import duckdb  # noqa: F401
+        except ImportError:
+            raise DependencyError(
+                "You need to install required dependencies to execute this method, run command:"
+                " \npip install duckdb"
+            )
+
+        vn.connect_to_duckdb(
+            url=":memory:", init_sql=SEED_SQL.format(clientes=args.clientes, compras=args.compras)
+        )
+        return
+
+    vn.connect_to_postgres(
+        host=args.pg_host, dbname=args.pg_dbname, user=args.pg_user, password=args.pg_password, port=args.pg_port
+    )
+
+    if args.seed:
+        # run_sql sempre desfaz a transação, então o seed usa a conexão do pool direto
+        with vn.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(SEED_SQL.format(clientes=args.clientes, compras=args.compras))
+                cs.execute("ANALYZE vendedor, clientes, produtos, compras")
+            conn.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede a latência de ponta a ponta do MyVanna por etapa, sem depender de rede"
+    )
+    parser.add_argument("--rounds", type=int, default=3, help="Quantas vezes repetir as perguntas do corpus")
+    parser.add_argument("--warmup", type=int, default=1, help="Rodadas iniciais descartadas")
+    parser.add_argument("--prefill-ms", type=float, default=0.5, help="Latência do Ollama por token do prompt")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="Latência do Ollama por token gerado")
+    parser.add_argument(
+        "--hash-embeddings",
+        action="store_true",
+        help="Usa embeddings por hash em vez do modelo do fastembed (que precisa estar baixado)",
+    )
+    parser.add_argument(
+        "--with-caches",
+        action="store_true",
+        help="Mantém ligados os caches de embedding, SQL, resultado e código plotly",
+    )
+    parser.add_argument("--duckdb", action="store_true", help="Usa um DuckDB em memória no lugar do PostgreSQL")
+    parser.add_argument("--seed", action="store_true", help="Cria e popula as tabelas no PostgreSQL")
+    parser.add_argument("--clientes", type=int, default=2000, help="Clientes gerados pelo seed")
+    parser.add_argument("--compras", type=int, default=200000, help="Compras geradas pelo seed")
+    parser.add_argument("--pg-host", default=None)
+    parser.add_argument("--pg-dbname", default=None)
+    parser.add_argument("--pg-user", default=None)
+    parser.add_argument("--pg-password", default=None)
+    parser.add_argument("--pg-port", default=None)
+    parser.add_argument("--output", default="benchmark_e2e.json", help="Arquivo JSON com o resultado")
+    parser.add_argument("--baseline", default=None, help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    server = start_stub_ollama(args.prefill_ms, args.token_ms)
+
+    client_class = HashEmbeddingQdrantClient if args.hash_embeddings else QdrantClient
+    config = {
+        "client": client_class(":memory:"),
+        "ollama_host": f"http://127.0.0.1:{server.server_port}",
+    }
+    if not args.with_caches:
+        config.update({"embedding_cache": False, "sql_cache": False, "result_cache": False, "plotly_cache": False})
+
+    vn = MyVanna(config=config)
+    vn.log = lambda message, title="Info": None
+
+    connect_database(vn, args)
+    vn.bulk_train(question_sql=corpus.QUESTION_SQL, ddl=corpus.DDL, documentation=corpus.DOCUMENTATION)
+
+    questions = [pair["question"] for pair in corpus.QUESTION_SQL]
+    samples = {name: [] for name in STAGES}
+    errors = {}
+
+    for round_number in range(args.warmup + args.rounds):
+        for question in questions:
+            timings = {}
+            try:
+                ask(vn, question, timings)
+            except Exception:
+                if round_number >= args.warmup:
+                    # A etapa que falhou é a primeira sem tempo registrado
+                    failed = next(name for name in STAGES if name not in timings)
+                    errors[failed] = errors.get(failed, 0) + 1
+                continue
+
+            if round_number >= args.warmup:
+                for name, value in timings.items():
+                    samples[name].append(value)
+
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "args": vars(args),
+        "questions": len(questions),
+        "stages": {name: summarize(values) for name, values in samples.items()},
+        "errors": errors,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report(results, baseline)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Resultado salvo em {args.output}")
+
+    vn.close()
+    server.shutdown()
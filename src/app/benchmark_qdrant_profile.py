@@ -0,0 +1,144 @@
+import argparse
+import json
+import re
+import statistics
+import time
+import urllib.request
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from collection_profile import PROFILES, create_collection, resolve_profile, search_params
+
+
+def make_vectors(points: int, queries: int, dimension: int, seed: int = 42):
+    # Vetores agrupados em torno de centros, mais parecidos com embeddings reais
+    # do que vetores uniformes (que são o pior caso para HNSW e quantização)
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(64, dimension))
+
+    def sample(n):
+        vectors = centers[rng.integers(0, len(centers), n)] + rng.normal(scale=0.6, size=(n, dimension))
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+    return sample(points), sample(queries)
+
+
+def exact_neighbors(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    neighbors = []
+    for i in range(0, len(queries), 256):
+        scores = queries[i : i + 256] @ vectors.T
+        neighbors.extend(np.argsort(-scores, axis=1)[:, :k].tolist())
+    return neighbors
+
+
+def qdrant_resident_memory(url: str):
+    # memory_resident_bytes do endpoint /metrics do Qdrant (processo inteiro)
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/metrics", timeout=5) as response:
+            match = re.search(r"^memory_resident_bytes (\S+)$", response.read().decode(), re.MULTILINE)
+            return float(match.group(1)) if match else None
+    except Exception:
+        return None
+
+
+def estimated_ram(profile: dict, points: int, dimension: int) -> float:
+    # Estimativa em bytes: vetores originais (se em RAM), cópia quantizada e grafo HNSW
+    ram = 0 if profile.get("on_disk") else points * dimension * 4
+    if profile.get("quantization") == "scalar":
+        ram += points * dimension
+    elif profile.get("quantization") == "binary":
+        ram += points * dimension / 8
+    ram += points * profile.get("hnsw_m", 16) * 2 * 4
+    return ram
+
+
+def wait_indexed(client: QdrantClient, collection_name: str, timeout: float = 600):
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        info = client.get_collection(collection_name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+    raise TimeoutError(f"Collection {collection_name} não terminou de indexar em {timeout}s")
+
+
+def run_profile(client, url, name, vectors, queries, truth, k) -> dict:
+    profile = resolve_profile(name)
+    collection_name = f"benchmark_profile_{name}"
+
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+
+    memory_before = qdrant_resident_memory(url)
+
+    create_collection(
+        client, collection_name, size=vectors.shape[1], distance=models.Distance.COSINE, profile=profile
+    )
+    start = time.perf_counter()
+    client.upload_collection(collection_name, vectors=vectors, ids=range(len(vectors)), batch_size=256, wait=True)
+    wait_indexed(client, collection_name)
+    index_seconds = time.perf_counter() - start
+
+    memory_after = qdrant_resident_memory(url)
+
+    params = search_params(profile)
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        points = client.query_points(collection_name, query=query, limit=k, search_params=params).points
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len({point.id for point in points} & set(expected)) / k)
+
+    client.delete_collection(collection_name)
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "profile": name,
+        "index_seconds": index_seconds,
+        "estimated_ram_mb": estimated_ram(profile, len(vectors), vectors.shape[1]) / 2**20,
+        "resident_delta_mb": (
+            (memory_after - memory_before) / 2**20
+            if memory_before is not None and memory_after is not None
+            else None
+        ),
+        "p50_ms": percentiles[49],
+        "p95_ms": percentiles[94],
+        f"recall_at_{k}": statistics.mean(recalls),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compara memória, latência de busca e recall@k dos perfis de collection do Qdrant"
+    )
+    parser.add_argument("--url", default="http://localhost:6333", help="Qdrant a usar (precisa ser o servidor)")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="Perfis separados por vírgula")
+    parser.add_argument("--points", type=int, default=100000, help="Vetores por collection")
+    parser.add_argument("--queries", type=int, default=500, help="Buscas por perfil")
+    parser.add_argument("--dimension", type=int, default=384, help="Dimensão (384 = bge-small)")
+    parser.add_argument("--k", type=int, default=10, help="Vizinhos por busca")
+    parser.add_argument("--output", default=None, help="Salva o resultado em JSON")
+    args = parser.parse_args()
+
+    client = QdrantClient(location=args.url, timeout=600)
+
+    vectors, queries = make_vectors(args.points, args.queries, args.dimension)
+    truth = exact_neighbors(vectors, queries, args.k)
+
+    results = []
+    for name in args.profiles.split(","):
+        result = run_profile(client, args.url, name, vectors, queries, truth, args.k)
+        results.append(result)
+
+        resident = result["resident_delta_mb"]
+        print(
+            f"{name:<8} RAM estimada {result['estimated_ram_mb']:8.1f} MB | "
+            f"RSS do Qdrant {'n/d' if resident is None else f'{resident:+8.1f} MB'} | "
+            f"p50 {result['p50_ms']:6.2f} ms | p95 {result['p95_ms']:6.2f} ms | "
+            f"recall@{args.k} {result[f'recall_at_{args.k}']:.3f} | indexação {result['index_seconds']:.1f}s"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
@@ -0,0 +1,54 @@
+import argparse
+import statistics
+import time
+
+import corpus
+from my_vanna import MyVanna
+
+
+def serial_retrieval(vn, question):
+    # Caminho original do Qdrant_VectorStore: três buscas, uma depois da outra
+    vn.get_similar_question_sql(question)
+    vn.get_related_ddl(question)
+    vn.get_related_documentation(question)
+
+
+def concurrent_retrieval(vn, question):
+    vn.get_related_context(question)
+
+
+def measure(fn, vn, questions, rounds):
+    timings = []
+    for _ in range(rounds):
+        for question in questions:
+            start = time.perf_counter()
+            fn(vn, question)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{name:<12} média {statistics.mean(timings):7.2f} ms | "
+        f"p50 {statistics.median(timings):7.2f} ms | p95 {p95:7.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compara a busca de contexto serial com a busca concorrente"
+    )
+    parser.add_argument("--rounds", type=int, default=5, help="Quantas vezes repetir o corpus")
+    args = parser.parse_args()
+
+    vn = MyVanna()
+    questions = [pair["question"] for pair in corpus.QUESTION_SQL]
+
+    # Aquece o modelo de embedding e o cache, para medir apenas a busca
+    for question in questions:
+        vn.generate_embedding(question)
+
+    report("serial", measure(serial_retrieval, vn, questions, args.rounds))
+    report("concorrente", measure(concurrent_retrieval, vn, questions, args.rounds))
@@ -0,0 +1,149 @@
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import pandas as pd
+
+import corpus
+from benchmark_e2e import SEED_SQL
+from postgres import PostgresPoolMixin
+from result_cache import ResultCacheMixin
+from rollups import RollupMixin
+
+
+class RollupBenchmark(RollupMixin, ResultCacheMixin, PostgresPoolMixin):
+    # Só a parte do MyVanna que executa SQL, sem Qdrant nem Ollama
+    def __init__(self, config=None):
+        RollupMixin.__init__(self, config=config)
+        ResultCacheMixin.__init__(self, config=config)
+        PostgresPoolMixin.__init__(self, config=config)
+
+    def log(self, message: str, title: str = "Info"):
+        pass
+
+
+def time_query(vn: RollupBenchmark, sql: str, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = vn.run_sql(sql)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), df
+
+
+def same_result(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    # A ordem das linhas só é garantida com ORDER BY, e os decimais podem diferir no arredondamento
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        return False
+
+    def canonical(df):
+        df = df.map(lambda value: round(float(value), 6) if isinstance(value, (Decimal, float)) else value)
+        return df.astype(str).sort_values(list(df.columns)).reset_index(drop=True)
+
+    return canonical(a).equals(canonical(b))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compara a latência das consultas de agregação do corpus em compras e nos rollups"
+    )
+    parser.add_argument("--seed", action="store_true", help="Cria e popula as tabelas no PostgreSQL")
+    parser.add_argument("--clientes", type=int, default=2000, help="Clientes gerados pelo seed")
+    parser.add_argument("--compras", type=int, default=2000000, help="Compras geradas pelo seed")
+    parser.add_argument("--repeat", type=int, default=5, help="Execuções de cada consulta (vale a mediana)")
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=0.1,
+        help="Máximo de linhas estimadas do rollup em relação à tabela compras",
+    )
+    parser.add_argument("--max-rollups", type=int, default=5, help="Máximo de rollups criados")
+    parser.add_argument("--pg-host", default=None)
+    parser.add_argument("--pg-dbname", default=None)
+    parser.add_argument("--pg-user", default=None)
+    parser.add_argument("--pg-password", default=None)
+    parser.add_argument("--pg-port", default=None)
+    parser.add_argument("--output", default="benchmark_rollups.json", help="Arquivo JSON com o resultado")
+    args = parser.parse_args()
+
+    vn = RollupBenchmark(config={"result_cache": False, "rollups": True})
+    vn.connect_to_postgres(
+        host=args.pg_host, dbname=args.pg_dbname, user=args.pg_user, password=args.pg_password, port=args.pg_port
+    )
+
+    if args.seed:
+        with vn.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(SEED_SQL.format(clientes=args.clientes, compras=args.compras))
+                cs.execute("ANALYZE vendedor, clientes, produtos, compras")
+            conn.commit()
+
+    sqls = [pair["sql"] for pair in corpus.QUESTION_SQL]
+
+    start = time.perf_counter()
+    advice = vn.advise_rollups(sqls, max_ratio=args.max_ratio, max_rollups=args.max_rollups)
+    for rollup in advice:
+        vn.create_rollup(rollup["dims"])
+    build_seconds = time.perf_counter() - start
+
+    print(f"{len(advice)} rollups criados em {build_seconds:.2f}s:")
+    for rollup in advice:
+        print(f"  {rollup['name']}: {rollup['queries']} consultas, ~{rollup['estimated_rows']:,} linhas")
+
+    queries = []
+    for pair in corpus.QUESTION_SQL:
+        if vn.rewrite_with_rollup(pair["sql"]) is None:
+            continue
+
+        vn.rollups = False
+        try:
+            base_seconds, base_df = time_query(vn, pair["sql"], args.repeat)
+        except Exception as e:
+            print(f"  ignorada ({e.__class__.__name__}): {pair['question']}")
+            continue
+
+        vn.rollups = True
+        rollup_seconds, rollup_df = time_query(vn, pair["sql"], args.repeat)
+
+        queries.append(
+            {
+                "question": pair["question"],
+                "compras_ms": base_seconds * 1000,
+                "rollup_ms": rollup_seconds * 1000,
+                "speedup": base_seconds / rollup_seconds,
+                "same_result": same_result(base_df, rollup_df),
+            }
+        )
+
+    print(f"\n{'compras':>10} {'rollup':>10} {'ganho':>8}  pergunta")
+    for query in queries:
+        print(
+            f"{query['compras_ms']:>8.1f}ms {query['rollup_ms']:>8.1f}ms {query['speedup']:>7.1f}x  "
+            f"{query['question']}" + ("" if query["same_result"] else "  (RESULTADO DIFERENTE)")
+        )
+
+    if queries:
+        print(
+            f"\n{len(queries)} consultas reescritas, ganho mediano de "
+            f"{statistics.median(query['speedup'] for query in queries):.1f}x; "
+            f"{sum(not query['same_result'] for query in queries)} com resultado diferente"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "created_at": datetime.now().isoformat(),
+                "args": vars(args),
+                "build_seconds": build_seconds,
+                "rollups": advice,
+                "queries": queries,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Resultado salvo em {args.output}")
+
+    vn.close()
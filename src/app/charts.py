@@ -0,0 +1,301 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Acima disso, barras e linhas por categoria ficam ilegíveis e o LLM decide o gráfico
+MAX_CATEGORIES = 50
+MAX_SERIES = 10
+MAX_INDICATORS = 4
+# Colunas inteiras com poucos valores (hora, dia da semana, mês...) são eixos ordinais
+MAX_ORDINAL_VALUES = 31
+
+
+def column_kind(series: pd.Series) -> str:
+    """
+    Classifica uma coluna do resultado em "temporal", "numeric", "category" ou
+    "other". O psycopg2 devolve DATE e NUMERIC como objetos (`date`, `Decimal`),
+    então colunas `object` são classificadas pelos valores.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "temporal"
+    if pd.api.types.is_bool_dtype(series):
+        return "category"
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+
+    values = series.dropna()
+    if values.empty:
+        return "other"
+    if all(isinstance(value, date) for value in values):
+        return "temporal"
+    if all(isinstance(value, (Decimal, int, float)) and not isinstance(value, bool) for value in values):
+        return "numeric"
+    if all(isinstance(value, str) for value in values):
+        return "category"
+    return "other"
+
+
+def chart_template(df: pd.DataFrame) -> Optional[tuple]:
+    """
+    Código plotly determinístico para os formatos de resultado mais comuns, sem
+    passar pelo LLM:
+
+        - indicator: uma linha com até `MAX_INDICATORS` valores numéricos.
+        - time_series: uma coluna de data e uma ou mais numéricas.
+        - time_series_by_category: data, categoria (até `MAX_SERIES`) e um número.
+        - category_bar: uma linha por categoria (até `MAX_CATEGORIES`) e uma ou
+          mais colunas numéricas.
+        - ordinal_bar: uma coluna inteira com poucos valores distintos (hora, dia
+          da semana, mês...), um por linha, e outras numéricas.
+
+    Returns:
+        tuple: O nome do formato e o código, ou None se o resultado não tem um
+        formato conhecido.
+    """
+    if df.empty:
+        return None
+
+    kinds = {column: column_kind(df[column]) for column in df.columns}
+    if len(set(df.columns)) != len(df.columns) or "other" in kinds.values():
+        return None
+
+    temporal = [column for column, kind in kinds.items() if kind == "temporal"]
+    numeric = [column for column, kind in kinds.items() if kind == "numeric"]
+    category = [column for column, kind in kinds.items() if kind == "category"]
+
+    # Decimal vira float para o plotly tratar a coluna como contínua
+    decimals = {column: "float" for column in numeric if df[column].dtype == object}
+    prelude = f"df = df.astype({decimals!r})\n" if decimals else ""
+
+    y = numeric[0] if len(numeric) == 1 else numeric
+
+    if len(df) == 1 and len(numeric) == len(df.columns) <= MAX_INDICATORS:
+        return (
+            "indicator",
+            "fig = go.Figure()\n"
+            "for i, column in enumerate(df.columns):\n"
+            "    fig.add_trace(go.Indicator(mode='number', value=float(df[column].iloc[0]), title={'text': column},"
+            " domain={'row': 0, 'column': i}))\n"
+            "fig.update_layout(grid={'rows': 1, 'columns': len(df.columns)})",
+        )
+
+    if len(df) < 2 or not numeric:
+        return None
+
+    if len(temporal) == 1 and not category:
+        x = temporal[0]
+        return "time_series", f"{prelude}fig = px.line(df.sort_values({x!r}), x={x!r}, y={y!r}, markers=True)"
+
+    if len(temporal) == 1 and len(category) == 1 and len(numeric) == 1:
+        x, color = temporal[0], category[0]
+        if df[color].nunique() > MAX_SERIES:
+            return None
+        return (
+            "time_series_by_category",
+            f"{prelude}fig = px.line(df.sort_values({x!r}), x={x!r}, y={y!r}, color={color!r}, markers=True)",
+        )
+
+    if not temporal and len(category) == 1:
+        x = category[0]
+        if len(df) > MAX_CATEGORIES or df[x].nunique() != len(df):
+            return None
+        return "category_bar", f"{prelude}fig = px.bar(df, x={x!r}, y={y!r}, barmode='group')"
+
+    if not temporal and not category and len(numeric) >= 2:
+        x = numeric[0]
+        values = df[x].dropna().astype(float)
+        if (
+            len(values) != len(df)
+            or len(df) > MAX_ORDINAL_VALUES
+            or values.nunique() != len(df)
+            or not np.all(np.mod(values, 1) == 0)
+        ):
+            return None
+        y = numeric[1] if len(numeric) == 2 else numeric[1:]
+        return (
+            "ordinal_bar",
+            f"{prelude}fig = px.bar(df.sort_values({x!r}), x={x!r}, y={y!r}, barmode='group')\n"
+            "fig.update_xaxes(type='category')",
+        )
+
+    return None
+
+
+class PlotlyCodeCache:
+    """
+    Cache do código plotly gerado pelo LLM, indexado pelo schema do resultado
+    (nomes e tipos das colunas) e pelo embedding da pergunta.
+
+    Uma pergunta reaproveita o código de outra com o mesmo schema quando a
+    similaridade de cosseno entre as perguntas é maior ou igual ao `threshold`:
+    o código só referencia as colunas, então serve para qualquer resultado com
+    elas. As entradas expiram após `ttl` segundos e, ao atingir `max_entries`, a
+    menos usada recentemente é descartada.
+    """
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 256, ttl: float = 86400):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def get(self, schema: str, embedding: List[float]) -> Optional[str]:
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            self._evict_expired()
+
+            best_key, best_score = None, -1.0
+            for key, (cached_schema, cached_vector, _, _) in self._entries.items():
+                if cached_schema != schema:
+                    continue
+                score = float(np.dot(vector, cached_vector))
+                if score > best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key][2]
+
+    def set(self, schema: str, embedding: List[float], code: str):
+        with self._lock:
+            self._entries[self._next_key] = (schema, self._normalize(embedding), code, time.monotonic())
+            self._next_key += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [key for key, (_, _, _, created_at) in self._entries.items() if now - created_at > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class ChartMixin:
+    """
+    Evita a chamada ao Ollama em `generate_plotly_code` sempre que possível.
+
+    Se o DataFrame do resultado é passado em `df`, o formato dele (tipos,
+    cardinalidade, colunas de data) é classificado e os formatos comuns (valor
+    único, série temporal, barras por categoria...) recebem o código de um
+    template, sem LLM. Nos demais, o código gerado pelo LLM fica no
+    `PlotlyCodeCache`, indexado pelo schema do resultado (`df_metadata`) e pela
+    pergunta.
+
+    Config:
+        - chart_templates: Liga ou desliga os templates. Padrão: True.
+        - plotly_cache: Liga ou desliga o cache do código do LLM. Padrão: True.
+        - plotly_cache_threshold: Similaridade mínima entre as perguntas para
+          reaproveitar o código. Padrão: 0.9.
+        - plotly_cache_max_entries: Máximo de códigos em cache. Padrão: 256.
+        - plotly_cache_ttl: Tempo de vida de uma entrada, em segundos. Padrão: 86400.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.chart_templates = config.get("chart_templates", True)
+        self.plotly_cache = None
+        if config.get("plotly_cache", True):
+            self.plotly_cache = PlotlyCodeCache(
+                threshold=config.get("plotly_cache_threshold", 0.9),
+                max_entries=config.get("plotly_cache_max_entries", 256),
+                ttl=config.get("plotly_cache_ttl", 86400),
+            )
+
+        self._chart_counts = {}
+        self._chart_lock = threading.Lock()
+
+    def generate_plotly_code(
+        self, question: str = None, sql: str = None, df_metadata: str = None, df: pd.DataFrame = None, **kwargs
+    ) -> str:
+        """
+        Example:
+        ```python
+        vn.generate_plotly_code(question=question, sql=sql, df_metadata=f"{df.dtypes}", df=df)
+        ```
+
+        Gera o código plotly para o resultado, por template, pelo cache ou pelo LLM.
+
+        Args:
+            df (pd.DataFrame): O resultado. Sem ele, os templates não são usados.
+
+        Returns:
+            str: O código plotly.
+        """
+        if self.chart_templates and df is not None:
+            template = chart_template(df)
+            if template is not None:
+                shape, code = template
+                self._count_chart(shape)
+                self.log(title="Gráficos", message=f"Template {shape} para: {question}")
+                return code
+
+        if self.plotly_cache is None or question is None or df_metadata is None:
+            self._count_chart("llm")
+            return super().generate_plotly_code(question=question, sql=sql, df_metadata=df_metadata, **kwargs)
+
+        embedding = self.generate_embedding(question)
+        code = self.plotly_cache.get(df_metadata, embedding)
+        if code is not None:
+            self._count_chart("cache")
+            self.log(title="Gráficos", message=f"Código em cache para: {question}")
+            return code
+
+        self._count_chart("llm")
+        code = super().generate_plotly_code(question=question, sql=sql, df_metadata=df_metadata, **kwargs)
+        if code:
+            self.plotly_cache.set(df_metadata, embedding, code)
+
+        return code
+
+    def chart_stats(self) -> dict:
+        with self._chart_lock:
+            counts = dict(self._chart_counts)
+
+        total = sum(counts.values())
+        return {
+            "charts": counts,
+            "llm_rate": counts.get("llm", 0) / total if total else 0.0,
+            "plotly_cache": self.plotly_cache.stats() if self.plotly_cache is not None else None,
+        }
+
+    def _count_chart(self, source: str):
+        with self._chart_lock:
+            self._chart_counts[source] = self._chart_counts.get(source, 0) + 1
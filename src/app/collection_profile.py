@@ -0,0 +1,226 @@
+from pydantic import BaseModel
+from qdrant_client import models
+from qdrant_client.local.qdrant_local import QdrantLocal
+from vanna.exceptions import ImproperlyConfigured
+
+# Perfis prontos para as collections do MyVanna. "default" são as configurações
+# padrão do Qdrant (o comportamento do Qdrant_VectorStore), explícitas para que
+# uma collection migrada para outro perfil volte a elas.
+PROFILES = {
+    "default": {
+        "quantization": None,
+        "on_disk": False,
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+    },
+    # Vetores originais em disco e uma cópia int8 em RAM (4x menor), com rescore
+    # nos originais para recuperar a precisão
+    "memory": {
+        "quantization": "scalar",
+        "on_disk": True,
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "search_ef": 64,
+        "rescore": True,
+        "oversampling": 2.0,
+        "payload_indexes": {"source": "keyword", "table": "keyword"},
+    },
+    # Quantização binária (32x menor); perde mais recall em modelos com poucas
+    # dimensões, como o bge-small (384), por isso o oversampling maior
+    "binary": {
+        "quantization": "binary",
+        "on_disk": True,
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "search_ef": 128,
+        "rescore": True,
+        "oversampling": 4.0,
+        "payload_indexes": {"source": "keyword", "table": "keyword"},
+    },
+}
+
+
+def resolve_profile(profile) -> dict:
+    if isinstance(profile, dict):
+        return dict(profile)
+
+    if profile not in PROFILES:
+        raise ImproperlyConfigured(
+            f"Unknown qdrant_profile '{profile}', use one of: {', '.join(PROFILES)}"
+        )
+
+    return dict(PROFILES[profile])
+
+
+def quantization_config(profile: dict):
+    quantization = profile.get("quantization")
+    always_ram = profile.get("quantization_always_ram", True)
+
+    if quantization is None:
+        return None
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=always_ram
+            )
+        )
+    if quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=always_ram))
+
+    raise ImproperlyConfigured(f"Unknown quantization '{quantization}', use 'scalar' or 'binary'")
+
+
+def hnsw_config(profile: dict):
+    if profile.get("hnsw_m") is None and profile.get("hnsw_ef_construct") is None:
+        return None
+    return models.HnswConfigDiff(m=profile.get("hnsw_m"), ef_construct=profile.get("hnsw_ef_construct"))
+
+
+def search_params(profile: dict):
+    if profile.get("search_ef") is None and profile.get("quantization") is None:
+        return None
+
+    quantization = None
+    if profile.get("quantization") is not None:
+        quantization = models.QuantizationSearchParams(
+            rescore=profile.get("rescore", True),
+            oversampling=profile.get("oversampling"),
+        )
+
+    return models.SearchParams(hnsw_ef=profile.get("search_ef"), quantization=quantization)
+
+
+def enforces_collection_config(profile: dict) -> bool:
+    # Chaves ausentes não são impostas às collections que já existem
+    return (
+        "quantization" in profile
+        or bool(profile.get("payload_indexes"))
+        or any(profile.get(key) is not None for key in ("on_disk", "hnsw_m", "hnsw_ef_construct"))
+    )
+
+
+def config_differs(desired, current) -> bool:
+    """
+    Se algum campo definido em `desired` (um modelo do qdrant_client) tem outro
+    valor em `current`. Os campos que ficaram None em `desired` usam o padrão do
+    Qdrant e não são comparados.
+    """
+    if desired is None or current is None:
+        return desired is not current
+    if type(desired) is not type(current):
+        return True
+    if not isinstance(desired, BaseModel):
+        return desired != current
+
+    return any(
+        value is not None and config_differs(value, getattr(current, field))
+        for field, value in desired
+    )
+
+
+def create_collection(client, collection_name: str, size: int, distance, profile: dict, **kwargs):
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=models.VectorParams(
+            size=size,
+            distance=distance,
+            on_disk=profile.get("on_disk"),
+        ),
+        hnsw_config=hnsw_config(profile),
+        quantization_config=quantization_config(profile),
+        **kwargs,
+    )
+
+
+class CollectionProfileMixin:
+    """
+    Aplica um perfil de configuração às collections do Qdrant: quantização
+    (escalar ou binária), vetores originais em disco, `m`/`ef_construct` do HNSW,
+    `ef` e rescore na busca e índices de payload.
+
+    O perfil é usado ao criar as collections e, se elas já existirem com outra
+    configuração, elas são migradas com `update_collection` (o Qdrant reindexa em
+    segundo plano, sem perder pontos). Só as chaves presentes no perfil são
+    comparadas; um perfil sem nenhuma delas (`{}`) não consulta as collections.
+    O perfil "default" define todas, então uma collection quantizada ou em disco
+    volta às configurações padrão. No Qdrant local (`:memory:` ou `path`), que
+    não usa HNSW nem quantização, só a criação é feita.
+
+    Config:
+        - qdrant_profile: Nome de um perfil de `PROFILES` ("default", "memory" ou
+          "binary") ou um dict com as mesmas chaves. Padrão: "default".
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.qdrant_profile = resolve_profile(config.get("qdrant_profile", "default"))
+
+    def _is_local_qdrant(self) -> bool:
+        return isinstance(getattr(self._client, "_client", None), QdrantLocal)
+
+    def _setup_collections(self):
+        enforce = enforces_collection_config(self.qdrant_profile) and not self._is_local_qdrant()
+
+        for collection_name in (
+            self.sql_collection_name,
+            self.ddl_collection_name,
+            self.documentation_collection_name,
+        ):
+            if not self._client.collection_exists(collection_name):
+                create_collection(
+                    self._client,
+                    collection_name,
+                    size=self.embeddings_dimension,
+                    distance=self.distance_metric,
+                    profile=self.qdrant_profile,
+                    **self.collection_params,
+                )
+                if enforce:
+                    self._ensure_payload_indexes(collection_name, existing={})
+            elif enforce:
+                info = self._client.get_collection(collection_name)
+                self._migrate_collection(collection_name, info.config)
+                self._ensure_payload_indexes(collection_name, existing=info.payload_schema or {})
+
+    def _get_search_params(self):
+        # O Qdrant local faz busca exata e avisa a cada busca que ignora os parâmetros
+        if self._is_local_qdrant():
+            return None
+        return search_params(self.qdrant_profile)
+
+    def _migrate_collection(self, collection_name: str, config):
+        profile = self.qdrant_profile
+        changes = {}
+
+        on_disk = profile.get("on_disk")
+        if on_disk is not None and bool(config.params.vectors.on_disk) != on_disk:
+            changes["vectors_config"] = {"": models.VectorParamsDiff(on_disk=on_disk)}
+
+        if any(
+            profile.get(key) is not None and getattr(config.hnsw_config, field) != profile[key]
+            for key, field in (("hnsw_m", "m"), ("hnsw_ef_construct", "ef_construct"))
+        ):
+            changes["hnsw_config"] = hnsw_config(profile)
+
+        desired = quantization_config(profile)
+        if "quantization" in profile and config_differs(desired, config.quantization_config):
+            # Disabled remove a quantização de uma collection que tinha
+            changes["quantization_config"] = desired if desired is not None else models.Disabled.DISABLED
+
+        if not changes:
+            return
+
+        self._client.update_collection(collection_name, **changes)
+        self.log(
+            title="Perfil do Qdrant",
+            message=f"Collection {collection_name} migrada: {', '.join(changes)}",
+        )
+
+    def _ensure_payload_indexes(self, collection_name: str, existing: dict):
+        for field_name, field_schema in self.qdrant_profile.get("payload_indexes", {}).items():
+            if field_name not in existing:
+                self._client.create_payload_index(
+                    collection_name, field_name=field_name, field_schema=field_schema
+                )
@@ -0,0 +1,143 @@
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+from sql_cache import question_constraints
+
+
+class DirectSQLMixin:
+    """
+    Responde com o SQL treinado, sem chamar o Ollama, quando a pergunta é a
+    mesma de um par pergunta/SQL do treinamento.
+
+    O par mais bem colocado na busca de contexto entre os que têm os mesmos
+    números e palavras de direção da pergunta (`question_constraints`: "top 5"
+    não recebe o SQL de "top 10", nem "menos" o de "mais") é usado diretamente
+    se a similaridade de cosseno entre a pergunta e a pergunta do par é maior ou
+    igual a `direct_sql_threshold`. O score do Qdrant não serve para isso,
+    porque o vetor do par é o embedding da pergunta junto com o SQL. Abaixo do
+    threshold, o contexto já buscado segue pelos kwargs para o prompt, sem uma
+    nova busca.
+    O threshold depende do modelo de embedding e deve ser calibrado com
+    `eval_direct_sql.py`.
+
+    Config:
+        - direct_sql: Liga ou desliga o atalho. Padrão: True.
+        - direct_sql_threshold: Similaridade mínima com a pergunta treinada para
+          usar o SQL dela. Padrão: 0.95.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.direct_sql = config.get("direct_sql", True)
+        self.direct_sql_threshold = config.get("direct_sql_threshold", 0.95)
+
+        self._direct_sql_hits = 0
+        self._direct_sql_misses = 0
+        self._direct_sql_lock = threading.Lock()
+
+    def generate_sql(self, question: str, allow_llm_to_see_data=False, **kwargs) -> str:
+        if not self.direct_sql:
+            return super().generate_sql(question, allow_llm_to_see_data=allow_llm_to_see_data, **kwargs)
+
+        if kwargs.get("related_context") is None:
+            kwargs["related_context"] = self.get_related_context(question)
+
+        sql = self.trained_sql(question, kwargs["related_context"])
+        if sql is not None:
+            return sql
+
+        return super().generate_sql(question, allow_llm_to_see_data=allow_llm_to_see_data, **kwargs)
+
+    def generate_sql_stream(self, question: str, allow_llm_to_see_data=False, **kwargs):
+        if not self.direct_sql:
+            yield from super().generate_sql_stream(
+                question, allow_llm_to_see_data=allow_llm_to_see_data, **kwargs
+            )
+            return
+
+        if kwargs.get("related_context") is None:
+            kwargs["related_context"] = self.get_related_context(question)
+
+        sql = self.trained_sql(question, kwargs["related_context"])
+        if sql is not None:
+            yield "sql", sql
+            return
+
+        yield from super().generate_sql_stream(question, allow_llm_to_see_data=allow_llm_to_see_data, **kwargs)
+
+    def trained_sql(self, question: str, context) -> Optional[str]:
+        """
+        Example:
+        ```python
+        context = vn.get_related_context(question)
+        vn.trained_sql(question, context)
+        ```
+
+        O SQL do par treinado de `trained_sql_match`, se a pergunta dele é
+        parecida o bastante com a pergunta, contando o acerto ou a falha.
+
+        Args:
+            question (str): A pergunta.
+            context (RelatedContext): O contexto retornado por `get_related_context`.
+
+        Returns:
+            str or None: O SQL treinado, ou None se o par não passa do threshold.
+        """
+        pair, score = self.trained_sql_match(question, context)
+        hit = pair is not None and score >= self.direct_sql_threshold
+
+        with self._direct_sql_lock:
+            if hit:
+                self._direct_sql_hits += 1
+            else:
+                self._direct_sql_misses += 1
+
+        if not hit:
+            return None
+
+        self.log(
+            title="SQL treinado",
+            message=f"Similaridade {score:.3f} com \"{pair['question']}\" para: {question}",
+        )
+        return pair["sql"].strip()
+
+    def trained_sql_match(self, question: str, context) -> Tuple[Optional[dict], float]:
+        """
+        O primeiro par pergunta/SQL da busca com as mesmas constraints da
+        pergunta e a similaridade de cosseno entre a pergunta e a pergunta dele,
+        ou (None, 0.0) se nenhum par com SQL tem as mesmas constraints.
+        """
+        constraints = question_constraints(question)
+        pair = next(
+            (
+                pair
+                for pair in context.question_sql_list or []
+                if pair.get("question") and pair.get("sql") and question_constraints(pair["question"]) == constraints
+            ),
+            None,
+        )
+        if pair is None:
+            return None, 0.0
+
+        # Os dois embeddings saem do cache de embeddings depois da primeira vez
+        vector = np.asarray(self.generate_embedding(question), dtype=np.float32)
+        trained = np.asarray(self.generate_embedding(pair["question"]), dtype=np.float32)
+        norm = np.linalg.norm(vector) * np.linalg.norm(trained)
+        return pair, float(np.dot(vector, trained) / norm) if norm else 0.0
+
+    def direct_sql_stats(self) -> dict:
+        with self._direct_sql_lock:
+            hits, misses = self._direct_sql_hits, self._direct_sql_misses
+
+        total = hits + misses
+        return {
+            "enabled": self.direct_sql,
+            "threshold": self.direct_sql_threshold,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+# Avisa as threads de trabalho para encerrar
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """
+    Junta os embeddings pedidos por várias threads em lotes.
+
+    Cada texto entra em uma fila e recebe um `Future`. Uma thread de trabalho
+    pega o primeiro da fila, espera até `max_wait` segundos por outros (ou até
+    completar `max_batch_size`) e embeda todos em uma única inferência. Textos
+    repetidos no mesmo lote são embedados uma vez só.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.003,
+        workers: int = 1,
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.embed_seconds = 0.0
+
+        self._embed = embed
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"embedding-batcher-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        with self._lock:
+            # Depois do _STOP ninguém mais lê a fila, e o Future nunca terminaria
+            if self._closed:
+                raise RuntimeError("EmbeddingBatcher is closed")
+            self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    def close(self):
+        # Os textos já na fila ainda são embedados antes de as threads pararem
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _ in self._workers:
+                self._queue.put(_STOP)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "mean_batch_seconds": self.embed_seconds / self.batches if self.batches else 0.0,
+            }
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._run_batch(batch)
+            if stop:
+                return
+
+    def _run_batch(self, batch: list):
+        # Futures cancelados não precisam de embedding
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        texts = list(dict.fromkeys(text for text, _ in batch))
+
+        start = time.perf_counter()
+        try:
+            embeddings = dict(zip(texts, self._embed(texts)))
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - start
+
+        for text, future in batch:
+            future.set_result(embeddings[text])
+
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.embed_seconds += elapsed
+
+
+class EmbeddingBatcherMixin:
+    """
+    Embeda as perguntas de todas as threads do worker em lotes, via
+    `EmbeddingBatcher`, em vez de uma inferência por requisição.
+
+    Sob carga, as perguntas que chegam dentro da janela de espera (ou enquanto o
+    lote anterior ainda está rodando) são embedadas juntas, o que aproveita melhor
+    as CPUs do que várias inferências de um texto só. Os embeddings em lote do
+    treinamento (`generate_embeddings`) continuam indo direto ao modelo.
+
+    Config:
+        - embedding_batching: Liga ou desliga os lotes. Padrão: True.
+        - embedding_batch_size: Máximo de textos por lote. Padrão: 32.
+        - embedding_batch_wait_ms: Quanto o lote espera por outros textos depois do
+          primeiro. Padrão: 3.
+        - embedding_batch_workers: Threads que rodam os lotes. Padrão: 1 (o modelo
+          do fastembed já usa várias threads por inferência).
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.embedding_batcher = None
+        if config.get("embedding_batching", True):
+            self.embedding_batcher = EmbeddingBatcher(
+                embed=lambda texts: super(EmbeddingBatcherMixin, self).generate_embeddings(texts),
+                max_batch_size=config.get("embedding_batch_size", 32),
+                max_wait=config.get("embedding_batch_wait_ms", 3) / 1000,
+                workers=config.get("embedding_batch_workers", 1),
+            )
+
+    def generate_embedding(self, data: str, **kwargs) -> List[float]:
+        if self.embedding_batcher is None or kwargs:
+            return super().generate_embedding(data, **kwargs)
+
+        return self.embedding_batcher.embed(data)
@@ -0,0 +1,290 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "volumes", "embedding_cache"
+)
+
+
+class EmbeddingStore:
+    """
+    Armazenamento persistente de embeddings de um modelo, compartilhado entre
+    processos e reinícios.
+
+    Os vetores ficam em `vectors.f32` (float32, append-only), lido via memmap, e
+    `keys.txt` mapeia cada chave para a linha do seu vetor. O vetor é gravado
+    antes da chave, então uma chave só fica visível com o vetor completo.
+    """
+
+    def __init__(self, path: str, dimension: int):
+        os.makedirs(path, exist_ok=True)
+
+        self.dimension = dimension
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._keys_path = os.path.join(path, "keys.txt")
+        self._lock_path = os.path.join(path, ".lock")
+        self._index = {}
+        self._keys_offset = 0
+        self._mmap = None
+        self._lock = threading.Lock()
+
+        stored_dimension = self.read_dimension(path)
+        if stored_dimension is None:
+            with open(os.path.join(path, "meta.json"), "w") as f:
+                json.dump({"dimension": dimension}, f)
+        elif stored_dimension != dimension:
+            raise ValueError(
+                f"Embedding store at {path} has dimension {stored_dimension}, expected {dimension}"
+            )
+
+        self._load_new_keys()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._index.get(key)
+            if row is None:
+                # Outro processo pode ter gravado a chave depois da última leitura
+                self._load_new_keys()
+                row = self._index.get(key)
+                if row is None:
+                    return None
+
+            if self._mmap is None or row >= self._mmap.shape[0]:
+                self._remap()
+
+            return self._mmap[row].tolist()
+
+    def put(self, key: str, embedding: List[float]):
+        self.put_many([(key, embedding)])
+
+    def put_many(self, items: list):
+        # Um único lock e um único fsync por lote, para não pesar no treinamento
+        items = [
+            (key, np.asarray(embedding, dtype=np.float32))
+            for key, embedding in items
+            if len(embedding) == self.dimension
+        ]
+        if not items:
+            return
+
+        with self._lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._load_new_keys()
+                items = [(key, vector) for key, vector in dict(items).items() if key not in self._index]
+                if not items:
+                    return
+
+                with open(self._vectors_path, "ab") as f:
+                    first_row = f.tell() // (self.dimension * 4)
+                    for _, vector in items:
+                        f.write(vector.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                with open(self._keys_path, "a") as f:
+                    f.writelines(
+                        f"{key} {first_row + i}\n" for i, (key, _) in enumerate(items)
+                    )
+
+                self._load_new_keys()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __len__(self):
+        return len(self._index)
+
+    @staticmethod
+    def read_dimension(path: str) -> Optional[int]:
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path) as f:
+            return json.load(f)["dimension"]
+
+    def _load_new_keys(self):
+        if not os.path.exists(self._keys_path):
+            return
+
+        with open(self._keys_path) as f:
+            f.seek(self._keys_offset)
+            for line in f:
+                # Linha incompleta: ainda está sendo escrita por outro processo
+                if not line.endswith("\n"):
+                    break
+                key, row = line.split()
+                self._index[key] = int(row)
+                self._keys_offset += len(line.encode("utf-8"))
+
+    def _remap(self):
+        rows = os.path.getsize(self._vectors_path) // (self.dimension * 4)
+        self._mmap = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension)
+        )
+
+
+class EmbeddingCache:
+    """
+    Cache de embeddings em dois níveis: um LRU em memória na frente de um
+    `EmbeddingStore` em disco por modelo. A chave é o hash do texto junto com o
+    id do modelo de embedding, então trocar de modelo não reaproveita vetores.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.embed_seconds = 0.0
+
+        self._entries = OrderedDict()
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = self._key(model, text)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return self._entries[key]
+
+        store = self._get_store(model)
+        embedding = store.get(key) if store is not None else None
+        if embedding is None:
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, embedding)
+        return embedding
+
+    def put(self, model: str, text: str, embedding: List[float], elapsed: float = 0.0):
+        self.put_many(model, [text], [embedding], elapsed)
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]], elapsed: float = 0.0):
+        keys = [self._key(model, text) for text in texts]
+
+        with self._lock:
+            self.misses += len(keys)
+            self.embed_seconds += elapsed
+            for key, embedding in zip(keys, embeddings):
+                self._remember(key, embedding)
+
+        store = self._get_store(model, len(embeddings[0]))
+        if store is not None:
+            store.put_many(list(zip(keys, embeddings)))
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        avg_embed_seconds = self.embed_seconds / self.misses if self.misses else 0.0
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "seconds_saved": hits * avg_embed_seconds,
+        }
+
+    def _remember(self, key: str, embedding: List[float]):
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_store(self, model: str, dimension: int = None) -> Optional[EmbeddingStore]:
+        if self.path is None:
+            return None
+
+        with self._lock:
+            if model not in self._stores:
+                path = os.path.join(self.path, re.sub(r"[^a-zA-Z0-9._-]", "_", model))
+
+                # Sem a dimensão só dá para abrir um store que já existe em disco
+                if dimension is None:
+                    dimension = EmbeddingStore.read_dimension(path)
+                    if dimension is None:
+                        return None
+
+                self._stores[model] = EmbeddingStore(path, dimension)
+
+            return self._stores[model]
+
+    @staticmethod
+    def _key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCacheMixin:
+    """
+    Memoiza `generate_embedding` e `generate_embeddings`, para que cada texto
+    distinto seja embedado uma única vez por modelo, entre perguntas, treinos e
+    reinícios do processo.
+
+    Config:
+        - embedding_cache: Liga ou desliga o cache. Padrão: True.
+        - embedding_cache_path: Diretório do cache em disco, ou None para usar só memória.
+          Padrão: volumes/embedding_cache.
+        - embedding_cache_max_entries: Tamanho do LRU em memória. Padrão: 10000.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.embedding_cache = None
+        if config.get("embedding_cache", True):
+            self.embedding_cache = EmbeddingCache(
+                path=config.get("embedding_cache_path", DEFAULT_EMBEDDING_CACHE_PATH),
+                max_entries=config.get("embedding_cache_max_entries", 10000),
+            )
+
+    def generate_embedding(self, data: str, **kwargs) -> List[float]:
+        if self.embedding_cache is None:
+            return super().generate_embedding(data, **kwargs)
+
+        embedding = self.embedding_cache.get(self.fastembed_model, data)
+        if embedding is not None:
+            return embedding
+
+        start = time.perf_counter()
+        embedding = super().generate_embedding(data, **kwargs)
+        self.embedding_cache.put(
+            self.fastembed_model, data, embedding, time.perf_counter() - start
+        )
+
+        return embedding
+
+    def generate_embeddings(self, data: List[str], **kwargs) -> List[List[float]]:
+        if self.embedding_cache is None:
+            return super().generate_embeddings(data, **kwargs)
+
+        embeddings = [self.embedding_cache.get(self.fastembed_model, text) for text in data]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        if missing:
+            texts = [data[i] for i in missing]
+
+            start = time.perf_counter()
+            generated = super().generate_embeddings(texts, **kwargs)
+            self.embedding_cache.put_many(
+                self.fastembed_model, texts, generated, time.perf_counter() - start
+            )
+
+            for i, embedding in zip(missing, generated):
+                embeddings[i] = embedding
+
+        return embeddings
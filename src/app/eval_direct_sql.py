@@ -0,0 +1,211 @@
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+
+from qdrant_client import QdrantClient
+
+import corpus
+from benchmark_e2e import HashEmbeddingQdrantClient, start_stub_ollama
+from my_vanna import MyVanna
+from sql_cache import SemanticSQLCache
+
+THRESHOLDS = [0.8, 0.85, 0.9, 0.92, 0.94, 0.95, 0.96, 0.97, 0.98, 0.99]
+
+
+def score_paraphrases(vn) -> list:
+    # O par treinado mais parecido com cada pergunta, como o atalho vê
+    results = []
+    for item in corpus.PARAPHRASES:
+        pair, score = vn.trained_sql_match(item["question"], vn.get_related_context(item["question"]))
+        results.append(paraphrase_result(item, pair, score))
+    return results
+
+
+def score_sql_cache(vn) -> list:
+    # O cache de SQL com todas as perguntas treinadas já respondidas; as
+    # paráfrases devem reaproveitar o SQL delas, e as outras perguntas não
+    cache = SemanticSQLCache(max_entries=len(corpus.QUESTION_SQL))
+    for pair in corpus.QUESTION_SQL:
+        cache.set(vn.generate_embedding(pair["question"]), pair["question"], pair["sql"])
+
+    results = []
+    for item in corpus.PARAPHRASES:
+        entry, score = cache.match(vn.generate_embedding(item["question"]), item["question"])
+        results.append(paraphrase_result(item, entry, score))
+    return results
+
+
+def paraphrase_result(item: dict, pair, score: float) -> dict:
+    sql_by_question = {pair["question"]: pair["sql"] for pair in corpus.QUESTION_SQL}
+    expected = sql_by_question.get(item["trained"]) if item["trained"] else None
+    return {
+        "question": item["question"],
+        "trained": item["trained"],
+        "top_question": pair["question"] if pair is not None else None,
+        "score": score,
+        "correct": expected is not None and pair is not None and pair["sql"] == expected,
+    }
+
+
+def report(title: str, results: list, thresholds: list):
+    rows = sweep(results, thresholds)
+
+    print(
+        f"\n{title}: {sum(result['trained'] is not None for result in results)} paráfrases, "
+        f"{sum(result['trained'] is None for result in results)} perguntas com outro SQL"
+    )
+    for row in rows:
+        print(
+            f"threshold {row['threshold']:.2f} | {row['hits']:3d} atalhos | acerto das paráfrases "
+            f"{row['hit_rate']:6.1%} | precisão {row['accuracy']:6.1%} | {row['wrong']} SQL errados"
+        )
+
+    # O menor threshold sem nenhum SQL errado aproveita o máximo de perguntas
+    recommended = next((row["threshold"] for row in rows if row["wrong"] == 0), None)
+    print(f"Threshold recomendado: {recommended if recommended is not None else 'nenhum dos avaliados'}")
+
+    wrong = sorted(
+        (result for result in results if not result["correct"]), key=lambda result: result["score"], reverse=True
+    )
+    for result in wrong[:5]:
+        print(f"  {result['score']:.3f} \"{result['question']}\" -> \"{result['top_question']}\"")
+
+    return rows, recommended
+
+
+def sweep(results: list, thresholds: list) -> list:
+    paraphrases = sum(result["trained"] is not None for result in results)
+
+    rows = []
+    for threshold in thresholds:
+        hits = [result for result in results if result["score"] >= threshold]
+        correct = sum(result["correct"] for result in hits)
+        rows.append(
+            {
+                "threshold": threshold,
+                "hits": len(hits),
+                "hit_rate": correct / paraphrases if paraphrases else 0.0,
+                "accuracy": correct / len(hits) if hits else 1.0,
+                "wrong": len(hits) - correct,
+            }
+        )
+    return rows
+
+
+def measure_latency(vn, direct_sql: bool, rounds: int) -> list:
+    vn.direct_sql = direct_sql
+
+    timings = []
+    for _ in range(rounds):
+        for item in corpus.PARAPHRASES:
+            start = time.perf_counter()
+            vn.generate_sql(item["question"])
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Calibra os thresholds do atalho de SQL treinado e do cache de SQL com as paráfrases do corpus"
+    )
+    parser.add_argument(
+        "--thresholds",
+        default=",".join(str(threshold) for threshold in THRESHOLDS),
+        help="Thresholds avaliados, separados por vírgula",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Threshold usado na medição de latência. Padrão: o menor sem respostas erradas",
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=1, help="Quantas vezes repetir as perguntas na medição de latência"
+    )
+    parser.add_argument(
+        "--ollama-host",
+        default=None,
+        help="URL de um Ollama real. Sem ela, um servidor que imita a API do Ollama responde as perguntas",
+    )
+    parser.add_argument(
+        "--prefill-ms", type=float, default=0.5, help="Latência do Ollama simulado por token do prompt"
+    )
+    parser.add_argument("--token-ms", type=float, default=5.0, help="Latência do Ollama simulado por token gerado")
+    parser.add_argument(
+        "--hash-embeddings",
+        action="store_true",
+        help="Usa embeddings por hash em vez do modelo do fastembed. Os scores não servem para calibrar",
+    )
+    parser.add_argument("--output", default="eval_direct_sql.json", help="Arquivo JSON com o resultado")
+    args = parser.parse_args()
+
+    server = None
+    ollama_host = args.ollama_host
+    if ollama_host is None:
+        server = start_stub_ollama(args.prefill_ms, args.token_ms)
+        ollama_host = f"http://127.0.0.1:{server.server_port}"
+
+    client_class = HashEmbeddingQdrantClient if args.hash_embeddings else QdrantClient
+    vn = MyVanna(
+        config={
+            "client": client_class(":memory:"),
+            "ollama_host": ollama_host,
+            "embedding_cache": False,
+            "sql_cache": False,
+        }
+    )
+    vn.log = lambda message, title="Info": None
+
+    vn.bulk_train(question_sql=corpus.QUESTION_SQL, ddl=corpus.DDL, documentation=corpus.DOCUMENTATION)
+
+    thresholds = [float(threshold) for threshold in args.thresholds.split(",")]
+    results = score_paraphrases(vn)
+    rows, recommended = report("Atalho de SQL treinado", results, thresholds)
+
+    cache_results = score_sql_cache(vn)
+    cache_rows, cache_recommended = report("Cache de SQL", cache_results, thresholds)
+
+    threshold = args.threshold if args.threshold is not None else recommended
+    latency = None
+    if threshold is not None:
+        vn.direct_sql_threshold = threshold
+        llm = measure_latency(vn, direct_sql=False, rounds=args.rounds)
+        direct = measure_latency(vn, direct_sql=True, rounds=args.rounds)
+        latency = {
+            "threshold": threshold,
+            "llm_mean_ms": statistics.mean(llm),
+            "direct_mean_ms": statistics.mean(direct),
+            "saved_ms": sum(llm) - sum(direct),
+            "direct_sql": vn.direct_sql_stats(),
+        }
+        print(
+            f"\nLatência com threshold {threshold:.2f}: média {latency['llm_mean_ms']:.1f} ms só com LLM, "
+            f"{latency['direct_mean_ms']:.1f} ms com o atalho ({latency['direct_sql']['hit_rate']:.0%} das "
+            f"perguntas), {latency['saved_ms'] / len(direct):.1f} ms economizados por pergunta"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "created_at": datetime.now().isoformat(),
+                "args": vars(args),
+                "thresholds": rows,
+                "recommended": recommended,
+                "latency": latency,
+                "questions": results,
+                "sql_cache": {
+                    "thresholds": cache_rows,
+                    "recommended": cache_recommended,
+                    "questions": cache_results,
+                },
+            },
+            f,
+            indent=2,
+        )
+    print(f"Resultado salvo em {args.output}")
+
+    vn.close()
+    if server is not None:
+        server.shutdown()
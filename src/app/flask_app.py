@@ -0,0 +1,350 @@
+import json
+from functools import wraps
+
+import flask
+from flask import Response, jsonify, stream_with_context
+from vanna.flask import VannaFlaskApp
+
+from background import job_status
+from metrics import new_trace_id, set_trace_id
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class MyVannaFlaskApp(VannaFlaskApp):
+    """
+    `VannaFlaskApp` com as rotas extras do MyVanna:
+
+        - GET /api/v0/generate_sql_stream: Gera o SQL enviando os tokens do Ollama
+          por server-sent events (`event: token`) e, ao final, um `event: sql` com o
+          mesmo corpo de /api/v0/generate_sql.
+        - GET /api/v0/run_sql_stream: Executa o SQL da pergunta com cursor do lado do
+          servidor, enviando cada lote de linhas como `event: rows` e um `event: done`
+          ao final. Só o primeiro lote fica no cache, para gráficos e resumo.
+        - GET /api/v0/run_sql: A rota do Vanna, com um campo "guard" (a decisão da
+          guarda de SQL) quando o resultado foi limitado pelo LIMIT dela.
+        - GET /api/v0/explain_sql: Custo e linhas estimados do SQL da pergunta e o
+          que a guarda de SQL faria com ele (executar, limitar ou recusar).
+        - GET /api/v0/ollama_stats: Profundidade da fila, gerações em andamento e
+          tempo de espera do agendador de chamadas ao Ollama.
+        - GET /api/v0/embedding_stats: Tamanho médio dos lotes e profundidade da
+          fila de embeddings das perguntas.
+        - GET /api/v0/chart_stats: Quantos gráficos vieram de templates, do cache
+          de código plotly e do LLM.
+        - GET /api/v0/direct_sql_stats: Quantas perguntas foram respondidas com o
+          SQL treinado, sem LLM, e o threshold em uso.
+        - GET /api/v0/generate_plotly_figure: Substitui a rota do Vanna para gerar o
+          código pelo `ChartMixin` (template, cache ou LLM) quando ainda não há
+          código para a pergunta.
+        - GET /api/v0/background_results: Estado (pending, ready ou error) e
+          resultado dos follow-ups e do resumo gerados em segundo plano, sem
+          esperar nem gerar nada, para a interface buscar quando estiverem prontos.
+        - GET /api/v0/generate_followup_questions e /api/v0/generate_summary:
+          Substituem as rotas do Vanna para usar os jobs em segundo plano
+          (começados quando o SQL roda e em cache por pergunta, SQL e dados). Com
+          `wait=0`, devolvem `{"type": "pending"}` (HTTP 202) em vez de esperar.
+        - GET /api/v0/cache_stats: Acertos, itens, tamanho e descartes do cache das
+          perguntas, se ele expõe `stats()` (o `SQLiteCache`).
+        - GET /metrics: Histogramas de tempo por etapa no formato do Prometheus.
+
+    Cada requisição recebe um trace ID (o do header `X-Request-ID`, se enviado),
+    usado nos logs do MyVanna e devolvido no mesmo header da resposta.
+    """
+
+    def __init__(self, vn, *args, **kwargs):
+        super().__init__(vn, *args, **kwargs)
+
+        @self.flask_app.before_request
+        def start_trace():
+            flask.g.trace_id = flask.request.headers.get("X-Request-ID") or new_trace_id()
+            set_trace_id(flask.g.trace_id)
+
+        @self.flask_app.after_request
+        def return_trace_id(response):
+            response.headers["X-Request-ID"] = flask.g.get("trace_id", "")
+            return response
+
+        def prefetch_secondary(question, sql, df):
+            # Só gera o que a interface vai pedir
+            if self.allow_llm_to_see_data:
+                vn.prefetch_secondary(
+                    question,
+                    sql,
+                    df,
+                    followup_questions=self.config["followup_questions"],
+                    summary=self.config["summarization"],
+                )
+
+        @self.flask_app.route("/metrics", methods=["GET"])
+        def metrics():
+            if vn.metrics_registry is None:
+                return jsonify({"type": "error", "error": "Metrics are disabled"}), 404
+
+            from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+            return Response(generate_latest(vn.metrics_registry), content_type=CONTENT_TYPE_LATEST)
+
+        @self.flask_app.route("/api/v0/generate_sql_stream", methods=["GET"])
+        @self.requires_auth
+        def generate_sql_stream(user: any):
+            question = flask.request.args.get("question")
+
+            if question is None:
+                return jsonify({"type": "error", "error": "No question provided"})
+
+            id = self.cache.generate_id(question=question)
+
+            def events():
+                try:
+                    for event, text in vn.generate_sql_stream(
+                        question=question, allow_llm_to_see_data=self.allow_llm_to_see_data
+                    ):
+                        if event == "token":
+                            yield sse_event("token", {"id": id, "text": text})
+                            continue
+
+                        self.cache.set(id=id, field="question", value=question)
+                        self.cache.set(id=id, field="sql", value=text)
+
+                        yield sse_event(
+                            "sql",
+                            {
+                                "type": "sql" if vn.is_sql_valid(sql=text) else "text",
+                                "id": id,
+                                "text": text,
+                            },
+                        )
+                except Exception as e:
+                    yield sse_event("error", {"type": "error", "error": str(e)})
+
+            return Response(
+                stream_with_context(events()),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
+        @self.flask_app.route("/api/v0/run_sql_stream", methods=["GET"])
+        @self.requires_auth
+        @self.requires_cache(["sql"])
+        def run_sql_stream(user: any, id: str, sql: str):
+            if not vn.run_sql_is_set:
+                return jsonify(
+                    {
+                        "type": "error",
+                        "error": "Please connect to a database using vn.connect_to_... in order to run SQL queries.",
+                    }
+                )
+
+            def events():
+                total = 0
+                try:
+                    for df in vn.run_sql_stream(sql=sql):
+                        if total == 0:
+                            self.cache.set(id=id, field="df", value=df)
+
+                        total += len(df)
+                        yield sse_event(
+                            "rows",
+                            {
+                                "id": id,
+                                "df": df.to_json(orient="records", date_format="iso"),
+                            },
+                        )
+
+                    yield sse_event("done", {"id": id, "rows": total})
+
+                    if total > 0:
+                        question = self.cache.get(id=id, field="question")
+                        prefetch_secondary(question, sql, self.cache.get(id=id, field="df"))
+                except Exception as e:
+                    yield sse_event(
+                        "error",
+                        {"type": "sql_error", "error": str(e), "guard": getattr(e, "explanation", None)},
+                    )
+
+            return Response(
+                stream_with_context(events()),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
+        @self.flask_app.route("/api/v0/explain_sql", methods=["GET"])
+        @self.requires_auth
+        @self.requires_cache(["sql"])
+        def explain_sql(user: any, id: str, sql: str):
+            if not vn.run_sql_is_set:
+                return jsonify(
+                    {
+                        "type": "error",
+                        "error": "Please connect to a database using vn.connect_to_... in order to run SQL queries.",
+                    }
+                )
+
+            try:
+                return jsonify({"type": "sql_guard", "id": id, **vn.explain_sql(sql)})
+            except Exception as e:
+                return jsonify({"type": "sql_error", "error": str(e)})
+
+        @self.flask_app.route("/api/v0/ollama_stats", methods=["GET"])
+        @self.requires_auth
+        def ollama_stats(user: any):
+            return jsonify({"type": "ollama_stats", **vn.ollama_scheduler.stats()})
+
+        @self.flask_app.route("/api/v0/embedding_stats", methods=["GET"])
+        @self.requires_auth
+        def embedding_stats(user: any):
+            if vn.embedding_batcher is None:
+                return jsonify({"type": "error", "error": "Embedding batching is disabled"})
+
+            return jsonify({"type": "embedding_stats", **vn.embedding_batcher.stats()})
+
+        @self.flask_app.route("/api/v0/chart_stats", methods=["GET"])
+        @self.requires_auth
+        def chart_stats(user: any):
+            return jsonify({"type": "chart_stats", **vn.chart_stats()})
+
+        @self.flask_app.route("/api/v0/cache_stats", methods=["GET"])
+        @self.requires_auth
+        def cache_stats(user: any):
+            if not hasattr(self.cache, "stats"):
+                return jsonify({"type": "error", "error": "The cache does not report stats"})
+
+            return jsonify({"type": "cache_stats", **self.cache.stats()})
+
+        @self.flask_app.route("/api/v0/direct_sql_stats", methods=["GET"])
+        @self.requires_auth
+        def direct_sql_stats(user: any):
+            return jsonify({"type": "direct_sql_stats", **vn.direct_sql_stats()})
+
+        @self.requires_auth
+        @self.requires_cache(["df", "question", "sql"])
+        def generate_plotly_figure(user: any, id: str, df, question, sql):
+            chart_instructions = flask.request.args.get("chart_instructions")
+
+            try:
+                code = None
+                if chart_instructions:
+                    question = f"{question}. When generating the chart, use these special instructions: {chart_instructions}"
+                else:
+                    code = self.cache.get(id=id, field="plotly_code")
+
+                if code is None:
+                    # Com instruções o gráfico é o que o usuário pediu, então sem templates
+                    code = vn.generate_plotly_code(
+                        question=question,
+                        sql=sql,
+                        df_metadata=f"Running df.dtypes gives:\n {df.dtypes}",
+                        df=None if chart_instructions else df,
+                    )
+                    self.cache.set(id=id, field="plotly_code", value=code)
+
+                fig_json = vn.get_plotly_figure(plotly_code=code, df=df, dark_mode=False).to_json()
+                self.cache.set(id=id, field="fig_json", value=fig_json)
+
+                return jsonify({"type": "plotly_figure", "id": id, "fig": fig_json})
+            except Exception as e:
+                return jsonify({"type": "error", "error": str(e)})
+
+        # A rota do Vanna já está registrada com esse endpoint; só a função é trocada
+        self.flask_app.view_functions["generate_plotly_figure"] = generate_plotly_figure
+
+        run_sql = self.flask_app.view_functions["run_sql"]
+
+        @wraps(run_sql)
+        def run_sql_and_prefetch(*args, **kwargs):
+            response = run_sql(*args, **kwargs)
+
+            # Os follow-ups e o resumo começam a ser gerados enquanto o resultado é exibido
+            id = flask.request.args.get("id")
+            df = self.cache.get(id=id, field="df") if id else None
+            if df is not None:
+                prefetch_secondary(self.cache.get(id=id, field="question"), self.cache.get(id=id, field="sql"), df)
+
+            # Um resultado cortado pelo LIMIT da guarda de SQL não pode parecer completo
+            body = response.get_json(silent=True) or {}
+            if df is not None and body.get("type") == "df" and "guard" in df.attrs:
+                response = jsonify({**body, "guard": df.attrs["guard"]})
+
+            return response
+
+        self.flask_app.view_functions["run_sql"] = run_sql_and_prefetch
+
+        @self.requires_auth
+        @self.requires_cache(["df", "question", "sql"])
+        def generate_followup_questions(user: any, id: str, df, question, sql):
+            if not self.allow_llm_to_see_data:
+                self.cache.set(id=id, field="followup_questions", value=[])
+                return jsonify(
+                    {
+                        "type": "question_list",
+                        "id": id,
+                        "questions": [],
+                        "header": "Followup Questions can be enabled if you set allow_llm_to_see_data=True",
+                    }
+                )
+
+            job = vn.followup_questions_job(question, sql, df)
+            if flask.request.args.get("wait") == "0" and not job.done():
+                return jsonify({"type": "pending", "id": id}), 202
+
+            try:
+                followup_questions = (job.result() or [])[:5]
+            except Exception as e:
+                return jsonify({"type": "error", "error": str(e)})
+
+            self.cache.set(id=id, field="followup_questions", value=followup_questions)
+            return jsonify(
+                {
+                    "type": "question_list",
+                    "id": id,
+                    "questions": followup_questions,
+                    "header": "Here are some potential followup questions:",
+                }
+            )
+
+        self.flask_app.view_functions["generate_followup_questions"] = generate_followup_questions
+
+        @self.requires_auth
+        @self.requires_cache(["df", "question"], optional_fields=["sql"])
+        def generate_summary(user: any, id: str, df, question, sql):
+            if not self.allow_llm_to_see_data:
+                return jsonify(
+                    {
+                        "type": "text",
+                        "id": id,
+                        "text": "Summarization can be enabled if you set allow_llm_to_see_data=True",
+                    }
+                )
+
+            job = vn.summary_job(question, sql, df)
+            if flask.request.args.get("wait") == "0" and not job.done():
+                return jsonify({"type": "pending", "id": id}), 202
+
+            try:
+                summary = job.result()
+            except Exception as e:
+                return jsonify({"type": "error", "error": str(e)})
+
+            self.cache.set(id=id, field="summary", value=summary)
+            return jsonify({"type": "text", "id": id, "text": summary})
+
+        self.flask_app.view_functions["generate_summary"] = generate_summary
+
+        @self.flask_app.route("/api/v0/background_results", methods=["GET"])
+        @self.requires_auth
+        @self.requires_cache(["question"], optional_fields=["sql", "df"])
+        def background_results(user: any, id: str, question, sql, df):
+            followup_questions = job_status(vn.get_background_job("followup_questions", question, sql, df))
+            if followup_questions["status"] == "ready":
+                followup_questions["result"] = (followup_questions["result"] or [])[:5]
+
+            return jsonify(
+                {
+                    "type": "background_results",
+                    "id": id,
+                    "followup_questions": followup_questions,
+                    "summary": job_status(vn.get_background_job("summary", question, sql, df)),
+                }
+            )
@@ -0,0 +1,257 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from vanna.flask import Cache
+
+DEFAULT_FLASK_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "volumes", "flask_cache.sqlite"
+)
+
+# Valores menores que isso (ids, perguntas, SQL curtos) não compensam a compressão
+COMPRESS_MIN_BYTES = 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS items_accessed_at ON items (accessed_at);
+CREATE INDEX IF NOT EXISTS items_created_at ON items (created_at);
+CREATE TABLE IF NOT EXISTS fields (
+    id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (id, field)
+);
+"""
+
+
+def dumps(value) -> bytes:
+    """
+    Serializa um valor do cache com pickle (DataFrames viram blocos binários por
+    coluna) e, acima de `COMPRESS_MIN_BYTES`, comprime com zlib. O primeiro byte
+    diz qual dos dois formatos foi usado.
+    """
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) < COMPRESS_MIN_BYTES:
+        return b"p" + data
+    return b"z" + zlib.compress(data, 1)
+
+
+def loads(data: bytes):
+    data = bytes(data)
+    if data[:1] == b"z":
+        return pickle.loads(zlib.decompress(data[1:]))
+    return pickle.loads(data[1:])
+
+
+class SQLiteCache(Cache):
+    """
+    Cache das perguntas do `VannaFlaskApp` (pergunta, SQL, DataFrame, código e
+    figura do gráfico...) em um arquivo SQLite, compartilhado por todos os
+    workers do gunicorn na mesma máquina: qualquer worker atende qualquer etapa
+    de uma pergunta, sem sessões fixas.
+
+    O banco usa WAL, então leituras não esperam escritas. Cada id (uma pergunta)
+    expira após `ttl` segundos e, ao passar de `max_entries` ids ou `max_bytes`
+    de valores serializados, os ids usados há mais tempo são descartados. Os
+    valores são serializados com pickle e comprimidos, e o arquivo só deve ser
+    gravável pelo próprio app.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_FLASK_CACHE_PATH,
+        max_entries: int = 10000,
+        max_bytes: int = 512 * 1024 * 1024,
+        ttl: float = 86400,
+        timeout: float = 30,
+    ):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._local = threading.local()
+        self._connections = []
+        self._stats_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+
+    def generate_id(self, *args, **kwargs):
+        return str(uuid.uuid4())
+
+    def set(self, id, field, value):
+        data = dumps(value)
+        now = time.time()
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            previous = conn.execute(
+                "SELECT length(value) FROM fields WHERE id = ? AND field = ?", (id, field)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO fields (id, field, value) VALUES (?, ?, ?)", (id, field, data)
+            )
+            conn.execute(
+                """
+                INSERT INTO items (id, created_at, accessed_at, size) VALUES (?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET accessed_at = excluded.accessed_at, size = size + ?
+                """,
+                (id, now, now, len(data), len(data) - (previous[0] if previous else 0)),
+            )
+            self._evict(conn, now, keep=id)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, id, field):
+        now = time.time()
+
+        conn = self._connection()
+        row = conn.execute(
+            """
+            SELECT f.value, i.created_at, i.accessed_at
+            FROM fields f JOIN items i ON i.id = f.id
+            WHERE f.id = ? AND f.field = ?
+            """,
+            (id, field),
+        ).fetchone()
+
+        if row is None or now - row[1] > self.ttl:
+            self._count(hit=False)
+            return None
+
+        # Uma escrita por leitura disputaria o lock entre os workers; o LRU não
+        # precisa de mais precisão que isso
+        if now - row[2] > 1:
+            conn.execute("UPDATE items SET accessed_at = ? WHERE id = ?", (now, id))
+
+        self._count(hit=True)
+        return loads(row[0])
+
+    def get_all(self, field_list) -> list:
+        conn = self._connection()
+        ids = conn.execute(
+            "SELECT id FROM items WHERE created_at >= ? ORDER BY created_at", (time.time() - self.ttl,)
+        ).fetchall()
+
+        placeholders = ", ".join("?" * len(field_list))
+        result = []
+        for (id,) in ids:
+            values = dict(
+                conn.execute(
+                    f"SELECT field, value FROM fields WHERE id = ? AND field IN ({placeholders})", (id, *field_list)
+                ).fetchall()
+            )
+            result.append(
+                {"id": id, **{field: loads(values[field]) if field in values else None for field in field_list}}
+            )
+        return result
+
+    def delete(self, id):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete_items(conn, [id])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> dict:
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM items"
+        ).fetchone()
+
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "size": entries,
+                "size_bytes": size,
+            }
+
+    def close(self):
+        with self._stats_lock:
+            connections, self._connections = self._connections, []
+
+        for conn in connections:
+            conn.close()
+
+    def _evict(self, conn, now: float, keep: str):
+        # Roda dentro da transação do set, então workers diferentes não despejam ao mesmo tempo
+        evicted = [id for (id,) in conn.execute("SELECT id FROM items WHERE created_at < ?", (now - self.ttl,))]
+        self._delete_items(conn, evicted)
+
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM items").fetchone()
+        if entries > self.max_entries or size > self.max_bytes:
+            least_recent = []
+            # O id que acabou de ser gravado fica, mesmo sozinho acima do limite:
+            # a pergunta ainda vai ler o que foi gravado nele
+            for id, item_size in conn.execute(
+                "SELECT id, size FROM items WHERE id != ? ORDER BY accessed_at", (keep,)
+            ):
+                if entries <= self.max_entries and size <= self.max_bytes:
+                    break
+                least_recent.append(id)
+                entries -= 1
+                size -= item_size
+
+            self._delete_items(conn, least_recent)
+            evicted.extend(least_recent)
+
+        if evicted:
+            with self._stats_lock:
+                self.evictions += len(evicted)
+
+    @staticmethod
+    def _delete_items(conn, ids: list):
+        # O SQLite limita a quantidade de parâmetros por consulta
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            conn.execute(f"DELETE FROM fields WHERE id IN ({placeholders})", chunk)
+            conn.execute(f"DELETE FROM items WHERE id IN ({placeholders})", chunk)
+
+    def _connection(self) -> sqlite3.Connection:
+        # Uma conexão por thread e por processo: conexões não atravessam o fork do gunicorn
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        with self._stats_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
@@ -0,0 +1,50 @@
+import argparse
+
+from my_vanna import MyVanna
+from query_log import collect_sqls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sugere índices a partir dos SQL treinados e do log de consultas"
+    )
+    parser.add_argument(
+        "--method",
+        choices=["auto", "hypopg", "transaction"],
+        default="auto",
+        help="Como avaliar os índices: hipotéticos (hypopg) ou criados e desfeitos em uma transação",
+    )
+    parser.add_argument("--max-indexes", type=int, default=10, help="Máximo de índices sugeridos")
+    parser.add_argument(
+        "--min-gain",
+        type=float,
+        default=0.05,
+        help="Redução mínima do custo das consultas que usam o índice (0.05 = 5%%)",
+    )
+    parser.add_argument("--output", default=None, help="Arquivo .sql com os CREATE INDEX sugeridos")
+    args = parser.parse_args()
+
+    vn = MyVanna()
+
+    vn.connect_to_postgres(host='localhost', dbname='geekmaster', user='admin', password='admin', port='5432')
+
+    sqls = collect_sqls(vn)
+    advice = vn.advise_indexes(sqls, method=args.method, max_indexes=args.max_indexes, min_gain=args.min_gain)
+
+    print(f"{len(sqls)} SQL analisados, {len(advice)} índices sugeridos:")
+    for position, index in enumerate(advice, start=1):
+        print(
+            f"\n{position}. {index['table']} ({', '.join(index['columns'])}): custo {index['cost_before']:,.0f} -> "
+            f"{index['cost_after']:,.0f} (-{index['gain']:.0%}) em {index['queries']} consultas, "
+            f"~{index['size_bytes'] / 1024 / 1024:.1f} MB"
+        )
+        print(f"   {index['sql']}")
+        print(f"   exemplo: {index['example']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            for index in advice:
+                f.write(f"-- -{index['gain']:.0%} do custo em {index['queries']} consultas\n{index['sql']}\n")
+        print(f"\nCREATE INDEX salvos em {args.output}")
+
+    vn.close()
@@ -0,0 +1,348 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Optional
+
+from vanna.exceptions import ValidationError
+
+from result_cache import normalize_sql
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_ALIAS_KEYWORDS = {
+    "on", "join", "where", "group", "order", "limit", "inner", "left", "right", "full", "cross",
+    "natural", "having", "using", "union", "window", "offset", "fetch", "as", "lateral",
+}
+# Palavras que encerram um WHERE ou um ON no mesmo nível de parênteses
+_CLAUSE_END = re.compile(
+    r"\b(group by|order by|limit|offset|having|window|union|intersect|except|where|select|from"
+    r"|(?:inner |left |right |full |cross |natural )?(?:outer )?join)\b"
+)
+_REF = r"(?:(?P<{0}q>\w+)\.)?(?P<{0}c>\w+)"
+_PREDICATE = re.compile(
+    rf"(?<![\w.'#]){_REF.format('l')}\b(?!\s*\()\s*(?P<op><>|!=|<=|>=|=|<|>|\bbetween\b|\bnot\s+in\b|\bin\b|\blike\b|\bis\s+null\b)"
+    rf"(?:\s*(?<![\w.'#]){_REF.format('r')}\b(?!\s*\(|\.))?"
+)
+
+COLUMNS_SQL = """
+SELECT c.relname, a.attname
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind = 'r' AND n.nspname = 'public' AND a.attnum > 0 AND NOT a.attisdropped
+"""
+
+INDEXES_SQL = """
+SELECT t.relname, i.relname, ARRAY(
+    SELECT a.attname
+    FROM unnest(x.indkey::int2[]) WITH ORDINALITY AS k(attnum, position)
+    JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = k.attnum
+    ORDER BY k.position
+)
+FROM pg_index x
+JOIN pg_class t ON t.oid = x.indrelid
+JOIN pg_class i ON i.oid = x.indexrelid
+JOIN pg_namespace n ON n.oid = t.relnamespace
+WHERE n.nspname = 'public'
+"""
+
+
+def extract_predicates(sql: str, columns: dict) -> dict:
+    """
+    Colunas usadas nos filtros (WHERE), nas junções (ON) e na ordenação de um
+    top-N (ORDER BY ... LIMIT), por tabela.
+
+    Args:
+        sql (str): O SQL a analisar.
+        columns (dict): As colunas de cada tabela do banco ({tabela: set}), para
+          saber a que tabela pertence uma coluna sem qualificador.
+
+    Returns:
+        dict: {tabela: {"equality": set, "range": set, "join": set, "sort": list}}.
+    """
+    code = _LITERAL.sub("'#'", normalize_sql(sql))
+    ctes = set(re.findall(r"(\w+) as ?\(", code))
+
+    aliases = {}
+    for match in re.finditer(r"\b(?:from|join)\s+(?:public\.)?(\w+)(?:\s+(?:as\s+)?(\w+))?", code):
+        table, alias = match.groups()
+        if table in ctes or table not in columns:
+            continue
+        aliases[table] = table
+        if alias and alias not in _ALIAS_KEYWORDS:
+            aliases[alias] = table
+
+    tables = set(aliases.values())
+
+    def resolve(qualifier: Optional[str], column: str) -> Optional[str]:
+        if qualifier:
+            table = aliases.get(qualifier)
+            return table if table and column in columns[table] else None
+        # Sem qualificador, a coluna precisa existir em uma única tabela da consulta
+        owners = [table for table in tables if column in columns[table]]
+        return owners[0] if len(owners) == 1 else None
+
+    predicates = {}
+
+    def add(table: str, kind: str, column: str):
+        entry = predicates.setdefault(table, {"equality": set(), "range": set(), "join": set(), "sort": []})
+        if kind == "sort":
+            if column not in entry["sort"]:
+                entry["sort"].append(column)
+        else:
+            entry[kind].add(column)
+
+    for start, end in _clause_spans(code):
+        for match in _PREDICATE.finditer(code, start, end):
+            table = resolve(match.group("lq"), match.group("lc"))
+            if table is None:
+                continue
+
+            op = " ".join(match.group("op").split())
+            right = resolve(match.group("rq"), match.group("rc")) if match.group("rc") else None
+            if op == "=" and right is not None:
+                add(table, "join", match.group("lc"))
+                add(right, "join", match.group("rc"))
+            elif op in ("=", "in", "is null"):
+                add(table, "equality", match.group("lc"))
+            elif op in ("<", ">", "<=", ">=", "between", "like"):
+                add(table, "range", match.group("lc"))
+
+    # ORDER BY de colunas com LIMIT: um índice na ordem evita ordenar a tabela toda
+    top_n = re.search(r"\border by (?P<columns>[\w., ]+?)(?: (?:asc|desc))?(?: nulls (?:first|last))? limit\b", code)
+    output_aliases = set(re.findall(r"\bas (\w+)", code))
+    if top_n:
+        for item in top_n.group("columns").split(","):
+            ref = re.fullmatch(r"\s*(?:(\w+)\.)?(\w+)(?: (?:asc|desc))?\s*", item)
+            # Um nome solto pode ser um alias da saída (ORDER BY total DESC)
+            alias = ref is not None and ref.group(1) is None and ref.group(2) in output_aliases
+            table = resolve(*ref.groups()) if ref and not alias else None
+            if table is None:
+                break
+            add(table, "sort", ref.group(2))
+
+    return predicates
+
+
+def candidate_indexes(predicates: dict) -> set:
+    """
+    Índices candidatos para os predicados de uma consulta: uma coluna de cada
+    filtro, junção ou ordenação e, por tabela, as igualdades seguidas de cada
+    intervalo (a ordem em que um B-tree atende aos dois).
+    """
+    candidates = set()
+    for table, entry in predicates.items():
+        for column in entry["equality"] | entry["range"] | entry["join"]:
+            candidates.add((table, (column,)))
+
+        equality = tuple(sorted(entry["equality"]))[:3]
+        if len(equality) > 1:
+            candidates.add((table, equality))
+        for column in entry["range"]:
+            if equality:
+                candidates.add((table, equality + (column,)))
+        if entry["sort"]:
+            candidates.add((table, equality + tuple(entry["sort"])))
+
+    return candidates
+
+
+def index_name(table: str, columns: tuple) -> str:
+    name = f"idx_{table}_{'_'.join(columns)}"
+    # Identificadores do Postgres têm no máximo 63 bytes
+    if len(name) > 63:
+        name = f"idx_{table}_{hashlib.sha1('|'.join(columns).encode()).hexdigest()[:12]}"
+    return name
+
+
+def create_index_sql(table: str, columns: tuple) -> str:
+    # CONCURRENTLY não bloqueia as escritas na tabela durante a criação
+    return f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name(table, columns)} ON {table} ({', '.join(columns)});"
+
+
+def _clause_spans(code: str) -> list:
+    # Trechos dos WHERE e ON, até a próxima cláusula do mesmo nível ou o fim da subconsulta
+    spans = []
+    for match in re.finditer(r"\b(?:where|on)\b", code):
+        depth = 0
+        i = match.end()
+        while i < len(code):
+            char = code[i]
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif depth == 0 and char.isalpha() and _CLAUSE_END.match(code, i):
+                break
+            i += 1
+        spans.append((match.end(), i))
+    return spans
+
+
+class IndexAdvisorMixin:
+    """
+    Sugere índices a partir dos SQL treinados e executados: as colunas de
+    filtros, junções e ordenações viram índices candidatos, e cada um é avaliado
+    pela redução do custo estimado (`EXPLAIN`) das consultas que o usariam.
+
+    Com a extensão `hypopg` instalada no banco, os índices são hipotéticos (só
+    existem para o planejador da sessão). Sem ela, cada índice é criado de
+    verdade dentro de uma transação desfeita ao final: o resultado é o mesmo, mas
+    a criação leva o tempo de um CREATE INDEX e bloqueia as escritas na tabela
+    enquanto isso, então prefira rodar fora do horário de uso ou em uma cópia do
+    banco.
+    """
+
+    def advise_indexes(
+        self, sqls: list, method: str = "auto", max_indexes: int = 10, min_gain: float = 0.05
+    ) -> list:
+        """
+        Example:
+        ```python
+        vn.advise_indexes([sql for sql in training_sqls])
+        ```
+
+        Sugere índices para as consultas.
+
+        Args:
+            sqls (list): SQL treinados e executados. Consultas repetidas pesam mais.
+            method (str): "hypopg", "transaction" ou "auto" (hypopg, se instalada).
+            max_indexes (int): Máximo de índices sugeridos.
+            min_gain (float): Redução mínima do custo somado das consultas que usam
+              o índice, em fração do custo delas sem ele.
+
+        Returns:
+            list: Um dict por índice, da maior redução de custo para a menor, com a
+            tabela, as colunas, o `CREATE INDEX`, o custo antes e depois, as
+            consultas beneficiadas, o tamanho estimado e um SQL de exemplo.
+        """
+        columns = {}
+        existing = {}
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(COLUMNS_SQL)
+                for table, column in cs.fetchall():
+                    columns.setdefault(table, set()).add(column)
+
+                cs.execute(INDEXES_SQL)
+                for table, _, index_columns in cs.fetchall():
+                    existing.setdefault(table, []).append(tuple(index_columns))
+
+                if method == "auto":
+                    cs.execute("SELECT 1 FROM pg_extension WHERE extname = 'hypopg'")
+                    method = "hypopg" if cs.fetchone() else "transaction"
+
+        if method not in ("hypopg", "transaction"):
+            raise ValidationError(f"Unknown method: {method}. Use 'hypopg', 'transaction' or 'auto'")
+        self.log(title="Índices", message=f"Avaliando índices com o método {method}")
+
+        weights = Counter(normalize_sql(sql) for sql in sqls)
+        queries = {}
+        for sql in weights:
+            candidates = {
+                candidate
+                for candidate in candidate_indexes(extract_predicates(sql, columns))
+                if not _is_covered(candidate, existing.get(candidate[0], []))
+            }
+            if candidates:
+                queries[sql] = candidates
+
+        candidates = {}
+        for sql, query_candidates in queries.items():
+            for candidate in query_candidates:
+                candidates.setdefault(candidate, []).append(sql)
+
+        results = []
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                base = {sql: _explain_cost(cs, sql) for sql in queries}
+
+                for (table, index_columns), candidate_sqls in candidates.items():
+                    candidate_sqls = [sql for sql in candidate_sqls if base[sql] is not None]
+                    if not candidate_sqls:
+                        continue
+
+                    costs, size = self._evaluate_index(cs, method, table, index_columns, candidate_sqls)
+
+                    before = sum(base[sql] * weights[sql] for sql in candidate_sqls)
+                    after = sum(
+                        min(costs[sql], base[sql]) * weights[sql] if costs[sql] is not None else base[sql] * weights[sql]
+                        for sql in candidate_sqls
+                    )
+                    improved = [sql for sql in candidate_sqls if costs[sql] is not None and costs[sql] < base[sql]]
+                    if not improved or before - after < min_gain * before:
+                        continue
+
+                    results.append(
+                        {
+                            "table": table,
+                            "columns": list(index_columns),
+                            "sql": create_index_sql(table, index_columns),
+                            "cost_before": before,
+                            "cost_after": after,
+                            "gain": (before - after) / before,
+                            "queries": sum(weights[sql] for sql in improved),
+                            "size_bytes": size,
+                            "example": max(improved, key=lambda sql: base[sql] - costs[sql]),
+                        }
+                    )
+
+        # Um índice cujas colunas são o começo de outro já sugerido é redundante
+        advice = []
+        for result in sorted(results, key=lambda result: result["cost_before"] - result["cost_after"], reverse=True):
+            if any(
+                chosen["table"] == result["table"] and chosen["columns"][: len(result["columns"])] == result["columns"]
+                for chosen in advice
+            ):
+                continue
+            advice.append(result)
+            if len(advice) == max_indexes:
+                break
+
+        return advice
+
+    def _evaluate_index(self, cs, method: str, table: str, columns: tuple, sqls: list):
+        definition = f"CREATE INDEX ON {table} ({', '.join(columns)})"
+
+        if method == "hypopg":
+            cs.execute("SELECT indexrelid FROM hypopg_create_index(%s)", (definition,))
+            oid = cs.fetchone()[0]
+            try:
+                costs = {sql: _explain_cost(cs, sql) for sql in sqls}
+                cs.execute("SELECT hypopg_relation_size(%s)", (oid,))
+                return costs, cs.fetchone()[0]
+            finally:
+                cs.execute("SELECT hypopg_reset()")
+
+        # Sem hypopg: o índice é criado e desfeito com um savepoint, na mesma transação
+        cs.execute("SAVEPOINT vanna_index")
+        try:
+            name = index_name(table, columns)
+            cs.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+            costs = {sql: _explain_cost(cs, sql) for sql in sqls}
+            cs.execute("SELECT pg_relation_size(%s::regclass)", (name,))
+            return costs, cs.fetchone()[0]
+        finally:
+            cs.execute("ROLLBACK TO SAVEPOINT vanna_index")
+
+
+def _is_covered(candidate: tuple, existing: list) -> bool:
+    # Um índice existente que começa pelas mesmas colunas já atende o candidato
+    columns = candidate[1]
+    return any(index[: len(columns)] == columns for index in existing)
+
+
+def _explain_cost(cs, sql: str) -> Optional[float]:
+    import psycopg2
+
+    # SQL inválido (ou com parâmetros) não pode abortar a transação das demais avaliações
+    cs.execute("SAVEPOINT vanna_explain")
+    try:
+        cs.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        cost = cs.fetchone()[0][0]["Plan"]["Total Cost"]
+    except psycopg2.Error:
+        cs.execute("ROLLBACK TO SAVEPOINT vanna_explain")
+        return None
+    cs.execute("RELEASE SAVEPOINT vanna_explain")
+    return cost
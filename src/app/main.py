@@ -1,37 +1,49 @@
-from vanna.ollama import Ollama
-from vanna.qdrant import Qdrant_VectorStore
-from qdrant_client import QdrantClient
-from vanna.flask import VannaFlaskApp
-
-class MyVanna(Qdrant_VectorStore, Ollama):
-    def __init__(self, config=None):
-        
-        if config is None:
-            config = {}
-            
-            
-        qdrant_client = QdrantClient(url="localhost", port=6333)
-        
-        qdrant_config = {'client': qdrant_client}
-        ollama_config = {
-            'model': 'llama2:7b',  # Specify the model name
-            'url': 'http://localhost:11434',  # Default Ollama API endpoint
-            'temperature': 0.7,  # Optional: adjust temperature for response randomness
-            'num_ctx': 4096,     # Context window size
-            'num_thread': 4      # Number of threads to use
-        }
-        
-        config = {**qdrant_config, **ollama_config, **config}
-        Qdrant_VectorStore.__init__(self, config=config)
-        Ollama.__init__(self, config=config)
+import os
+from typing import TYPE_CHECKING
 
+from warmup import StartupTimer
 
-if __name__ == "__main__":
-    vn = MyVanna()
+if TYPE_CHECKING:
+    from flask_app import MyVannaFlaskApp
+
+
+def create_app(warm_up: bool = True, **kwargs) -> "MyVannaFlaskApp":
+    timer = StartupTimer()
+
+    # O stack do vanna/flask/qdrant só é importado aqui, para o `import main` (e o
+    # processo mestre do gunicorn, em serve.py) não pagar por ele
+    with timer.phase("imports"):
+        from flask_app import MyVannaFlaskApp
+        from flask_cache import DEFAULT_FLASK_CACHE_PATH, SQLiteCache
+        from my_vanna import MyVanna
+
+    with timer.phase("my_vanna"):
+        vn = MyVanna()
+
+    # O estado de cada pergunta fica em um SQLite compartilhado pelos workers;
+    # VANNA_CACHE=memory volta ao MemoryCache do Vanna, por processo e sem limite
+    if "cache" not in kwargs and os.getenv("VANNA_CACHE", "sqlite") == "sqlite":
+        kwargs["cache"] = SQLiteCache(
+            path=os.getenv("VANNA_CACHE_PATH", DEFAULT_FLASK_CACHE_PATH),
+            max_entries=int(os.getenv("VANNA_CACHE_MAX_ENTRIES", "10000")),
+            max_bytes=int(os.getenv("VANNA_CACHE_MAX_MB", "512")) * 1024 * 1024,
+            ttl=float(os.getenv("VANNA_CACHE_TTL", "86400")),
+        )
 
+    with timer.phase("flask_app"):
+        app = MyVannaFlaskApp(vn, **kwargs)
 
-    app = VannaFlaskApp(vn)
-    
     # Configurando timeout
     app.config['TIMEOUT'] = 900
-    app.run()
\ No newline at end of file
+
+    # Só fica pronto depois de carregar o modelo no Ollama, o de embedding e o Qdrant
+    if warm_up:
+        vn.warm_up(timer)
+
+    vn.log(title="Inicialização", message=timer.report())
+    return app
+
+
+if __name__ == "__main__":
+    app = create_app(warm_up=os.getenv("VANNA_WARM_UP", "1") != "0")
+    app.run()
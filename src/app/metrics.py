@@ -0,0 +1,221 @@
+import importlib.util
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from vanna.exceptions import DependencyError
+
+_trace_id = ContextVar("trace_id", default=None)
+
+# Buckets em segundos, cobrindo de buscas no Qdrant (ms) até gerações longas no Ollama
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300)
+
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 3072, 4096, 8192)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def set_trace_id(trace_id: str = None):
+    """
+    Define o trace ID das chamadas feitas a partir daqui no contexto atual (a
+    requisição do Flask) e retorna o token para restaurar o anterior.
+    """
+    return _trace_id.set(trace_id)
+
+
+def get_trace_id() -> str:
+    return _trace_id.get()
+
+
+class MetricsMixin:
+    """
+    Mede o tempo de cada etapa de uma pergunta em histogramas do Prometheus:
+    embedding, busca de contexto (e cada busca no Qdrant por coleção), montagem do
+    prompt, chamadas ao Ollama (incluindo a espera na fila), execução do SQL,
+    gráfico, follow-ups e resumo. De cada resposta do Ollama são registrados os
+    tokens do prompt e gerados e os tempos de carga, prefill e decode.
+
+    Os logs levam o trace ID da requisição, quando houver um.
+
+    Config:
+        - metrics: Liga ou desliga as métricas. Padrão: True se o `prometheus_client`
+          estiver instalado.
+        - trace_ids: Prefixa os logs com o trace ID da requisição. Padrão: True.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.trace_ids = config.get("trace_ids", True)
+
+        self.metrics_registry = None
+        if not config.get("metrics", importlib.util.find_spec("prometheus_client") is not None):
+            return
+
+        try:
+            from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+        except ImportError:
+            raise DependencyError(
+                "You need to install required dependencies to execute this method, run command:"
+                " \npip install prometheus_client"
+            )
+
+        # Registro próprio, para mais de um MyVanna no mesmo processo não colidirem
+        self.metrics_registry = CollectorRegistry()
+
+        self._stage_duration = Histogram(
+            "vanna_stage_duration_seconds",
+            "Duração de cada etapa do MyVanna",
+            ["stage"],
+            buckets=DURATION_BUCKETS,
+            registry=self.metrics_registry,
+        )
+        self._vector_search_duration = Histogram(
+            "vanna_vector_search_duration_seconds",
+            "Duração de cada busca no Qdrant",
+            ["collection"],
+            buckets=DURATION_BUCKETS,
+            registry=self.metrics_registry,
+        )
+        self._llm_phase_duration = Histogram(
+            "vanna_llm_phase_duration_seconds",
+            "Tempo informado pelo Ollama para carga do modelo, prefill e decode",
+            ["phase"],
+            buckets=DURATION_BUCKETS,
+            registry=self.metrics_registry,
+        )
+        self._llm_tokens = Histogram(
+            "vanna_llm_tokens",
+            "Tokens por chamada ao Ollama",
+            ["kind"],
+            buckets=TOKEN_BUCKETS,
+            registry=self.metrics_registry,
+        )
+        self._stage_errors = Counter(
+            "vanna_stage_errors_total",
+            "Etapas que terminaram com exceção",
+            ["stage"],
+            registry=self.metrics_registry,
+        )
+
+        if getattr(self, "ollama_scheduler", None) is not None:
+            scheduler = self.ollama_scheduler
+            Gauge(
+                "vanna_ollama_queue_depth",
+                "Chamadas ao Ollama esperando na fila",
+                registry=self.metrics_registry,
+            ).set_function(lambda: scheduler.stats()["queue_depth"])
+            Gauge(
+                "vanna_ollama_running",
+                "Gerações em andamento no Ollama",
+                registry=self.metrics_registry,
+            ).set_function(lambda: scheduler.stats()["running"])
+
+    @contextmanager
+    def metrics_span(self, stage: str):
+        """
+        Example:
+        ```python
+        with vn.metrics_span("sql"):
+            vn.run_sql(sql)
+        ```
+
+        Registra a duração do bloco no histograma da etapa.
+        """
+        if self.metrics_registry is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self._stage_errors.labels(stage=stage).inc()
+            raise
+        finally:
+            self._stage_duration.labels(stage=stage).observe(time.perf_counter() - start)
+
+    def log(self, message: str, title: str = "Info"):
+        trace_id = get_trace_id()
+        if self.trace_ids and trace_id is not None:
+            title = f"[{trace_id}] {title}"
+        super().log(message, title=title)
+
+    def llm_response_received(self, response):
+        super().llm_response_received(response)
+
+        prompt_tokens = response.get("prompt_eval_count") or 0
+        eval_tokens = response.get("eval_count") or 0
+        self.log(
+            title="Ollama",
+            message=(
+                f"{prompt_tokens} tokens de prompt em {(response.get('prompt_eval_duration') or 0) / 1e9:.2f}s, "
+                f"{eval_tokens} gerados em {(response.get('eval_duration') or 0) / 1e9:.2f}s"
+            ),
+        )
+
+        if self.metrics_registry is None:
+            return
+
+        self._llm_tokens.labels(kind="prompt").observe(prompt_tokens)
+        self._llm_tokens.labels(kind="eval").observe(eval_tokens)
+
+        # O Ollama informa as durações em nanossegundos
+        for phase, field in (("load", "load_duration"), ("prefill", "prompt_eval_duration"), ("decode", "eval_duration")):
+            if response.get(field):
+                self._llm_phase_duration.labels(phase=phase).observe(response[field] / 1e9)
+
+    def generate_embedding(self, data: str, **kwargs) -> list:
+        with self.metrics_span("embedding"):
+            return super().generate_embedding(data, **kwargs)
+
+    def get_related_context(self, question: str, **kwargs):
+        with self.metrics_span("retrieval"):
+            return super().get_related_context(question, **kwargs)
+
+    def _search_collection(self, collection_name: str, embedding: list) -> list:
+        if self.metrics_registry is None:
+            return super()._search_collection(collection_name, embedding)
+
+        start = time.perf_counter()
+        try:
+            return super()._search_collection(collection_name, embedding)
+        finally:
+            self._vector_search_duration.labels(collection=collection_name).observe(time.perf_counter() - start)
+
+    def get_sql_prompt(self, *args, **kwargs):
+        with self.metrics_span("prompt"):
+            return super().get_sql_prompt(*args, **kwargs)
+
+    def submit_prompt(self, prompt, **kwargs) -> str:
+        with self.metrics_span("llm"):
+            return super().submit_prompt(prompt, **kwargs)
+
+    def submit_prompt_stream(self, prompt, **kwargs) -> Iterator[str]:
+        with self.metrics_span("llm_stream"):
+            yield from super().submit_prompt_stream(prompt, **kwargs)
+
+    def run_sql(self, sql: str, **kwargs):
+        with self.metrics_span("sql"):
+            return super().run_sql(sql, **kwargs)
+
+    def generate_plotly_code(self, *args, **kwargs) -> str:
+        with self.metrics_span("chart"):
+            return super().generate_plotly_code(*args, **kwargs)
+
+    def get_plotly_figure(self, *args, **kwargs):
+        with self.metrics_span("chart_render"):
+            return super().get_plotly_figure(*args, **kwargs)
+
+    def generate_followup_questions(self, *args, **kwargs) -> list:
+        with self.metrics_span("followup"):
+            return super().generate_followup_questions(*args, **kwargs)
+
+    def generate_summary(self, *args, **kwargs) -> str:
+        with self.metrics_span("summary"):
+            return super().generate_summary(*args, **kwargs)
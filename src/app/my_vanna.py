@@ -0,0 +1,108 @@
+from vanna.ollama import Ollama
+from vanna.qdrant import Qdrant_VectorStore
+from qdrant_client import QdrantClient
+
+from background import BackgroundGenerationMixin
+from charts import ChartMixin
+from collection_profile import CollectionProfileMixin
+from direct_sql import DirectSQLMixin
+from embedding_batcher import EmbeddingBatcherMixin
+from embedding_cache import EmbeddingCacheMixin
+from indexes import IndexAdvisorMixin
+from metrics import MetricsMixin
+from ollama_scheduler import OllamaSchedulerMixin
+from postgres import PostgresPoolMixin
+from prompt_packer import PromptPackerMixin
+from query_guard import QueryGuardMixin
+from query_log import QueryLogMixin
+from result_cache import ResultCacheMixin
+from retrieval import RetrievalMixin
+from rollups import RollupMixin
+from schema_sync import SchemaSyncMixin
+from snapshots import SnapshotMixin
+from sql_cache import SemanticCacheMixin
+from streaming import StreamingMixin
+from training import TrainingMixin
+from warmup import WarmupMixin
+
+
+class MyVanna(
+    WarmupMixin,
+    MetricsMixin,
+    SemanticCacheMixin,
+    BackgroundGenerationMixin,
+    ChartMixin,
+    OllamaSchedulerMixin,
+    DirectSQLMixin,
+    StreamingMixin,
+    CollectionProfileMixin,
+    RetrievalMixin,
+    PromptPackerMixin,
+    EmbeddingCacheMixin,
+    EmbeddingBatcherMixin,
+    SchemaSyncMixin,
+    SnapshotMixin,
+    TrainingMixin,
+    QueryLogMixin,
+    RollupMixin,
+    IndexAdvisorMixin,
+    ResultCacheMixin,
+    QueryGuardMixin,
+    PostgresPoolMixin,
+    Qdrant_VectorStore,
+    Ollama,
+):
+    def __init__(self, config=None):
+        
+        if config is None:
+            config = {}
+            
+            
+        qdrant_client = QdrantClient(url="localhost", port=6333)
+        
+        qdrant_config = {'client': qdrant_client}
+        ollama_config = {
+            'model': 'llama2:7b',  # Specify the model name
+            'url': 'http://localhost:11434',  # Default Ollama API endpoint
+            # Mantém o modelo carregado entre perguntas (o padrão do Ollama é 5 minutos)
+            'keep_alive': '30m',
+            # O Ollama do Vanna só repassa ao modelo o que estiver em 'options'
+            'options': {
+                'temperature': 0.7,  # Optional: adjust temperature for response randomness
+                'num_ctx': 4096,     # Context window size
+                'num_thread': 4      # Number of threads to use
+            }
+        }
+        
+        config = {**qdrant_config, **ollama_config, **config}
+        SemanticCacheMixin.__init__(self, config=config)
+        BackgroundGenerationMixin.__init__(self, config=config)
+        ChartMixin.__init__(self, config=config)
+        OllamaSchedulerMixin.__init__(self, config=config)
+        DirectSQLMixin.__init__(self, config=config)
+        MetricsMixin.__init__(self, config=config)
+        CollectionProfileMixin.__init__(self, config=config)
+        RetrievalMixin.__init__(self, config=config)
+        PromptPackerMixin.__init__(self, config=config)
+        EmbeddingCacheMixin.__init__(self, config=config)
+        EmbeddingBatcherMixin.__init__(self, config=config)
+        SchemaSyncMixin.__init__(self, config=config)
+        SnapshotMixin.__init__(self, config=config)
+        TrainingMixin.__init__(self, config=config)
+        QueryLogMixin.__init__(self, config=config)
+        RollupMixin.__init__(self, config=config)
+        ResultCacheMixin.__init__(self, config=config)
+        QueryGuardMixin.__init__(self, config=config)
+        PostgresPoolMixin.__init__(self, config=config)
+        Qdrant_VectorStore.__init__(self, config=config)
+        Ollama.__init__(self, config=config)
+
+    def close(self):
+        # Libera os recursos compartilhados entre as threads do worker
+        self._retrieval_executor.shutdown(wait=False)
+        if self.embedding_batcher is not None:
+            self.embedding_batcher.close()
+        if self.background_jobs is not None:
+            self.background_jobs.close()
+        self._client.close()
+        PostgresPoolMixin.close(self)
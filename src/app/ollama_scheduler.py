@@ -0,0 +1,191 @@
+import hashlib
+import heapq
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Callable, Iterator
+
+# Quanto menor, antes a chamada sai da fila
+PRIORITY_SQL = 0
+PRIORITY_CHART = 1
+PRIORITY_BACKGROUND = 2
+
+_priority = ContextVar("ollama_priority", default=PRIORITY_SQL)
+
+
+class OllamaScheduler:
+    """
+    Fila de chamadas ao Ollama com concorrência limitada.
+
+    No máximo `max_concurrency` gerações rodam ao mesmo tempo; as demais esperam
+    em uma fila ordenada por prioridade e, dentro da mesma prioridade, por ordem
+    de chegada. Chamadas com a mesma chave enquanto uma geração idêntica ainda
+    está na fila ou rodando esperam por ela em vez de gerar de novo.
+    """
+
+    def __init__(self, max_concurrency: int = 1):
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        self.started = 0
+        self.completed = 0
+        self.deduplicated = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._in_flight = {}
+        self._condition = threading.Condition()
+
+    def run(self, key: str, fn: Callable, priority: int = PRIORITY_SQL):
+        with self._condition:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            with self.slot(priority):
+                result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._condition:
+                del self._in_flight[key]
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_SQL):
+        """
+        Espera a vez na fila e ocupa uma das `max_concurrency` gerações até o fim
+        do bloco.
+        """
+        ticket = (priority, next(self._sequence))
+        enqueued_at = time.monotonic()
+
+        with self._condition:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while self._queue[0] != ticket or self.running >= self.max_concurrency:
+                    self._condition.wait()
+            except BaseException:
+                # Um ticket abandonado na frente da fila travaria todas as chamadas seguintes
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+                raise
+
+            heapq.heappop(self._queue)
+            self.running += 1
+            self.started += 1
+
+            waited = time.monotonic() - enqueued_at
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            # Libera o próximo da fila caso ainda haja vaga
+            self._condition.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.running -= 1
+                self.completed += 1
+                self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "queue_depth": len(self._queue),
+                "running": self.running,
+                "max_concurrency": self.max_concurrency,
+                "completed": self.completed,
+                "deduplicated": self.deduplicated,
+                "mean_wait": self.total_wait / self.started if self.started else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+class OllamaSchedulerMixin:
+    """
+    Passa as chamadas ao Ollama pelo `OllamaScheduler`.
+
+    A geração de SQL (incluindo a reescrita da pergunta que a antecede) tem
+    prioridade sobre a de código de gráfico, e esta sobre perguntas de follow-up,
+    resumos e perguntas geradas a partir de SQL. Prompts idênticos
+    (mesmo modelo, opções e mensagens) em andamento são gerados uma única vez.
+    O streaming respeita a fila e o limite de concorrência, mas não é deduplicado.
+
+    Config:
+        - ollama_cpus: CPUs disponíveis para o Ollama. Padrão: 4.
+        - ollama_max_concurrency: Gerações simultâneas. Padrão: `ollama_cpus`
+          dividido pelo `num_thread` das opções do Ollama, no mínimo 1.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        num_thread = config.get("options", {}).get("num_thread", 1)
+        max_concurrency = config.get(
+            "ollama_max_concurrency", max(1, config.get("ollama_cpus", 4) // num_thread)
+        )
+        self.ollama_scheduler = OllamaScheduler(max_concurrency=max_concurrency)
+
+    @contextmanager
+    def ollama_priority(self, priority: int):
+        """
+        Example:
+        ```python
+        with vn.ollama_priority(PRIORITY_BACKGROUND):
+            vn.submit_prompt(prompt)
+        ```
+
+        Define a prioridade das chamadas ao Ollama feitas dentro do bloco.
+        """
+        token = _priority.set(priority)
+        try:
+            yield
+        finally:
+            _priority.reset(token)
+
+    def submit_prompt(self, prompt, **kwargs) -> str:
+        key = hashlib.sha256(
+            json.dumps([self.model, self.ollama_options, prompt], sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+        return self.ollama_scheduler.run(
+            key, partial(super().submit_prompt, prompt, **kwargs), priority=_priority.get()
+        )
+
+    def submit_prompt_stream(self, prompt, **kwargs) -> Iterator[str]:
+        with self.ollama_scheduler.slot(_priority.get()):
+            yield from super().submit_prompt_stream(prompt, **kwargs)
+
+    def generate_plotly_code(self, *args, **kwargs) -> str:
+        with self.ollama_priority(PRIORITY_CHART):
+            return super().generate_plotly_code(*args, **kwargs)
+
+    def generate_followup_questions(self, *args, **kwargs) -> list:
+        with self.ollama_priority(PRIORITY_BACKGROUND):
+            return super().generate_followup_questions(*args, **kwargs)
+
+    def generate_summary(self, *args, **kwargs) -> str:
+        with self.ollama_priority(PRIORITY_BACKGROUND):
+            return super().generate_summary(*args, **kwargs)
+
+    def generate_question(self, *args, **kwargs) -> str:
+        with self.ollama_priority(PRIORITY_BACKGROUND):
+            return super().generate_question(*args, **kwargs)
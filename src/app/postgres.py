@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+import pandas as pd
+from vanna.exceptions import DependencyError, ImproperlyConfigured, ValidationError
+
+_statement_timeout = ContextVar("statement_timeout", default=None)
+
+
+class PostgresPoolMixin:
+    """
+    Conexão com o PostgreSQL por um pool de conexões, no lugar da conexão nova a
+    cada consulta do `connect_to_postgres` do Vanna.
+
+    `run_sql` continua devolvendo um DataFrame completo; `run_sql_stream` usa um
+    cursor do lado do servidor e devolve DataFrames de tamanho fixo, mantendo a
+    memória limitada independentemente do tamanho do resultado.
+
+    Config:
+        - pg_min_connections: Conexões abertas mantidas no pool. Padrão: 1.
+        - pg_max_connections: Máximo de conexões simultâneas. Padrão: 10.
+        - pg_health_check_interval: Segundos ociosa após os quais a conexão é testada
+          com `SELECT 1` antes de ser usada. Padrão: 30.
+        - pg_stream_batch_size: Linhas por lote em `run_sql_stream`. Padrão: 1000.
+        - pg_statement_timeout: `statement_timeout` em milissegundos das transações
+          do pool, ou None para usar o do banco. Padrão: None.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.pg_pool = None
+        self.pg_min_connections = config.get("pg_min_connections", 1)
+        self.pg_max_connections = config.get("pg_max_connections", 10)
+        self.pg_health_check_interval = config.get("pg_health_check_interval", 30)
+        self.pg_stream_batch_size = config.get("pg_stream_batch_size", 1000)
+        self.pg_statement_timeout = config.get("pg_statement_timeout", None)
+
+        self._pg_slots = threading.BoundedSemaphore(self.pg_max_connections)
+        self._pg_last_used = {}
+
+    def connect_to_postgres(
+        self,
+        host: str = None,
+        dbname: str = None,
+        user: str = None,
+        password: str = None,
+        port: int = None,
+        **kwargs
+    ):
+        try:
+            import psycopg2
+            import psycopg2.pool
+        except ImportError:
+            raise DependencyError(
+                "You need to install required dependencies to execute this method,"
+                " run command: \npip install vanna[postgres]"
+            )
+
+        host = host or os.getenv("HOST")
+        if not host:
+            raise ImproperlyConfigured("Please set your postgres host")
+
+        dbname = dbname or os.getenv("DATABASE")
+        if not dbname:
+            raise ImproperlyConfigured("Please set your postgres database")
+
+        user = user or os.getenv("PG_USER")
+        if not user:
+            raise ImproperlyConfigured("Please set your postgres user")
+
+        password = password or os.getenv("PASSWORD")
+        if not password:
+            raise ImproperlyConfigured("Please set your postgres password")
+
+        port = port or os.getenv("PORT")
+        if not port:
+            raise ImproperlyConfigured("Please set your postgres port")
+
+        try:
+            self.pg_pool = psycopg2.pool.ThreadedConnectionPool(
+                self.pg_min_connections,
+                self.pg_max_connections,
+                host=host,
+                dbname=dbname,
+                user=user,
+                password=password,
+                port=port,
+                **kwargs
+            )
+        except psycopg2.Error as e:
+            raise ValidationError(e)
+
+        self.dialect = "PostgreSQL"
+        self.run_sql_is_set = True
+
+    @contextmanager
+    def pg_connection(self):
+        """
+        Empresta uma conexão saudável do pool. Se todas estiverem em uso, espera
+        uma ser devolvida em vez de falhar. A transação é sempre encerrada antes
+        da conexão voltar ao pool.
+        """
+        import psycopg2
+
+        if self.pg_pool is None:
+            raise Exception(
+                "You need to connect to a database first by running vn.connect_to_postgres()"
+            )
+
+        with self._pg_slots:
+            conn = self._checkout_healthy_connection()
+            try:
+                timeout = _statement_timeout.get() or self.pg_statement_timeout
+                if timeout:
+                    # SET LOCAL vale só para esta transação, desfeita ao devolver a conexão
+                    with conn.cursor() as cs:
+                        cs.execute("SET LOCAL statement_timeout = %s", (int(timeout),))
+
+                yield conn
+            except psycopg2.Error as e:
+                if not conn.closed:
+                    conn.rollback()
+                raise ValidationError(e)
+            finally:
+                if not conn.closed:
+                    conn.rollback()
+                self._pg_last_used[id(conn)] = time.monotonic()
+                self.pg_pool.putconn(conn, close=bool(conn.closed))
+
+    @contextmanager
+    def statement_timeout(self, milliseconds: int):
+        """
+        Example:
+        ```python
+        with vn.statement_timeout(5000):
+            vn.run_sql(sql)
+        ```
+
+        Define o `statement_timeout` das conexões emprestadas dentro do bloco.
+        """
+        token = _statement_timeout.set(milliseconds)
+        try:
+            yield
+        finally:
+            _statement_timeout.reset(token)
+
+    def run_sql(self, sql: str, **kwargs) -> pd.DataFrame:
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(sql)
+
+                if cs.description is None:
+                    return pd.DataFrame()
+
+                return pd.DataFrame(cs.fetchall(), columns=[desc[0] for desc in cs.description])
+
+    def run_sql_stream(self, sql: str, batch_size: int = None, **kwargs) -> Iterator[pd.DataFrame]:
+        """
+        Example:
+        ```python
+        for df in vn.run_sql_stream("SELECT * FROM compras", batch_size=500):
+            print(len(df))
+        ```
+
+        Executa o SQL com um cursor nomeado (do lado do servidor), devolvendo o
+        resultado em DataFrames de até `batch_size` linhas.
+        """
+        batch_size = batch_size or self.pg_stream_batch_size
+
+        with self.pg_connection() as conn:
+            with conn.cursor(name=f"vanna_{uuid.uuid4().hex}") as cs:
+                cs.itersize = batch_size
+                cs.execute(sql)
+
+                columns = None
+                while True:
+                    rows = cs.fetchmany(batch_size)
+                    if columns is None:
+                        columns = [desc[0] for desc in cs.description]
+                    if not rows:
+                        break
+                    yield pd.DataFrame(rows, columns=columns)
+
+    def close(self):
+        if self.pg_pool is not None:
+            self.pg_pool.closeall()
+            self.pg_pool = None
+
+    def _checkout_healthy_connection(self):
+        # Tenta no máximo uma conexão a mais que o pool, para não ficar em loop se o banco caiu
+        for _ in range(self.pg_max_connections + 1):
+            conn = self.pg_pool.getconn()
+
+            if not conn.closed:
+                idle = time.monotonic() - self._pg_last_used.get(id(conn), 0)
+                if idle < self.pg_health_check_interval or self._is_alive(conn):
+                    return conn
+
+            self._pg_last_used.pop(id(conn), None)
+            self.pg_pool.putconn(conn, close=True)
+
+        raise ValidationError("Could not get a healthy connection from the postgres pool")
+
+    @staticmethod
+    def _is_alive(conn) -> bool:
+        try:
+            with conn.cursor() as cs:
+                cs.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
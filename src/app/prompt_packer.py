@@ -0,0 +1,182 @@
+import os
+
+import sqlparse
+from vanna.exceptions import DependencyError
+
+from result_cache import normalize_sql
+
+# Custo aproximado em tokens da marcação de cada mensagem no template de chat
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class PromptPackerMixin:
+    """
+    Monta o prompt de `get_sql_prompt` dentro de um orçamento de tokens.
+
+    Os DDLs são quebrados em comandos e os comandos repetidos entre itens são
+    descartados, assim como exemplos com o mesmo SQL e documentações iguais. O que
+    sobra é ordenado pelo score da busca no Qdrant (`related_context`), relativo ao
+    melhor item do mesmo tipo, e entra no prompt, do mais relevante para o menos,
+    enquanto couber no orçamento.
+
+    Config:
+        - prompt_token_budget: Tokens disponíveis para o prompt. Padrão: `num_ctx`
+          menos `prompt_response_tokens`.
+        - prompt_response_tokens: Tokens reservados para a resposta do modelo. Padrão: 512.
+        - prompt_tokenizer: Caminho de um `tokenizer.json` ou nome do tokenizer no
+          Hugging Face Hub, contado com a lib `tokenizers`. Sem ele, os tokens são
+          estimados pelo tamanho do texto. Padrão: None.
+        - prompt_chars_per_token: Caracteres por token na estimativa. Padrão: 3.5.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        num_ctx = config.get("options", {}).get("num_ctx", 2048)
+        self.prompt_token_budget = config.get(
+            "prompt_token_budget", num_ctx - config.get("prompt_response_tokens", 512)
+        )
+        self.prompt_chars_per_token = config.get("prompt_chars_per_token", 3.5)
+
+        self.prompt_tokenizer = None
+        if config.get("prompt_tokenizer") is not None:
+            self.prompt_tokenizer = self._load_tokenizer(config["prompt_tokenizer"])
+
+    def count_tokens(self, text: str) -> int:
+        if self.prompt_tokenizer is not None:
+            return len(self.prompt_tokenizer.encode(text, add_special_tokens=False).ids)
+        return int(len(text) / self.prompt_chars_per_token) + 1
+
+    def count_prompt_tokens(self, message_log: list) -> int:
+        return sum(
+            self.count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+            for message in message_log
+        )
+
+    def get_sql_prompt(
+        self,
+        initial_prompt: str,
+        question: str,
+        question_sql_list: list,
+        ddl_list: list,
+        doc_list: list,
+        **kwargs,
+    ):
+        context = kwargs.get("related_context")
+
+        full_prompt = super().get_sql_prompt(
+            initial_prompt, question, list(question_sql_list), list(ddl_list), list(doc_list), **kwargs
+        )
+        full_tokens = self.count_prompt_tokens(full_prompt)
+
+        candidates = self._rank_candidates(
+            self._dedup_examples(question_sql_list, getattr(context, "question_sql_scores", None)),
+            self._dedup_ddl(ddl_list, getattr(context, "ddl_scores", None)),
+            self._dedup_documentation(doc_list, getattr(context, "doc_scores", None)),
+        )
+
+        # Prompt só com as partes fixas (instruções, documentação estática e pergunta)
+        packed = {"sql": [], "ddl": [], "documentation": []}
+        used_tokens = self.count_prompt_tokens(
+            super().get_sql_prompt(initial_prompt, question, [], [], [], **kwargs)
+        )
+
+        for _, kind, item, tokens in candidates:
+            # O primeiro item de DDL ou documentação também paga o cabeçalho da seção
+            if kind != "sql" and not packed[kind]:
+                tokens += self.count_tokens("\n===Tables \n" if kind == "ddl" else "\n===Additional Context \n\n")
+
+            if used_tokens + tokens > self.prompt_token_budget:
+                continue
+
+            packed[kind].append(item)
+            used_tokens += tokens
+
+        prompt = super().get_sql_prompt(
+            initial_prompt, question, packed["sql"], packed["ddl"], packed["documentation"], **kwargs
+        )
+        prompt_tokens = self.count_prompt_tokens(prompt)
+
+        self.log(
+            title="Prompt",
+            message=(
+                f"{prompt_tokens} tokens (sem o empacotamento: {full_tokens}, "
+                f"economizados: {full_tokens - prompt_tokens}, orçamento: {self.prompt_token_budget})"
+            ),
+        )
+
+        return prompt
+
+    def _rank_candidates(self, examples: list, ddl: list, documentation: list) -> list:
+        candidates = []
+        for kind, items in (("sql", examples), ("ddl", ddl), ("documentation", documentation)):
+            # Pergunta x pergunta sempre tem score maior que pergunta x DDL, então os
+            # scores são comparados relativos ao melhor item de cada tipo
+            best_score = max((score for score, _ in items), default=0) or 1
+            for score, item in items:
+                score = score / best_score
+                if kind == "sql":
+                    tokens = (
+                        self.count_tokens(item["question"])
+                        + self.count_tokens(item["sql"])
+                        + 2 * MESSAGE_OVERHEAD_TOKENS
+                    )
+                else:
+                    tokens = self.count_tokens(f"{item}\n\n")
+                candidates.append((score, kind, item, tokens))
+
+        # sorted é estável: com scores iguais, mantém a ordem da busca
+        return sorted(candidates, key=lambda candidate: -candidate[0])
+
+    @staticmethod
+    def _scores(items: list, scores: list = None) -> list:
+        # Sem os scores do Qdrant, a posição na busca define a relevância
+        if scores is None or len(scores) != len(items):
+            return [1 / (position + 1) for position in range(len(items))]
+        return list(scores)
+
+    def _dedup_examples(self, question_sql_list: list, scores: list = None) -> list:
+        seen = {}
+        for score, example in zip(self._scores(question_sql_list, scores), question_sql_list):
+            if example is None or "question" not in example or "sql" not in example:
+                continue
+
+            key = normalize_sql(example["sql"])
+            if key not in seen or score > seen[key][0]:
+                seen[key] = (score, example)
+
+        return list(seen.values())
+
+    def _dedup_ddl(self, ddl_list: list, scores: list = None) -> list:
+        seen = {}
+        for score, ddl in zip(self._scores(ddl_list, scores), ddl_list):
+            for statement in sqlparse.split(ddl):
+                key = normalize_sql(statement)
+                if key and (key not in seen or score > seen[key][0]):
+                    seen[key] = (score, statement)
+
+        return list(seen.values())
+
+    def _dedup_documentation(self, doc_list: list, scores: list = None) -> list:
+        seen = {}
+        for score, documentation in zip(self._scores(doc_list, scores), doc_list):
+            key = " ".join(documentation.split())
+            if key and (key not in seen or score > seen[key][0]):
+                seen[key] = (score, documentation.strip())
+
+        return list(seen.values())
+
+    @staticmethod
+    def _load_tokenizer(name: str):
+        try:
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise DependencyError(
+                "You need to install required dependencies to execute this method, run command:"
+                " \npip install tokenizers"
+            )
+
+        if os.path.exists(name):
+            return Tokenizer.from_file(name)
+        return Tokenizer.from_pretrained(name)
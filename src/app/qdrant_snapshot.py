@@ -0,0 +1,65 @@
+import argparse
+
+import corpus
+from my_vanna import MyVanna
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Exporta e restaura snapshots das collections do Vanna no Qdrant"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Cria um snapshot das collections")
+    export_parser.add_argument("--tag", default=None, help="Versão do snapshot. Padrão: data e hora")
+
+    restore_parser = subparsers.add_parser(
+        "restore",
+        help="Restaura um snapshot e treina só o que mudou no corpus e no schema desde a exportação",
+    )
+    restore_parser.add_argument(
+        "--tag", default=None, help="Versão do snapshot. Padrão: o mais recente do mesmo modelo de embedding"
+    )
+    restore_parser.add_argument(
+        "--skip-schema", action="store_true", help="Não sincroniza a documentação do schema com o banco"
+    )
+
+    subparsers.add_parser("list", help="Lista os snapshots e se são compatíveis com o modelo de embedding")
+    args = parser.parse_args()
+
+    vn = MyVanna()
+
+    if args.command == "export":
+        manifest = vn.export_snapshot(args.tag)
+        for collection_name, collection in manifest["collections"].items():
+            print(f"{collection_name}: {collection['points']} pontos em {collection['snapshot']}")
+        print(f"Snapshot {manifest['tag']} exportado ({manifest['fastembed_model']}).")
+
+    elif args.command == "restore":
+        # Sem snapshot compatível, o corpus inteiro é treinado, como no train_model.py
+        result = vn.restore_or_train(
+            args.tag,
+            question_sql=corpus.QUESTION_SQL,
+            ddl=corpus.DDL,
+            documentation=corpus.DOCUMENTATION,
+        )
+        print(f"Snapshot restaurado: {result['restored'] or 'nenhum'}")
+        print(
+            f"Corpus: {result['added']} adicionados, {result['removed']} removidos, "
+            f"{result['unchanged']} inalterados"
+        )
+
+        if not args.skip_schema:
+            vn.connect_to_postgres(host='localhost', dbname='geekmaster', user='admin', password='admin', port='5432')
+            vn.sync_schema()
+
+    else:
+        for manifest in vn.list_snapshots():
+            problems = vn.check_snapshot_compatibility(manifest)
+            points = sum(collection["points"] for collection in manifest["collections"].values())
+            print(
+                f"{manifest['tag']} ({manifest['created_at']}): {points} pontos, {manifest['fastembed_model']}"
+                f" - {'; '.join(problems) if problems else 'compatível'}"
+            )
+
+    vn.close()
@@ -0,0 +1,263 @@
+import re
+import time
+from typing import Iterator
+
+import pandas as pd
+from vanna.exceptions import ValidationError
+
+from result_cache import is_read_only, normalize_sql
+
+# SQLSTATE do Postgres para consultas canceladas pelo statement_timeout
+QUERY_CANCELED = "57014"
+
+_QUOTED = re.compile(r"""("(?:[^"]|"")*"|'(?:[^']|'')*')""")
+
+
+class QueryRejected(ValidationError):
+    """
+    SQL recusado pela `QueryGuardMixin`. `explanation` traz o custo e as linhas
+    estimadas, os limites e os motivos, para a interface exibir.
+    """
+
+    def __init__(self, message: str, explanation: dict):
+        super().__init__(message)
+        self.explanation = explanation
+
+
+def limit_sql(sql: str, limit: int) -> str:
+    """
+    Aplica o LIMIT no próprio SQL, no nível mais externo, para valer o ORDER BY
+    dele: uma subconsulta com ORDER BY não garante a ordem da consulta de fora.
+    Um LIMIT (ou FETCH FIRST) já existente fica com o menor dos dois valores; sem
+    ele, o LIMIT vai no fim, onde também vale para UNIONs e para a consulta
+    principal de um WITH.
+    """
+    limit = int(limit)
+    sql = normalize_sql(sql)
+    # Literais e identificadores entre aspas viram espaços, mantendo as posições
+    code = _QUOTED.sub(lambda match: match.group(0)[0] + " " * (len(match.group(0)) - 2) + match.group(0)[-1], sql)
+
+    clause = _top_level_clause(code, r"\blimit\b")
+    if clause is None:
+        clause = _top_level_clause(code, r"\bfetch\s+(?:first|next)\b")
+        if clause is None:
+            return f"{sql}\nLIMIT {limit}"
+
+        # FETCH FIRST [n] ROWS ONLY | WITH TIES; sem n, é uma linha só
+        count = re.match(r"\s*(.*?)\s*\b(?:row|rows)\b", code[clause[1] : clause[2]], re.DOTALL)
+        if count is None or not count.group(1):
+            return sql
+        start, end = clause[1] + count.start(1), clause[1] + count.end(1)
+    else:
+        start, end = clause[1], clause[2]
+        # O valor do LIMIT vai até o OFFSET, o FETCH ou uma cláusula de locking
+        following = _top_level_clause(code[:end], r"\b(?:offset|fetch|for)\b", start)
+        if following is not None:
+            end = following[0]
+
+    value = sql[start:end].strip()
+    if value.lower() == "all":
+        replacement = str(limit)
+    elif value.isdigit():
+        replacement = str(min(int(value), limit))
+    else:
+        replacement = f"(LEAST({value}, {limit}))"
+
+    return f"{sql[:start].rstrip()} {replacement} {sql[end:].lstrip()}".rstrip()
+
+
+def _top_level_clause(code: str, pattern: str, start: int = 0):
+    # (início da palavra-chave, fim dela, fim do SQL) da última ocorrência fora de parênteses
+    found = None
+    for match in re.finditer(pattern, code[start:]):
+        position = start + match.start()
+        if code.count("(", 0, position) == code.count(")", 0, position):
+            found = (position, start + match.end(), len(code))
+    return found
+
+
+def find_cartesian_joins(plan: dict) -> list:
+    """
+    Nested loops sem condição de junção: o número de linhas estimado é o produto
+    das linhas dos dois lados.
+    """
+    joins = []
+
+    children = plan.get("Plans", [])
+    if plan.get("Node Type") == "Nested Loop" and len(children) == 2 and "Join Filter" not in plan:
+        if not any(key in node for node in _walk(children[1]) for key in ("Index Cond", "Recheck Cond")):
+            joins.append(
+                " x ".join(
+                    next((node["Relation Name"] for node in _walk(child) if "Relation Name" in node), child["Node Type"])
+                    for child in children
+                )
+            )
+
+    for child in children:
+        joins.extend(find_cartesian_joins(child))
+
+    return joins
+
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+class QueryGuardMixin:
+    """
+    Confere o plano de cada SQL antes de executá-lo, para uma consulta gerada pelo
+    LLM não tomar as CPUs do banco de todos.
+
+    O `EXPLAIN (FORMAT JSON)` dá o custo e as linhas estimadas. Se as linhas
+    passarem de `query_guard_max_rows`, a consulta recebe um
+    `LIMIT query_guard_max_rows` (`limit_sql`); se o custo (já com o LIMIT) passar de
+    `query_guard_max_cost`, ela é recusada com `QueryRejected`. Em
+    `run_sql_stream`, que já mantém a memória limitada, só o custo é conferido.
+    Um DataFrame limitado leva a decisão em `df.attrs["guard"]`, e a rota
+    /api/v0/run_sql a devolve no campo "guard".
+    Toda execução roda com `statement_timeout`. Cada decisão vai para o log, com o
+    custo e as linhas, para ajustar os limites.
+
+    Só SQL de leitura (um único SELECT ou WITH) passa pelo EXPLAIN; o resto só
+    recebe o timeout.
+
+    Config:
+        - query_guard: Liga ou desliga a verificação. Padrão: True.
+        - query_guard_max_cost: Custo estimado máximo, nas unidades do planejador.
+          Padrão: 5000000.
+        - query_guard_max_rows: Linhas estimadas a partir das quais é aplicado o
+          LIMIT, que também é o valor do LIMIT. Padrão: 10000.
+        - query_guard_timeout_ms: `statement_timeout` de cada consulta. Padrão: 30000.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.query_guard = config.get("query_guard", True)
+        self.query_guard_max_cost = config.get("query_guard_max_cost", 5_000_000)
+        self.query_guard_max_rows = config.get("query_guard_max_rows", 10_000)
+        self.query_guard_timeout_ms = config.get("query_guard_timeout_ms", 30_000)
+
+    def explain_sql(self, sql: str, limit: bool = True) -> dict:
+        """
+        Example:
+        ```python
+        vn.explain_sql("SELECT * FROM compras c1 CROSS JOIN compras c2")
+        ```
+
+        Decide o que fazer com o SQL a partir do plano estimado, sem executá-lo.
+
+        Args:
+            limit (bool): Aplica o LIMIT quando as linhas estimadas passam do limite.
+              Sem ele, só o custo é conferido.
+
+        Returns:
+            dict: `action` ("allow", "limit" ou "reject"), o `sql` a executar, o
+            custo e as linhas estimadas, os limites e os motivos.
+        """
+        decision = {
+            "action": "allow",
+            "sql": sql,
+            "cost": None,
+            "rows": None,
+            "max_cost": self.query_guard_max_cost,
+            "max_rows": self.query_guard_max_rows,
+            "reasons": [],
+        }
+        if not is_read_only(sql):
+            return decision
+
+        plan = self._explain(sql)
+        decision["cost"], decision["rows"] = plan["Total Cost"], plan["Plan Rows"]
+
+        if limit and decision["rows"] > self.query_guard_max_rows:
+            decision["action"] = "limit"
+            decision["sql"] = limit_sql(sql, self.query_guard_max_rows)
+            decision["reasons"].append(
+                f"estimated {decision['rows']:,} rows, limited to {self.query_guard_max_rows:,}"
+            )
+
+            # O LIMIT pode baratear o plano (a execução para antes), então o custo é o da consulta limitada
+            plan = self._explain(decision["sql"])
+            decision["cost"] = plan["Total Cost"]
+
+        if decision["cost"] > self.query_guard_max_cost:
+            decision["action"] = "reject"
+            decision["reasons"].append(
+                f"estimated cost {decision['cost']:,.0f} exceeds the limit of {self.query_guard_max_cost:,.0f}"
+            )
+            decision["reasons"].extend(f"join without condition: {join}" for join in find_cartesian_joins(plan))
+
+        return decision
+
+    def run_sql(self, sql: str, **kwargs) -> pd.DataFrame:
+        if not self.query_guard:
+            return super().run_sql(sql, **kwargs)
+
+        with self.statement_timeout(self.query_guard_timeout_ms):
+            decision = self._guard(sql)
+            try:
+                df = super().run_sql(decision["sql"], **kwargs)
+            except ValidationError as e:
+                self._log_timeout(e, decision["sql"])
+                raise
+
+        # O resultado limitado leva a decisão junto (inclusive no cache de resultados),
+        # para a interface avisar que ele foi cortado
+        if decision["action"] == "limit":
+            df.attrs["guard"] = decision
+        return df
+
+    def run_sql_stream(self, sql: str, batch_size: int = None, **kwargs) -> Iterator[pd.DataFrame]:
+        if not self.query_guard:
+            yield from super().run_sql_stream(sql, batch_size=batch_size, **kwargs)
+            return
+
+        with self.statement_timeout(self.query_guard_timeout_ms):
+            sql = self._guard(sql, limit=False)["sql"]
+            try:
+                yield from super().run_sql_stream(sql, batch_size=batch_size, **kwargs)
+            except ValidationError as e:
+                self._log_timeout(e, sql)
+                raise
+
+    def _guard(self, sql: str, limit: bool = True) -> dict:
+        start = time.perf_counter()
+        decision = self.explain_sql(sql, limit=limit)
+        elapsed = time.perf_counter() - start
+
+        if decision["cost"] is not None:
+            self.log(
+                title="Guarda de SQL",
+                message=(
+                    f"{decision['action']}: custo {decision['cost']:,.0f} (limite {self.query_guard_max_cost:,.0f}), "
+                    f"{decision['rows']:,} linhas estimadas (limite {self.query_guard_max_rows:,}), "
+                    f"EXPLAIN em {elapsed * 1000:.1f} ms"
+                    + (f" | {'; '.join(decision['reasons'])}" if decision["reasons"] else "")
+                ),
+            )
+
+        if decision["action"] == "reject":
+            raise QueryRejected(
+                f"Query rejected: {'; '.join(decision['reasons'])}. "
+                "Try a more specific question, with filters or aggregations.",
+                explanation=decision,
+            )
+
+        return decision
+
+    def _explain(self, sql: str) -> dict:
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                return cs.fetchone()[0][0]["Plan"]
+
+    def _log_timeout(self, error: ValidationError, sql: str):
+        if getattr(error.__context__, "pgcode", None) == QUERY_CANCELED:
+            self.log(
+                title="Guarda de SQL",
+                message=f"timeout: consulta cancelada após {self.query_guard_timeout_ms} ms: {sql}",
+            )
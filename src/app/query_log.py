@@ -0,0 +1,109 @@
+import fcntl
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+DEFAULT_QUERY_LOG_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "volumes", "query_log.jsonl"
+)
+
+
+def read_query_log(path: str = DEFAULT_QUERY_LOG_PATH) -> list:
+    """
+    Lê o log de consultas (o arquivo atual e o rotacionado, `.1`), do mais antigo
+    para o mais recente.
+    """
+    entries = []
+    for file_path in (f"{path}.1", path):
+        if not os.path.exists(file_path):
+            continue
+
+        with open(file_path) as f:
+            for line in f:
+                # Linha incompleta: ainda está sendo escrita por outro processo
+                if line.endswith("\n"):
+                    entries.append(json.loads(line))
+
+    return entries
+
+
+def collect_sqls(vn) -> list:
+    """
+    SQL treinados mais os executados com sucesso (o log guarda também os que
+    falharam), para os advisors.
+    """
+    training_data = vn.get_training_data()
+    sqls = training_data[training_data["training_data_type"] == "sql"]["content"].tolist()
+    sqls += [entry["sql"] for entry in read_query_log(vn.query_log_path) if entry["error"] is None]
+    return sqls
+
+
+class QueryLogMixin:
+    """
+    Registra cada SQL executado por `run_sql` em um arquivo JSON Lines, com a
+    duração, o número de linhas e o erro, se houver. É a fonte dos advisors que
+    procuram padrões nas consultas geradas.
+
+    O arquivo é compartilhado entre os workers (cada linha é gravada com lock) e,
+    ao passar de `query_log_max_bytes`, é renomeado para `.1`, descartando o `.1`
+    anterior.
+
+    Config:
+        - query_log: Liga ou desliga o log. Padrão: True.
+        - query_log_path: Arquivo do log. Padrão: `volumes/query_log.jsonl` na
+          raiz do projeto.
+        - query_log_max_bytes: Tamanho a partir do qual o arquivo é rotacionado.
+          Padrão: 50 MB.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.query_log = config.get("query_log", True)
+        self.query_log_path = config.get("query_log_path", DEFAULT_QUERY_LOG_PATH)
+        self.query_log_max_bytes = config.get("query_log_max_bytes", 50 * 1024 * 1024)
+
+    def run_sql(self, sql: str, **kwargs) -> pd.DataFrame:
+        if not self.query_log:
+            return super().run_sql(sql, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            df = super().run_sql(sql, **kwargs)
+        except Exception as e:
+            self._append_query_log(sql, time.perf_counter() - start, error=str(e))
+            raise
+
+        self._append_query_log(sql, time.perf_counter() - start, rows=len(df))
+        return df
+
+    def _append_query_log(self, sql: str, seconds: float, rows: int = None, error: str = None):
+        line = json.dumps(
+            {
+                "ts": datetime.now().isoformat(timespec="seconds"),
+                "sql": sql,
+                "seconds": round(seconds, 4),
+                "rows": rows,
+                "error": error,
+            },
+            ensure_ascii=False,
+        )
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.query_log_path)), exist_ok=True)
+            with open(self.query_log_path, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.write(line + "\n")
+                    f.flush()
+                    if f.tell() > self.query_log_max_bytes:
+                        os.replace(self.query_log_path, f"{self.query_log_path}.1")
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        except OSError as e:
+            # O log é auxiliar: não pode derrubar a consulta
+            self.log(title="Log de consultas", message=f"Falha ao gravar {self.query_log_path}: {e}")
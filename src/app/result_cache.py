@@ -0,0 +1,294 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import pandas as pd
+
+_SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|--[^\n]*|/\*.*?\*/|\s+""", re.DOTALL)
+_LITERALS = re.compile(r"""'(?:[^']|'')*'""")
+_TOKENS = re.compile(r'"(?:[^"]|"")*"|\w+|\S')
+_IDENTIFIER = re.compile(r'"(?:[^"]|"")*"|[a-z_]\w*')
+_CTE = re.compile(r'("(?:[^"]|"")*"|\w+)(?: ?\([^()]*\))? as (?:not )?(?:materialized )?\(')
+# Primeiras palavras de uma subconsulta entre parênteses
+_QUERY_START = {"select", "with", "values"}
+# Palavras que encerram a lista do FROM
+_CLAUSES = {
+    "where", "group", "having", "order", "limit", "offset", "fetch", "window", "union", "intersect", "except", "for",
+}
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normaliza o SQL para servir de chave de cache: remove comentários e o `;`
+    final, colapsa espaços e passa para minúsculas o que está fora de literais e
+    identificadores entre aspas (o Postgres já não diferencia o resto).
+    """
+    parts = []
+    last = 0
+    for match in _SQL_TOKENS.finditer(sql):
+        if match.start() > last:
+            parts.append(sql[last : match.start()].lower())
+        # Comentários e espaços viram um único espaço; literais ficam intactos
+        if match.group(1):
+            parts.append(match.group(1))
+        elif parts and parts[-1] != " ":
+            parts.append(" ")
+        last = match.end()
+    parts.append(sql[last:].lower())
+
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def is_read_only(sql: str) -> bool:
+    code = _LITERALS.sub("''", normalize_sql(sql))
+
+    if ";" in code or not re.match(r"(select|with)\b", code):
+        return False
+
+    # CTEs que alteram dados e SELECT INTO não podem ser cacheados
+    return re.search(r"\b(insert|update|delete|merge|into)\b", code) is None
+
+
+def extract_tables(sql: str) -> Optional[set]:
+    """
+    As tabelas lidas pelo SQL: os nomes depois de FROM (inclusive os da lista
+    separada por vírgulas) e de JOIN, sem os CTEs. O FROM de funções como
+    `extract(dow from col)` não conta.
+
+    Devolve None quando não dá para ter certeza das tabelas (funções ou junções
+    entre parênteses no FROM, parênteses desbalanceados); nesse caso o
+    resultado não deve ser cacheado.
+    """
+    # Tira os literais para não confundir "from" dentro de strings com uma tabela
+    code = _LITERALS.sub("''", normalize_sql(sql))
+    tokens = _TOKENS.findall(code)
+    ctes = {name.replace('"', "") for name in _CTE.findall(code)}
+
+    tables = set()
+    # Para cada parêntese aberto, se ele começa uma subconsulta
+    queries = []
+    for i, token in enumerate(tokens):
+        if token == "(":
+            queries.append(i + 1 < len(tokens) and tokens[i + 1] in _QUERY_START)
+        elif token == ")":
+            if not queries:
+                return None
+            queries.pop()
+        elif token == "join" or (token == "from" and (not queries or queries[-1]) and tokens[i - 1] != "distinct"):
+            names = _from_list(tokens, i + 1, single=token == "join")
+            if names is None:
+                return None
+            tables |= names - ctes
+
+    return tables if not queries else None
+
+
+def _from_list(tokens: list, start: int, single: bool) -> Optional[set]:
+    # Lê a referência em `start` e, se não for um JOIN, as que vêm depois das
+    # vírgulas no mesmo nível, até a próxima cláusula
+    names = set()
+    i = start
+    while True:
+        while i < len(tokens) and tokens[i] in ("lateral", "only"):
+            i += 1
+        if i >= len(tokens):
+            return None
+
+        if tokens[i] == "(":
+            # Subconsulta: as tabelas dela aparecem nos FROM de dentro dos parênteses
+            if i + 1 >= len(tokens) or tokens[i + 1] not in _QUERY_START:
+                return None
+        elif _IDENTIFIER.fullmatch(tokens[i]):
+            name = tokens[i]
+            while i + 2 < len(tokens) and tokens[i + 1] == "." and _IDENTIFIER.fullmatch(tokens[i + 2]):
+                i += 2
+                name = tokens[i]
+            # Funções que devolvem tabelas (generate_series, unnest...) podem ler qualquer coisa
+            if i + 1 < len(tokens) and tokens[i + 1] == "(":
+                return None
+            names.add(name.replace('"', ""))
+        else:
+            return None
+
+        if single:
+            return names
+
+        depth = 0
+        for i in range(i, len(tokens)):
+            if tokens[i] == "(":
+                depth += 1
+            elif tokens[i] == ")":
+                depth -= 1
+                if depth < 0:
+                    return names
+            elif depth == 0 and (tokens[i] in _CLAUSES or tokens[i] == ","):
+                break
+        else:
+            return names
+
+        if tokens[i] != ",":
+            return names
+        i += 1
+
+
+class QueryResultCache:
+    """
+    Cache de resultados do `run_sql`, com chave no SQL normalizado.
+
+    Cada entrada guarda as tabelas lidas e uma assinatura delas tirada antes da
+    execução; se a assinatura atual for diferente (as tabelas mudaram) ou a
+    entrada passar do `ttl`, ela é descartada. O total de memória dos DataFrames
+    fica limitado a `max_bytes`, descartando os menos usados recentemente.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, ttl: float = 300):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, signature) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            df, _, entry_signature, size, created_at = entry
+            if entry_signature != signature or time.monotonic() - created_at > self.ttl:
+                self._discard(key)
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return df
+
+    def set(self, key: str, df: pd.DataFrame, tables: set, signature):
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+
+            self._entries[key] = (df, tables, signature, size, time.monotonic())
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_tables(self, tables: set):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[1] & tables]:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+        }
+
+    def _discard(self, key: str):
+        self.bytes -= self._entries.pop(key)[3]
+
+
+class ResultCacheMixin:
+    """
+    Coloca o `QueryResultCache` na frente de `run_sql`. Só consultas de leitura
+    (um único SELECT) que leem tabelas identificadas por `extract_tables` são
+    guardadas.
+
+    A mudança nas tabelas é detectada pelos contadores de `pg_stat_user_tables`
+    (inserts, updates e deletes) e pelo `relfilenode` de `pg_class`, que muda em
+    TRUNCATE. Escritas feitas por outras conexões só aparecem nesses contadores
+    depois de alguns segundos (até ~10s em conexões ociosas no Postgres 15+);
+    o `result_cache_ttl` limita quanto tempo um resultado pode ficar desatualizado.
+
+    Config:
+        - result_cache: Liga ou desliga o cache. Padrão: True.
+        - result_cache_max_bytes: Memória máxima dos resultados em cache. Padrão: 256 MB.
+        - result_cache_ttl: Tempo de vida de um resultado, em segundos. Padrão: 300.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.result_cache = None
+        if config.get("result_cache", True):
+            self.result_cache = QueryResultCache(
+                max_bytes=config.get("result_cache_max_bytes", 256 * 1024 * 1024),
+                ttl=config.get("result_cache_ttl", 300),
+            )
+
+    def run_sql(self, sql: str, **kwargs) -> pd.DataFrame:
+        if self.result_cache is None or not is_read_only(sql):
+            return super().run_sql(sql, **kwargs)
+
+        tables = extract_tables(sql)
+        if not tables:
+            # Sem saber o que a consulta lê, não há como invalidar o resultado
+            return super().run_sql(sql, **kwargs)
+
+        key = normalize_sql(sql)
+        signature = self._get_tables_signature(tables)
+
+        df = self.result_cache.get(key, signature)
+        if df is not None:
+            self.log(title="Cache de resultados", message=f"Hit para: {key}")
+            return df.copy()
+
+        df = super().run_sql(sql, **kwargs)
+        self.result_cache.set(key, df.copy(), tables, signature)
+
+        return df
+
+    def invalidate_result_cache(self, tables: set = None):
+        """
+        Descarta os resultados que leram alguma das `tables`, ou todos se nenhuma
+        tabela for informada.
+        """
+        if self.result_cache is None:
+            return
+
+        if tables is None:
+            self.result_cache.clear()
+        else:
+            self.result_cache.invalidate_tables(set(tables))
+
+    def _get_tables_signature(self, tables: set):
+        if not tables or self.pg_pool is None:
+            return None
+
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(
+                    """
+                    SELECT c.relname, c.relfilenode,
+                           COALESCE(s.n_tup_ins, 0), COALESCE(s.n_tup_upd, 0), COALESCE(s.n_tup_del, 0)
+                    FROM pg_class c
+                    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+                    WHERE c.relname = ANY(%s)
+                    ORDER BY c.relname
+                    """,
+                    (sorted(tables),),
+                )
+                return tuple(cs.fetchall())
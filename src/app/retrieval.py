@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+
+class RelatedContext(NamedTuple):
+    question_sql_list: list
+    ddl_list: list
+    doc_list: list
+    question_sql_scores: list
+    ddl_scores: list
+    doc_scores: list
+
+
+class RetrievalMixin:
+    """
+    Busca o contexto do prompt (pares pergunta/SQL, DDL e documentação) com um
+    único embedding da pergunta e as três buscas no Qdrant em paralelo, em vez
+    das três chamadas seriais do `Qdrant_VectorStore`.
+
+    Config:
+        - retrieval_workers: Threads usadas para as buscas. Padrão: 3.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self._retrieval_executor = ThreadPoolExecutor(
+            max_workers=config.get("retrieval_workers", 3),
+            thread_name_prefix="retrieval",
+        )
+
+    def get_related_context(self, question: str, embedding: list = None, **kwargs) -> RelatedContext:
+        """
+        Example:
+        ```python
+        context = vn.get_related_context("Qual é o histórico de vendas por mês?")
+        context.ddl_list
+        ```
+
+        Retorna os três contextos usados por `generate_sql` em uma única chamada,
+        ordenados por relevância e com os scores de cada item. Se o `embedding` da
+        pergunta já tiver sido calculado, ele é reaproveitado.
+        """
+        if embedding is None:
+            embedding = self.generate_embedding(question)
+
+        sql_future, ddl_future, doc_future = (
+            self._retrieval_executor.submit(self._search_collection, collection_name, embedding)
+            for collection_name in (
+                self.sql_collection_name,
+                self.ddl_collection_name,
+                self.documentation_collection_name,
+            )
+        )
+        sql_points = sql_future.result()
+        ddl_points = ddl_future.result()
+        doc_points = doc_future.result()
+
+        return RelatedContext(
+            question_sql_list=[dict(point.payload) for point in sql_points],
+            ddl_list=[point.payload["ddl"] for point in ddl_points],
+            doc_list=[point.payload["documentation"] for point in doc_points],
+            question_sql_scores=[point.score for point in sql_points],
+            ddl_scores=[point.score for point in ddl_points],
+            doc_scores=[point.score for point in doc_points],
+        )
+
+    def generate_sql(self, question: str, allow_llm_to_see_data=False, **kwargs) -> str:
+        # O contexto segue pelos kwargs até os três getters chamados pelo VannaBase
+        if kwargs.get("related_context") is None:
+            kwargs["related_context"] = self.get_related_context(question)
+
+        return super().generate_sql(question, allow_llm_to_see_data=allow_llm_to_see_data, **kwargs)
+
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        context = kwargs.get("related_context")
+        if context is not None:
+            return list(context.question_sql_list)
+        return super().get_similar_question_sql(question, **kwargs)
+
+    def get_related_ddl(self, question: str, **kwargs) -> list:
+        context = kwargs.get("related_context")
+        if context is not None:
+            return list(context.ddl_list)
+        return super().get_related_ddl(question, **kwargs)
+
+    def get_related_documentation(self, question: str, **kwargs) -> list:
+        context = kwargs.get("related_context")
+        if context is not None:
+            return list(context.doc_list)
+        return super().get_related_documentation(question, **kwargs)
+
+    def _get_search_params(self):
+        # Parâmetros de busca do Qdrant (ef, rescore); None usa os padrões da collection
+        return None
+
+    def _search_collection(self, collection_name: str, embedding: list) -> list:
+        return self._client.query_points(
+            collection_name,
+            query=embedding,
+            limit=self.n_results,
+            search_params=self._get_search_params(),
+            with_payload=True,
+        ).points
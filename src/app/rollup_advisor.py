@@ -0,0 +1,55 @@
+import argparse
+
+from my_vanna import MyVanna
+from query_log import collect_sqls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sugere rollups da tabela compras a partir dos SQL treinados e do log de consultas"
+    )
+    parser.add_argument("--min-count", type=int, default=2, help="Mínimo de consultas respondidas por rollup")
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=0.1,
+        help="Máximo de linhas estimadas do rollup em relação à tabela compras",
+    )
+    parser.add_argument("--max-rollups", type=int, default=5, help="Máximo de rollups sugeridos")
+    parser.add_argument("--apply", action="store_true", help="Cria os rollups sugeridos que ainda não existem")
+    parser.add_argument("--refresh", action="store_true", help="Atualiza os rollups desatualizados")
+    parser.add_argument("--drop", action="store_true", help="Remove todos os rollups")
+    args = parser.parse_args()
+
+    vn = MyVanna()
+
+    vn.connect_to_postgres(host='localhost', dbname='geekmaster', user='admin', password='admin', port='5432')
+
+    if args.drop:
+        vn.drop_rollups()
+        print("Rollups removidos.")
+    else:
+        sqls = collect_sqls(vn)
+        advice = vn.advise_rollups(
+            sqls, min_count=args.min_count, max_ratio=args.max_ratio, max_rollups=args.max_rollups
+        )
+
+        print(f"{len(sqls)} SQL analisados, {len(advice)} rollups sugeridos:")
+        for rollup in advice:
+            status = "existe" if rollup["exists"] else "novo"
+            print(
+                f"\n{rollup['name']} ({status}): {rollup['queries']} consultas, "
+                f"~{rollup['estimated_rows']:,} linhas ({rollup['ratio']:.2%} de compras)"
+            )
+            print(f"  dimensões: {', '.join(rollup['dims'].values()) or '(nenhuma)'}")
+            print(f"  exemplo: {rollup['example']}")
+
+            if args.apply and not rollup["exists"]:
+                vn.create_rollup(rollup["dims"])
+                print("  criado")
+
+        if args.refresh:
+            refreshed = vn.refresh_rollups()
+            print(f"\nRollups atualizados: {', '.join(refreshed) or 'nenhum'}")
+
+    vn.close()
@@ -0,0 +1,659 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import pandas as pd
+from vanna.exceptions import ValidationError
+
+from result_cache import is_read_only, normalize_sql
+
+FACT_TABLE = "compras"
+
+# As materialized views criadas aqui são identificadas pelo comentário, que guarda
+# as dimensões, as colunas e a assinatura da tabela fato no último refresh
+ROLLUP_COMMENT_PREFIX = "vanna_rollup:"
+
+# Marca, no SQL reescrito, onde entra o nome do rollup escolhido
+_ROLLUP_MARKER = "\x00rollup\x00"
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_AGGREGATE = re.compile(r"\b(count|sum|avg|min|max|stddev|stddev_pop|stddev_samp|variance|var_pop|var_samp|string_agg|array_agg|bool_and|bool_or|every|percentile_cont|percentile_disc|mode)\s*\(")
+_UNSUPPORTED = re.compile(
+    r"^with\b|\(\s*select\b|\b(left|right|full|cross|natural)\s+(outer\s+)?join\b|\b(union|intersect|except)\b"
+    r"|\bdistinct\s+on\b|\bselect\s+(distinct\s+)?\*|\w\.\*|\bfilter\s*\(|\bgrouping\s+sets\b|\brollup\s*\(|\bcube\s*\("
+)
+_ALIAS_KEYWORDS = {
+    "on", "join", "where", "group", "order", "limit", "inner", "left", "right", "full", "cross",
+    "natural", "having", "using", "union", "window", "offset", "fetch", "as",
+}
+
+FACT_COLUMNS_SQL = """
+SELECT
+    a.attname AS name,
+    t.typcategory AS category,
+    t.typname AS type,
+    a.attnotnull AS not_null,
+    EXISTS (
+        SELECT 1 FROM pg_constraint con
+        WHERE con.conrelid = a.attrelid AND con.contype = 'p' AND a.attnum = ANY(con.conkey)
+    ) AS primary_key,
+    EXISTS (
+        SELECT 1 FROM pg_constraint con
+        WHERE con.conrelid = a.attrelid AND con.contype = 'f' AND a.attnum = ANY(con.conkey)
+    ) AS foreign_key
+FROM pg_attribute a
+JOIN pg_type t ON t.oid = a.atttypid
+WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+ORDER BY a.attnum
+"""
+
+# Valores possíveis de cada campo de `extract`, que o planejador não estima
+_EXTRACT_VALUES = {
+    "minute": 60, "hour": 24, "dow": 7, "isodow": 7, "day": 31, "week": 53, "doy": 366, "month": 12, "quarter": 4,
+}
+_UNIT_SECONDS = {
+    "minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400, "month": 30.44 * 86400,
+    "quarter": 91.31 * 86400, "year": 365.25 * 86400,
+}
+
+ROLLUPS_SQL = """
+SELECT c.relname, obj_description(c.oid, 'pg_class')
+FROM pg_class c
+WHERE c.relkind = 'm' AND obj_description(c.oid, 'pg_class') LIKE %s
+"""
+
+
+class RollupQuery(NamedTuple):
+    # Colunas de dimensão que o rollup precisa ter, com a expressão de cada uma
+    dims: dict
+    # Colunas de medida (sum_*, min_*, ...) usadas pelo SQL reescrito
+    measures: frozenset
+    # SQL reescrito, com `_ROLLUP_MARKER` no lugar da tabela fato
+    template: str
+
+
+def measure_kind(column: dict) -> Optional[str]:
+    # Chaves são dimensões; números e datas fora das chaves viram medidas
+    if column["primary_key"] or column["foreign_key"]:
+        return None
+    if column["category"] == "N":
+        return "numeric"
+    if column["category"] == "D":
+        return "datetime"
+    return None
+
+
+def rollup_columns(fact_columns: dict) -> dict:
+    """
+    Colunas de medida de um rollup da tabela fato, com a agregação de cada uma.
+    """
+    columns = {"n_rows": "count(*)"}
+    for name, column in fact_columns.items():
+        kind = measure_kind(column)
+        if kind == "numeric":
+            columns[f"sum_{name}"] = f"sum({name})"
+            if not column["not_null"]:
+                columns[f"count_{name}"] = f"count({name})"
+        if kind is not None:
+            columns[f"min_{name}"] = f"min({name})"
+            columns[f"max_{name}"] = f"max({name})"
+    return columns
+
+
+def rollup_name(dims: dict, fact_table: str = FACT_TABLE) -> str:
+    name = f"rollup_{fact_table}_{'__'.join(sorted(dims)) or 'total'}"
+    # Identificadores do Postgres têm no máximo 63 bytes
+    if len(name) > 63:
+        name = f"rollup_{fact_table}_{hashlib.sha1('|'.join(sorted(dims)).encode()).hexdigest()[:12]}"
+    return name
+
+
+def analyze_query(sql: str, fact_columns: dict, fact_table: str = FACT_TABLE) -> Optional[RollupQuery]:
+    """
+    Verifica se o SQL pode ser respondido por um rollup da tabela fato e, se
+    puder, devolve as dimensões de que ele precisa e o SQL reescrito.
+
+    Só são aceitas consultas de agregação sobre uma única referência à tabela fato,
+    com INNER JOINs (que preservam as somas, já que a multiplicidade de cada
+    junção depende apenas das dimensões) e sem subconsultas. As medidas precisam
+    aparecer como `count(*)`, `sum(col)`, `avg(col)`, `min(col)` ou `max(col)`; as
+    demais referências à tabela fato viram dimensões, inclusive
+    `date_trunc('unidade', col)`, `extract(campo from col)` e `col::date`.
+    Qualquer outro uso da tabela fato torna o SQL não reescrevível.
+    """
+    if not is_read_only(sql):
+        return None
+
+    # Literais viram marcadores para nenhum padrão casar com o conteúdo deles
+    literals = []
+
+    def mask(match):
+        literals.append(match.group(0))
+        return f"'#{len(literals) - 1}'"
+
+    code = _LITERAL.sub(mask, normalize_sql(sql))
+    if _UNSUPPORTED.search(code):
+        return None
+
+    tables = list(
+        re.finditer(rf"\b(from|join)\s+(?:public\.)?(?P<table>{fact_table})\b(?:\s+(?:as\s+)?(?P<alias>\w+))?", code)
+    )
+    if len(tables) != 1 or len(re.findall(rf"\b{fact_table}\b(?!\.)", code)) != 1:
+        return None
+
+    table = tables[0]
+    alias = table.group("alias") if table.group("alias") not in _ALIAS_KEYWORDS else None
+    qualifier = alias or fact_table
+
+    # No ORDER BY final, um nome solto pode ser um alias da saída; nas demais
+    # cláusulas (e dentro de agregações) é sempre uma coluna
+    output_aliases = set(re.findall(r"\bas\s+(\w+)", code)) - {alias}
+    order_by = next(
+        (match.start() for match in re.finditer(r"\border by\b", code) if _depth(code, match.start()) == 0),
+        len(code),
+    )
+
+    # Nomes depois de AS são aliases, não referências
+    ref = rf"(?:\b{qualifier}\.(?P<qualified>\w+)\b|(?<![\w.'#])(?<!\bas\s)(?P<bare>\w+)\b(?!\s*\(|\.))"
+
+    def fact_column(match, position: int = 0) -> Optional[str]:
+        if match.group("qualified"):
+            return match.group("qualified")
+        name = match.group("bare")
+        if name not in fact_columns or (position >= order_by and name in output_aliases):
+            return None
+        return name
+
+    replacements = []
+    measures = set()
+    dims = {}
+    grouped = re.search(r"\bgroup by\b", code) is not None
+
+    # Agregações: medidas são trocadas pelas colunas pré-agregadas do rollup
+    for match in _AGGREGATE.finditer(code):
+        end = _closing_paren(code, match.end() - 1)
+        if end is None:
+            return None
+
+        function = match.group(1)
+        argument = code[match.end() : end].strip()
+        distinct = argument.startswith("distinct ")
+        if distinct:
+            argument = argument[len("distinct ") :].strip()
+
+        whole = re.fullmatch(ref, argument)
+        column = fact_column(whole) if whole else None
+        kind = measure_kind(fact_columns[column]) if column in fact_columns else None
+
+        if re.match(r"\s*over\b", code[end + 1 :]):
+            # Agregação de janela: roda sobre as linhas já agrupadas, então só as dimensões mudam
+            continue
+
+        grouped = True
+        if function == "count" and not distinct and (
+            argument in ("*", "1") or (column in fact_columns and fact_columns[column]["not_null"])
+        ):
+            replacement, used = f"coalesce(sum({qualifier}.n_rows), 0)::bigint", "n_rows"
+        elif function == "count" and not distinct and kind == "numeric":
+            replacement, used = f"coalesce(sum({qualifier}.count_{column}), 0)::bigint", f"count_{column}"
+        elif function == "sum" and not distinct and kind == "numeric":
+            replacement, used = f"sum({qualifier}.sum_{column})", f"sum_{column}"
+            # sum() de integer é bigint, mas a soma das somas parciais (já bigint) seria numeric
+            if fact_columns[column].get("type") in ("int2", "int4"):
+                replacement += "::bigint"
+        elif function == "avg" and not distinct and kind == "numeric":
+            count = "n_rows" if fact_columns[column]["not_null"] else f"count_{column}"
+            replacement = f"(sum({qualifier}.sum_{column}) / nullif(sum({qualifier}.{count}), 0))"
+            used = f"sum_{column}"
+            measures.add(count)
+        elif function in ("min", "max") and kind is not None:
+            replacement, used = f"{function}({qualifier}.{function}_{column})", f"{function}_{column}"
+        elif function in ("min", "max") or (function == "count" and distinct):
+            # Dependem só do conjunto de valores, que o rollup preserva; as dimensões são trocadas abaixo
+            continue
+        else:
+            # sum/avg/count sobre outras expressões mudariam com o número de linhas
+            return None
+
+        replacements.append((match.start(), end + 1, replacement))
+        measures.add(used)
+        _keep_output_name(code, match.start(), end + 1, function, replacements)
+
+    if not grouped:
+        return None
+
+    def outside(start: int, end: int) -> bool:
+        return all(end <= r_start or start >= r_end for r_start, r_end, _ in replacements)
+
+    # Expressões de dimensão sobre colunas da tabela fato
+    dim_patterns = (
+        (rf"\bdate_trunc\(\s*'#(?P<literal>\d+)'\s*,\s*{ref}\s*\)", "date_trunc"),
+        (rf"\bextract\(\s*(?P<field>\w+)\s+from\s+{ref}\s*\)", "extract"),
+        (rf"{ref}\s*::\s*date\b", "date"),
+    )
+    for pattern, kind in dim_patterns:
+        for match in re.finditer(pattern, code):
+            column = fact_column(match, match.start())
+            if column not in fact_columns or not outside(match.start(), match.end()):
+                continue
+
+            if kind == "date_trunc":
+                unit = literals[int(match.group("literal"))].strip("'")
+                if not re.fullmatch(r"\w+", unit):
+                    return None
+                name, expression = f"trunc_{unit}_{column}", f"date_trunc('{unit}', {column})"
+                output_name = "date_trunc"
+            elif kind == "extract":
+                field = match.group("field")
+                name, expression = f"{field}_{column}", f"extract({field} from {column})"
+                output_name = "extract"
+            else:
+                name, expression = f"date_{column}", f"{column}::date"
+                output_name = column
+
+            dims[name] = expression
+            replacements.append((match.start(), match.end(), f"{qualifier}.{name}"))
+            _keep_output_name(code, match.start(), match.end(), output_name, replacements)
+
+    # As demais referências à tabela fato são dimensões usadas como estão
+    for match in re.finditer(ref, code):
+        column = fact_column(match, match.start())
+        if column is None or not outside(match.start(), match.end()):
+            continue
+        if column not in fact_columns or fact_columns[column]["primary_key"]:
+            return None
+        dims[column] = column
+
+    replacements.append(
+        (
+            table.start("table"),
+            table.end("table"),
+            _ROLLUP_MARKER if alias else f"{_ROLLUP_MARKER} AS {fact_table}",
+        )
+    )
+
+    template = code
+    for start, end, replacement in sorted(replacements, reverse=True):
+        template = template[:start] + replacement + template[end:]
+    template = re.sub(r"'#(\d+)'", lambda match: literals[int(match.group(1))], template)
+
+    return RollupQuery(dims=dims, measures=frozenset(measures), template=template)
+
+
+def _keep_output_name(code: str, start: int, end: int, name: str, replacements: list):
+    # Sem alias, o Postgres dá à coluna da saída o nome da função (count, sum,
+    # extract...) ou da coluna, mesmo atrás de casts; a expressão trocada teria
+    # outro nome, então o nome original vira um alias explícito
+    if _depth(code, start) != 0:
+        return
+
+    before = code[:start].rstrip()
+    if not (before.endswith(",") or re.search(r"\bselect(\s+distinct)?$", before)):
+        return
+
+    select_end = next(
+        (match.start() for match in re.finditer(r"\bfrom\b", code) if _depth(code, match.start()) == 0),
+        len(code),
+    )
+    after = re.match(r"(?:\s*::\s*\w+)*(?=\s*(?:,|\bfrom\b|$))", code[end:])
+    if after is None or end > select_end:
+        return
+
+    replacements.append((end + after.end(), end + after.end(), f" AS {name}"))
+
+
+def _depth(code: str, position: int) -> int:
+    return code.count("(", 0, position) - code.count(")", 0, position)
+
+
+def _closing_paren(code: str, start: int) -> Optional[int]:
+    depth = 0
+    for i in range(start, len(code)):
+        if code[i] == "(":
+            depth += 1
+        elif code[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    return None
+
+
+class RollupMixin:
+    """
+    Rollups da tabela `compras` em materialized views, e reescrita das consultas
+    de agregação para lê-los no lugar da tabela fato.
+
+    `advise_rollups()` procura nos SQL treinados e no log de consultas os
+    agrupamentos que se repetem (mês, hora, dia da semana, vendedor, produto,
+    cliente...) e sugere os rollups que cobrem mais consultas com poucas linhas;
+    `create_rollup()` e `refresh_rollups()` os mantêm no banco.
+
+    Em `run_sql`, um SQL de agregação sobre `compras` cujas dimensões estejam em
+    um rollup é reescrito para ler o menor deles. O rollup só é usado se a
+    `compras` não mudou desde o último refresh (mesma assinatura de
+    `pg_stat_user_tables` usada pelo cache de resultados); caso contrário, ou se o
+    SQL reescrito falhar, a consulta original é executada. O resultado do SQL
+    reescrito precisa ser igual ao do original, inclusive nos nomes e tipos das
+    colunas; `tests/test_rollups.py` confere isso para as consultas do corpus.
+
+    Config:
+        - rollups: Liga ou desliga a reescrita. Padrão: False.
+        - rollup_reload_interval: Segundos entre releituras da lista de rollups do
+          banco. Padrão: 60.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.rollups = config.get("rollups", False)
+        self.rollup_reload_interval = config.get("rollup_reload_interval", 60)
+
+        self._rollups = None
+        self._rollups_loaded_at = 0.0
+        self._fact_columns = None
+        self._rollups_lock = threading.Lock()
+
+    def run_sql(self, sql: str, **kwargs) -> pd.DataFrame:
+        if not self.rollups or self.pg_pool is None:
+            return super().run_sql(sql, **kwargs)
+
+        try:
+            rewritten = self.rewrite_with_rollup(sql)
+        except ValidationError as e:
+            # Os rollups são um atalho: um erro ao consultá-los não pode impedir a consulta
+            self.log(title="Rollups", message=f"Falha ao procurar rollups: {e}")
+            rewritten = None
+
+        if rewritten is None:
+            return super().run_sql(sql, **kwargs)
+
+        try:
+            return super().run_sql(rewritten, **kwargs)
+        except ValidationError as e:
+            self.log(title="Rollups", message=f"SQL reescrito falhou, usando {FACT_TABLE}: {e}")
+            return super().run_sql(sql, **kwargs)
+
+    def rewrite_with_rollup(self, sql: str) -> Optional[str]:
+        """
+        Example:
+        ```python
+        vn.rewrite_with_rollup("SELECT DATE_TRUNC('month', data_compra), COUNT(*) FROM compras GROUP BY 1")
+        ```
+
+        Devolve o SQL reescrito para ler o menor rollup atualizado que o
+        responde, ou None se nenhum servir.
+        """
+        rollups = self._get_rollups()
+        if not rollups:
+            return None
+
+        query = analyze_query(sql, self._fact_columns)
+        if query is None:
+            return None
+
+        candidates = [
+            rollup
+            for rollup in rollups
+            if all(rollup["dims"].get(name) == expression for name, expression in query.dims.items())
+            and query.measures <= set(rollup["columns"])
+        ]
+        if not candidates:
+            return None
+
+        signature = json.loads(json.dumps(self._get_tables_signature({FACT_TABLE})))
+        for rollup in sorted(candidates, key=lambda rollup: rollup["rows"]):
+            if rollup["signature"] == signature:
+                self.log(title="Rollups", message=f"Consulta reescrita para ler {rollup['name']}")
+                return query.template.replace(_ROLLUP_MARKER, rollup["name"])
+
+        self.log(title="Rollups", message=f"Rollups desatualizados para: {normalize_sql(sql)}")
+        return None
+
+    def advise_rollups(
+        self, sqls: list, min_count: int = 2, max_ratio: float = 0.1, max_rollups: int = 5
+    ) -> list:
+        """
+        Example:
+        ```python
+        vn.advise_rollups([sql for sql in training_sqls])
+        ```
+
+        Sugere rollups para os agrupamentos que se repetem nos SQL.
+
+        Args:
+            sqls (list): SQL treinados e executados.
+            min_count (int): Mínimo de consultas que um rollup precisa responder.
+            max_ratio (float): Máximo de linhas estimadas do rollup em relação à
+              tabela fato; acima disso ele não compensa.
+            max_rollups (int): Máximo de rollups sugeridos.
+
+        Returns:
+            list: Um dict por rollup, do que mais responde consultas para o que
+            menos, com nome, dimensões, consultas respondidas, linhas estimadas e
+            um SQL de exemplo, e se o rollup já existe.
+        """
+        fact_columns = self.get_fact_columns()
+
+        patterns = Counter()
+        examples = {}
+        for sql in sqls:
+            query = analyze_query(sql, fact_columns)
+            if query is None:
+                continue
+            key = tuple(sorted(query.dims.items()))
+            patterns[key] += 1
+            examples.setdefault(key, sql)
+
+        fact_rows = self._estimate_rows(f"SELECT * FROM {FACT_TABLE}")
+        existing = {rollup["name"] for rollup in self._get_rollups(reload=True)}
+
+        candidates = []
+        for key in patterns:
+            dims = dict(key)
+            rows = self._estimate_rollup_rows(dims, fact_rows)
+            if rows > max_ratio * fact_rows:
+                continue
+            candidates.append(
+                {
+                    "name": rollup_name(dims),
+                    "dims": dims,
+                    "covers": {other for other in patterns if set(other) <= set(key)},
+                    "estimated_rows": int(rows),
+                    "ratio": rows / fact_rows if fact_rows else 0.0,
+                    "example": normalize_sql(examples[key]),
+                }
+            )
+
+        # Guloso: a cada passo, o rollup que responde mais consultas ainda não cobertas
+        advice = []
+        covered = set()
+        while candidates and len(advice) < max_rollups:
+            best = max(
+                candidates,
+                key=lambda candidate: (
+                    sum(patterns[key] for key in candidate["covers"] - covered),
+                    -candidate["estimated_rows"],
+                ),
+            )
+            queries = sum(patterns[key] for key in best["covers"] - covered)
+            if queries < min_count:
+                break
+
+            candidates.remove(best)
+            covered |= best["covers"]
+            advice.append(
+                {
+                    "name": best["name"],
+                    "dims": best["dims"],
+                    "queries": queries,
+                    "estimated_rows": best["estimated_rows"],
+                    "ratio": best["ratio"],
+                    "example": best["example"],
+                    "exists": best["name"] in existing,
+                }
+            )
+
+        return advice
+
+    def create_rollup(self, dims: dict) -> str:
+        """
+        Cria (ou recria) o rollup da tabela fato com as dimensões `dims`
+        ({coluna: expressão}) e devolve o nome dele.
+        """
+        fact_columns = self.get_fact_columns()
+        name = rollup_name(dims)
+        columns = rollup_columns(fact_columns)
+
+        select = [f"{expression} AS {column}" for column, expression in dims.items()]
+        select += [f"{expression} AS {column}" for column, expression in columns.items()]
+        group_by = f" GROUP BY {', '.join(dims.values())}" if dims else ""
+
+        signature = self._get_tables_signature({FACT_TABLE})
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name}")
+                cs.execute(
+                    f"CREATE MATERIALIZED VIEW {name} AS SELECT {', '.join(select)} FROM {FACT_TABLE}{group_by}"
+                )
+                # Índice único para o REFRESH ... CONCURRENTLY não bloquear as leituras
+                if dims:
+                    cs.execute(f"CREATE UNIQUE INDEX ON {name} ({', '.join(dims)})")
+                self._write_rollup_comment(cs, name, dims, list(columns), signature)
+            conn.commit()
+
+        self.log(title="Rollups", message=f"{name} criado")
+        self._get_rollups(reload=True)
+        return name
+
+    def refresh_rollups(self, stale_only: bool = True) -> list:
+        """
+        Atualiza os rollups; com `stale_only`, só os que estão com uma assinatura da
+        tabela fato diferente da atual. Devolve os nomes atualizados.
+        """
+        refreshed = []
+        for rollup in self._get_rollups(reload=True):
+            signature = self._get_tables_signature({FACT_TABLE})
+            if stale_only and rollup["signature"] == json.loads(json.dumps(signature)):
+                continue
+
+            start = time.perf_counter()
+            with self.pg_connection() as conn:
+                with conn.cursor() as cs:
+                    concurrently = " CONCURRENTLY" if rollup["dims"] else ""
+                    cs.execute(f"REFRESH MATERIALIZED VIEW{concurrently} {rollup['name']}")
+                    self._write_rollup_comment(cs, rollup["name"], rollup["dims"], rollup["columns"], signature)
+                conn.commit()
+
+            refreshed.append(rollup["name"])
+            self.log(
+                title="Rollups", message=f"{rollup['name']} atualizado em {time.perf_counter() - start:.2f}s"
+            )
+
+        self._get_rollups(reload=True)
+        return refreshed
+
+    def drop_rollups(self, names: list = None):
+        for rollup in self._get_rollups(reload=True):
+            if names is None or rollup["name"] in names:
+                with self.pg_connection() as conn:
+                    with conn.cursor() as cs:
+                        cs.execute(f"DROP MATERIALIZED VIEW IF EXISTS {rollup['name']}")
+                    conn.commit()
+
+        self._get_rollups(reload=True)
+
+    def get_fact_columns(self) -> dict:
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(FACT_COLUMNS_SQL, (FACT_TABLE,))
+                columns = [desc[0] for desc in cs.description]
+                return {row[0]: dict(zip(columns, row)) for row in cs.fetchall()}
+
+    def _get_rollups(self, reload: bool = False) -> list:
+        with self._rollups_lock:
+            if (
+                not reload
+                and self._rollups is not None
+                and time.monotonic() - self._rollups_loaded_at < self.rollup_reload_interval
+            ):
+                return self._rollups
+
+            with self.pg_connection() as conn:
+                with conn.cursor() as cs:
+                    cs.execute(ROLLUPS_SQL, (f"{ROLLUP_COMMENT_PREFIX}%",))
+                    rows = cs.fetchall()
+
+            self._rollups = []
+            for name, comment in rows:
+                rollup = json.loads(comment[len(ROLLUP_COMMENT_PREFIX) :])
+                if rollup.get("fact") == FACT_TABLE:
+                    self._rollups.append({"name": name, **rollup})
+
+            if self._rollups and self._fact_columns is None:
+                self._fact_columns = self.get_fact_columns()
+            self._rollups_loaded_at = time.monotonic()
+
+            return self._rollups
+
+    def _write_rollup_comment(self, cs, name: str, dims: dict, columns: list, signature):
+        cs.execute(f"SELECT count(*) FROM {name}")
+        rows = cs.fetchone()[0]
+
+        comment = ROLLUP_COMMENT_PREFIX + json.dumps(
+            {
+                "fact": FACT_TABLE,
+                "dims": dims,
+                "columns": columns,
+                "rows": rows,
+                "signature": signature,
+                "refreshed_at": datetime.now().isoformat(timespec="seconds"),
+            }
+        )
+        cs.execute(f"COMMENT ON MATERIALIZED VIEW {name} IS %s", (comment,))
+
+    def _estimate_rollup_rows(self, dims: dict, fact_rows: float) -> float:
+        # O planejador estima bem o GROUP BY de colunas (pelo n_distinct), mas não o
+        # de expressões como extract(hour from ...), que ele supõe quase únicas
+        columns = [expression for expression in dims.values() if re.fullmatch(r"\w+", expression)]
+        rows = self._estimate_rows(f"SELECT 1 FROM {FACT_TABLE} GROUP BY {', '.join(columns)}") if columns else 1
+
+        for expression in dims.values():
+            if expression in columns:
+                continue
+
+            extract = re.fullmatch(r"extract\((\w+) from (\w+)\)", expression)
+            trunc = re.fullmatch(r"date_trunc\('(\w+)', (\w+)\)", expression)
+            date = re.fullmatch(r"(\w+)::date", expression)
+            if extract and extract.group(1) in _EXTRACT_VALUES:
+                rows *= _EXTRACT_VALUES[extract.group(1)]
+            elif extract and extract.group(1) in _UNIT_SECONDS:
+                rows *= self._column_span(extract.group(2)) / _UNIT_SECONDS[extract.group(1)] + 1
+            elif trunc and trunc.group(1) in _UNIT_SECONDS:
+                rows *= self._column_span(trunc.group(2)) / _UNIT_SECONDS[trunc.group(1)] + 1
+            elif date:
+                rows *= self._column_span(date.group(1)) / _UNIT_SECONDS["day"] + 1
+            else:
+                rows *= self._estimate_rows(f"SELECT 1 FROM {FACT_TABLE} GROUP BY {expression}")
+
+        return min(rows, fact_rows)
+
+    def _column_span(self, column: str) -> float:
+        # Intervalo, em segundos, entre o menor e o maior valor de uma coluna de data
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(
+                    f"SELECT extract(epoch from max({column})::timestamp - min({column})::timestamp) FROM {FACT_TABLE}"
+                )
+                return float(cs.fetchone()[0] or 0)
+
+    def _estimate_rows(self, sql: str) -> float:
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                return cs.fetchone()[0][0]["Plan"]["Plan Rows"]
@@ -0,0 +1,230 @@
+import json
+import os
+import time
+
+import pandas as pd
+from qdrant_client import models
+from vanna.utils import deterministic_uuid
+
+DEFAULT_SCHEMA_MANIFEST_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "volumes", "schema_manifest.json"
+)
+
+# Marca os pontos de documentação gerados a partir do catálogo do banco
+SCHEMA_SOURCE = "schema"
+
+# Um hash por tabela com colunas (nome, tipo, NOT NULL, default, comentário),
+# constraints e o comentário da tabela, tudo lido do pg_catalog em uma consulta
+FINGERPRINT_SQL = """
+SELECT
+    n.nspname AS table_schema,
+    c.relname AS table_name,
+    md5(concat_ws(
+        '|',
+        (
+            SELECT string_agg(
+                concat_ws(
+                    ':', a.attname, format_type(a.atttypid, a.atttypmod), a.attnotnull,
+                    pg_get_expr(d.adbin, d.adrelid), col_description(c.oid, a.attnum)
+                ),
+                ',' ORDER BY a.attnum
+            )
+            FROM pg_attribute a
+            LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+            WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        ),
+        (
+            SELECT string_agg(con.conname || ':' || pg_get_constraintdef(con.oid), ',' ORDER BY con.conname)
+            FROM pg_constraint con
+            WHERE con.conrelid = c.oid
+        ),
+        obj_description(c.oid, 'pg_class')
+    )) AS fingerprint
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f') AND n.nspname = ANY(%s)
+"""
+
+# O mesmo INFORMATION_SCHEMA.COLUMNS do treino original, restrito às tabelas
+# alteradas e com o comentário de cada coluna
+COLUMNS_SQL = """
+SELECT c.*, col_description(format('%%I.%%I', c.table_schema, c.table_name)::regclass, c.ordinal_position) AS comment
+FROM INFORMATION_SCHEMA.COLUMNS c
+WHERE c.table_schema || '.' || c.table_name = ANY(%s)
+ORDER BY c.table_schema, c.table_name, c.ordinal_position
+"""
+
+
+class SchemaSyncMixin:
+    """
+    Documentação do schema para o treinamento, gerada só para as tabelas que
+    mudaram.
+
+    A cada execução, a definição de cada tabela (colunas, tipos, constraints e
+    comentários) vira um hash lido do `pg_catalog` e comparado com o manifesto
+    da execução anterior. Só as tabelas novas ou alteradas passam pelo
+    INFORMATION_SCHEMA e pelo `get_training_plan_generic()` e são reembedadas; a
+    documentação de tabelas alteradas ou removidas sai do Qdrant.
+
+    Config:
+        - schema_manifest_path: Arquivo com os hashes da última execução. Padrão:
+          `volumes/schema_manifest.json` na raiz do projeto.
+        - schema_sync_schemas: Schemas do banco a documentar. Padrão: ["public"].
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.schema_manifest_path = config.get("schema_manifest_path", DEFAULT_SCHEMA_MANIFEST_PATH)
+        self.schema_sync_schemas = config.get("schema_sync_schemas", ["public"])
+
+    def get_database_name(self) -> str:
+        # Consultado à parte: sem nenhuma tabela, o manifesto do banco ainda é
+        # encontrado e as tabelas removidas saem do Qdrant
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute("SELECT current_database()")
+                return cs.fetchone()[0]
+
+    def get_table_fingerprints(self, schemas: list = None) -> pd.DataFrame:
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(FINGERPRINT_SQL, (list(schemas or self.schema_sync_schemas),))
+                return pd.DataFrame(cs.fetchall(), columns=[desc[0] for desc in cs.description])
+
+    def sync_schema(self, schemas: list = None, full: bool = False) -> dict:
+        """
+        Example:
+        ```python
+        vn.connect_to_postgres(...)
+        vn.sync_schema()
+        ```
+
+        Atualiza a documentação do schema no Qdrant apenas para as tabelas cuja
+        definição mudou desde a última execução.
+
+        Args:
+            schemas (list): Schemas a documentar. Padrão: `schema_sync_schemas`. As
+              tabelas de outros schemas já sincronizados não são tocadas.
+            full (bool): Ignora o manifesto e regera a documentação de todas as
+              tabelas dos schemas.
+
+        Returns:
+            dict: Listas das tabelas adicionadas, alteradas e removidas, e quantas
+            ficaram inalteradas.
+        """
+        start = time.perf_counter()
+
+        schemas = list(schemas or self.schema_sync_schemas)
+        database = self.get_database_name()
+        fingerprints = self.get_table_fingerprints(schemas)
+
+        # Só as tabelas dos schemas pedidos entram na comparação; as dos outros
+        # schemas ficam no manifesto e no Qdrant como estão
+        manifest = self._load_schema_manifest()
+        others = {
+            table: fingerprint
+            for table, fingerprint in manifest.get(database, {}).items()
+            if table.split(".", 1)[0] not in schemas
+        }
+        previous = {
+            table: fingerprint
+            for table, fingerprint in manifest.get(database, {}).items()
+            if table not in others
+        }
+        current = {
+            f"{row.table_schema}.{row.table_name}": row.fingerprint
+            for row in fingerprints.itertuples()
+        }
+
+        if full:
+            # Descarta a documentação de todas as tabelas dos schemas, inclusive das que já não existem
+            if previous or current:
+                self._delete_schema_points(sorted(set(previous) | set(current)))
+            previous = {}
+
+        added = sorted(table for table in current if table not in previous)
+        altered = sorted(table for table in current if table in previous and previous[table] != current[table])
+        dropped = sorted(table for table in previous if table not in current)
+
+        stale = altered + dropped
+        if stale:
+            self._delete_schema_points(stale)
+
+        changed = added + altered
+        if changed:
+            self._upsert_training_points({self.documentation_collection_name: self._get_schema_points(changed)})
+
+        if full or stale or changed:
+            self.training_data_changed()
+
+        manifest[database] = {**others, **current}
+        self._save_schema_manifest(manifest)
+
+        elapsed = time.perf_counter() - start
+        self.log(
+            title="Sincronização do schema",
+            message=(
+                f"{len(added)} tabelas novas, {len(altered)} alteradas, {len(dropped)} removidas, "
+                f"{len(current) - len(added) - len(altered)} inalteradas em {elapsed:.2f}s"
+            ),
+        )
+
+        return {
+            "added": added,
+            "altered": altered,
+            "dropped": dropped,
+            "unchanged": len(current) - len(added) - len(altered),
+        }
+
+    def _get_schema_points(self, tables: list) -> list:
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(COLUMNS_SQL, (tables,))
+                df = pd.DataFrame(cs.fetchall(), columns=[desc[0] for desc in cs.description])
+
+        df["comment"] = df["comment"].fillna("")
+
+        points = []
+        for item in self.get_training_plan_generic(df)._plan:
+            schema = item.item_group.split(".", 1)[1]
+            points.append(
+                (
+                    deterministic_uuid(item.item_value),
+                    item.item_value,
+                    {
+                        "documentation": item.item_value,
+                        "source": SCHEMA_SOURCE,
+                        "table": f"{schema}.{item.item_name}",
+                    },
+                )
+            )
+
+        return points
+
+    def _delete_schema_points(self, tables: list = None):
+        conditions = [models.FieldCondition(key="source", match=models.MatchValue(value=SCHEMA_SOURCE))]
+        if tables is not None:
+            conditions.append(models.FieldCondition(key="table", match=models.MatchAny(any=tables)))
+
+        self._client.delete(
+            self.documentation_collection_name,
+            points_selector=models.FilterSelector(filter=models.Filter(must=conditions)),
+        )
+
+    def _load_schema_manifest(self) -> dict:
+        if not os.path.exists(self.schema_manifest_path):
+            return {}
+
+        with open(self.schema_manifest_path) as f:
+            return json.load(f)
+
+    def _save_schema_manifest(self, manifest: dict):
+        os.makedirs(os.path.dirname(os.path.abspath(self.schema_manifest_path)), exist_ok=True)
+
+        # Grava em um arquivo temporário e troca, para não deixar um manifesto pela metade
+        tmp_path = f"{self.schema_manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.schema_manifest_path)
@@ -0,0 +1,70 @@
+import os
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    # O vanna (e o pandas) só é importado aqui: o processo mestre do gunicorn
+    # carrega apenas o gunicorn e o main
+    from vanna.exceptions import DependencyError
+
+    raise DependencyError(
+        "You need to install required dependencies to execute this method, run command:"
+        " \npip install gunicorn"
+    )
+
+from main import create_app
+
+
+class VannaServer(BaseApplication):
+    """
+    Serve o MyVannaFlaskApp com o gunicorn, em vez do servidor de
+    desenvolvimento do Flask.
+
+    Cada worker é um processo que cria seu próprio MyVanna uma única vez, e as
+    threads do worker compartilham essa instância (cliente do Qdrant, do Ollama e
+    conexões com o banco). No SIGTERM o gunicorn para de aceitar conexões, espera
+    as requisições em andamento por até `graceful_timeout` segundos e então chama
+    `vn.close()` em cada worker.
+
+    O estado de cada pergunta (SQL, resultado, gráfico) fica no `SQLiteCache`,
+    compartilhado pelos workers, então qualquer worker atende qualquer etapa de
+    uma pergunta, sem sessões fixas no balanceador.
+    """
+
+    def __init__(self, options: dict = None):
+        self.options = options or {}
+        self.app = None
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+        self.cfg.set("worker_exit", self._worker_exit)
+
+    def load(self):
+        self.app = create_app(warm_up=os.getenv("VANNA_WARM_UP", "1") != "0", debug=False)
+        return self.app.flask_app
+
+    def _worker_exit(self, server, worker):
+        if self.app is not None:
+            self.app.vn.close()
+            if hasattr(self.app.cache, "close"):
+                self.app.cache.close()
+
+
+if __name__ == "__main__":
+    VannaServer(
+        {
+            "bind": os.getenv("VANNA_BIND", "0.0.0.0:8084"),
+            # Com VANNA_CACHE=memory o estado de cada pergunta fica no processo
+            # que a atendeu, e mais de um worker exige sessões fixas
+            "workers": int(os.getenv("VANNA_WORKERS", "1")),
+            "worker_class": "gthread",
+            "threads": int(os.getenv("VANNA_THREADS", "8")),
+            # Gerações longas do Ollama não podem derrubar o worker
+            "timeout": int(os.getenv("VANNA_TIMEOUT", "900")),
+            "graceful_timeout": int(os.getenv("VANNA_GRACEFUL_TIMEOUT", "120")),
+            "accesslog": "-",
+        }
+    ).run()
@@ -0,0 +1,296 @@
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+from qdrant_client import models
+from vanna.exceptions import ImproperlyConfigured, ValidationError
+
+# Diretório montado no Qdrant como /qdrant/snapshots pelo docker-compose.yml
+DEFAULT_SNAPSHOTS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "volumes", "qdrant_snapshots"
+)
+
+# Texto embedado na exportação e na restauração: o mesmo nome de modelo com
+# outra versão ou quantização gera vetores diferentes
+PROBE_TEXT = "Quais são os 5 vendedores que mais venderam em valor total?"
+PROBE_MIN_SIMILARITY = 0.999
+
+TAG_PATTERN = re.compile(r"^[\w.-]+$")
+
+
+class SnapshotMixin:
+    """
+    Exporta e restaura as collections do Vanna (pares pergunta/SQL, DDL e
+    documentação) como snapshots do Qdrant, para um ambiente novo não precisar
+    embedar o corpus inteiro.
+
+    Cada exportação tem uma tag e um manifesto (`<tag>.json`, no diretório de
+    snapshots) com o snapshot e o número de pontos de cada collection, o modelo
+    de embedding, a dimensão, a distância, o embedding de um texto de prova e o
+    manifesto do schema (`schema_sync.py`). A restauração recusa snapshots de
+    outro modelo, confere o checksum e a contagem de pontos e reaplica o perfil
+    das collections; depois, `sync_training` e `sync_schema` embedam só o que
+    mudou desde a exportação.
+
+    Os snapshots são gravados pelo próprio Qdrant, então só funcionam com um
+    Qdrant servidor que enxergue o diretório de snapshots (o volume do
+    docker-compose.yml).
+
+    Config:
+        - qdrant_snapshots_path: Diretório dos snapshots visto pelo MyVanna. Padrão:
+          `volumes/qdrant_snapshots` na raiz do projeto.
+        - qdrant_snapshots_location: O mesmo diretório visto pelo Qdrant. Padrão:
+          "/qdrant/snapshots".
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.qdrant_snapshots_path = config.get("qdrant_snapshots_path", DEFAULT_SNAPSHOTS_PATH)
+        self.qdrant_snapshots_location = config.get("qdrant_snapshots_location", "/qdrant/snapshots")
+
+    def export_snapshot(self, tag: str = None) -> dict:
+        """
+        Example:
+        ```python
+        vn.export_snapshot("v1")
+        ```
+
+        Cria um snapshot de cada collection e grava o manifesto da tag.
+
+        Args:
+            tag (str): Versão do snapshot. Padrão: data e hora da exportação.
+
+        Returns:
+            dict: O manifesto.
+        """
+        self._check_snapshot_support()
+
+        tag = tag or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self._validate_snapshot_tag(tag)
+
+        start = time.perf_counter()
+        collections = {}
+        for collection_name in self._snapshot_collections():
+            description = self._client.create_snapshot(collection_name, wait=True)
+            collections[collection_name] = {
+                "snapshot": description.name,
+                "checksum": description.checksum,
+                "size_bytes": description.size,
+                "points": self._client.count(collection_name, exact=True).count,
+            }
+
+        manifest = {
+            "tag": tag,
+            "created_at": datetime.now().isoformat(),
+            "fastembed_model": self.fastembed_model,
+            "dimension": self.embeddings_dimension,
+            "distance": self._distance_name(),
+            "probe": self._probe_embedding(),
+            "collections": collections,
+            "schema_manifest": self._load_schema_manifest(),
+        }
+
+        os.makedirs(self.qdrant_snapshots_path, exist_ok=True)
+        path = self._snapshot_manifest_path(tag)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+        points = sum(collection["points"] for collection in collections.values())
+        self.log(
+            title="Snapshot do Qdrant",
+            message=f"Snapshot {tag} exportado com {points} pontos em {time.perf_counter() - start:.2f}s",
+        )
+        return manifest
+
+    def list_snapshots(self) -> List[dict]:
+        """
+        Os manifestos do diretório de snapshots, do mais recente para o mais antigo.
+        """
+        if not os.path.isdir(self.qdrant_snapshots_path):
+            return []
+
+        manifests = []
+        for filename in os.listdir(self.qdrant_snapshots_path):
+            if filename.endswith(".json"):
+                with open(os.path.join(self.qdrant_snapshots_path, filename)) as f:
+                    manifests.append(json.load(f))
+
+        return sorted(manifests, key=lambda manifest: manifest["created_at"], reverse=True)
+
+    def check_snapshot_compatibility(self, manifest: dict) -> List[str]:
+        """
+        Example:
+        ```python
+        problems = vn.check_snapshot_compatibility(vn.list_snapshots()[0])
+        ```
+
+        Compara o modelo de embedding do snapshot com o configurado.
+
+        Returns:
+            List[str]: As diferenças encontradas; vazia se o snapshot é compatível.
+        """
+        problems = []
+        if manifest["fastembed_model"] != self.fastembed_model:
+            problems.append(f"model {manifest['fastembed_model']} != {self.fastembed_model}")
+        if manifest["dimension"] != self.embeddings_dimension:
+            problems.append(f"dimension {manifest['dimension']} != {self.embeddings_dimension}")
+        if manifest["distance"] != self._distance_name():
+            problems.append(f"distance {manifest['distance']} != {self._distance_name()}")
+
+        if not problems:
+            probe = np.asarray(manifest["probe"], dtype=np.float32)
+            current = np.asarray(self._probe_embedding(), dtype=np.float32)
+            norm = np.linalg.norm(probe) * np.linalg.norm(current)
+            similarity = float(np.dot(probe, current) / norm) if norm else 0.0
+            if similarity < PROBE_MIN_SIMILARITY:
+                problems.append(f"probe embedding similarity {similarity:.4f} < {PROBE_MIN_SIMILARITY}")
+
+        return problems
+
+    def restore_snapshot(self, tag: str = None) -> dict:
+        """
+        Example:
+        ```python
+        vn.restore_snapshot("v1")
+        vn.sync_training(question_sql=corpus.QUESTION_SQL, ddl=corpus.DDL)
+        ```
+
+        Substitui as collections pelas do snapshot, depois de verificar que ele é
+        do mesmo modelo de embedding.
+
+        Args:
+            tag (str): Versão do snapshot. Padrão: o mais recente do mesmo modelo.
+
+        Returns:
+            dict: O manifesto restaurado.
+        """
+        self._check_snapshot_support()
+
+        manifest = self._get_snapshot_manifest(tag)
+        problems = self.check_snapshot_compatibility(manifest)
+        if problems:
+            raise ImproperlyConfigured(
+                f"Snapshot '{manifest['tag']}' is incompatible with the embedding model: {'; '.join(problems)}"
+            )
+
+        start = time.perf_counter()
+        for collection_name, collection in manifest["collections"].items():
+            self._client.recover_snapshot(
+                collection_name,
+                location=f"file://{self.qdrant_snapshots_location}/{collection_name}/{collection['snapshot']}",
+                checksum=collection["checksum"],
+                priority=models.SnapshotPriority.SNAPSHOT,
+                wait=True,
+            )
+
+            points = self._client.count(collection_name, exact=True).count
+            if points != collection["points"]:
+                raise ValidationError(
+                    f"Collection {collection_name} has {points} points after restoring snapshot "
+                    f"'{manifest['tag']}', expected {collection['points']}"
+                )
+
+        # As collections voltam com a configuração da exportação
+        self._setup_collections()
+
+        # A documentação do schema no Qdrant é a do manifesto exportado
+        if manifest.get("schema_manifest"):
+            self._save_schema_manifest(manifest["schema_manifest"])
+
+        self.training_data_changed()
+
+        points = sum(collection["points"] for collection in manifest["collections"].values())
+        self.log(
+            title="Snapshot do Qdrant",
+            message=f"Snapshot {manifest['tag']} restaurado com {points} pontos em {time.perf_counter() - start:.2f}s",
+        )
+        return manifest
+
+    def restore_or_train(
+        self,
+        tag: str = None,
+        question_sql: list = None,
+        ddl: list = None,
+        documentation: list = None,
+    ) -> dict:
+        """
+        Example:
+        ```python
+        vn.restore_or_train(question_sql=corpus.QUESTION_SQL, ddl=corpus.DDL)
+        ```
+
+        Restaura o snapshot e sincroniza o corpus, embedando só o que mudou desde
+        a exportação. Se o snapshot não existe, é de outro modelo ou falha ao
+        restaurar, o corpus é treinado sobre as collections atuais.
+
+        Returns:
+            dict: A tag restaurada (None se não houve restauração) e o resultado de
+            `sync_training`.
+        """
+        restored = None
+        try:
+            restored = self.restore_snapshot(tag)["tag"]
+        except Exception as e:
+            self.log(title="Snapshot do Qdrant", message=f"Restauração ignorada, treinando o corpus: {e}")
+
+        return {
+            "restored": restored,
+            **self.sync_training(question_sql=question_sql, ddl=ddl, documentation=documentation),
+        }
+
+    def _snapshot_collections(self) -> list:
+        return [
+            self.sql_collection_name,
+            self.ddl_collection_name,
+            self.documentation_collection_name,
+        ]
+
+    def _get_snapshot_manifest(self, tag: Optional[str]) -> dict:
+        if tag is None:
+            manifests = self.list_snapshots()
+            if not manifests:
+                raise ValidationError(f"No snapshots found in {self.qdrant_snapshots_path}")
+
+            # Sem tag, vale o mais recente que o modelo atual consegue usar
+            for manifest in manifests:
+                if not self.check_snapshot_compatibility(manifest):
+                    return manifest
+            raise ImproperlyConfigured(
+                f"No snapshot in {self.qdrant_snapshots_path} is compatible with {self.fastembed_model}"
+            )
+
+        self._validate_snapshot_tag(tag)
+        path = self._snapshot_manifest_path(tag)
+        if not os.path.exists(path):
+            raise ValidationError(f"Snapshot '{tag}' not found in {self.qdrant_snapshots_path}")
+
+        with open(path) as f:
+            return json.load(f)
+
+    def _snapshot_manifest_path(self, tag: str) -> str:
+        return os.path.join(self.qdrant_snapshots_path, f"{tag}.json")
+
+    def _distance_name(self) -> str:
+        return getattr(self.distance_metric, "value", self.distance_metric)
+
+    def _probe_embedding(self) -> list:
+        # Direto no modelo, sem o cache de embeddings, que só distingue o nome do modelo
+        embedding_model = self._client._get_or_init_model(model_name=self.fastembed_model)
+        return next(iter(embedding_model.embed([PROBE_TEXT]))).tolist()
+
+    def _check_snapshot_support(self):
+        if self._is_local_qdrant():
+            raise ImproperlyConfigured("Snapshots require a Qdrant server, not a local (:memory: or path) client")
+
+    @staticmethod
+    def _validate_snapshot_tag(tag: str):
+        if not TAG_PATTERN.match(tag):
+            raise ValidationError(f"Invalid snapshot tag '{tag}', use letters, digits, '.', '_' or '-'")
@@ -0,0 +1,230 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_THOUSANDS = re.compile(r"\d{1,3}(?:\.\d{3})+")
+_NUMBER_WORDS = {
+    "dois": 2, "duas": 2, "três": 3, "tres": 3, "quatro": 4, "cinco": 5, "seis": 6, "sete": 7, "oito": 8,
+    "nove": 9, "dez": 10, "vinte": 20, "trinta": 30, "cem": 100, "mil": 1000,
+}
+# Palavras que invertem o sentido da pergunta ("mais" e "menos vendidos", "acima" e "abaixo de")
+_DIRECTIONS = {
+    "mais": "+", "maior": "+", "maiores": "+", "acima": "+", "superior": "+", "máximo": "+", "maximo": "+",
+    "melhor": "+", "melhores": "+", "decrescente": "+",
+    "menos": "-", "menor": "-", "menores": "-", "abaixo": "-", "inferior": "-", "mínimo": "-", "minimo": "-",
+    "pior": "-", "piores": "-", "crescente": "-",
+    "primeiro": "first", "primeira": "first", "primeiros": "first", "primeiras": "first",
+    "último": "last", "última": "last", "últimos": "last", "últimas": "last",
+    "ultimo": "last", "ultima": "last", "ultimos": "last", "ultimas": "last",
+}
+
+
+def question_constraints(question: str) -> tuple:
+    """
+    Os números e as palavras de direção (mais/menos, maior/menor...) da
+    pergunta. Perguntas com embeddings quase iguais e constraints diferentes,
+    como "top 5" e "top 10" ou "mais" e "menos vendidos", pedem SQL diferentes.
+    """
+    numbers = []
+    for number in _NUMBER.findall(question):
+        # "10.000" é dez mil; "2,5" é dois e meio
+        number = number.replace(".", "") if _THOUSANDS.fullmatch(number) else number.replace(",", ".")
+        try:
+            numbers.append(float(number))
+        except ValueError:
+            numbers.append(number)
+
+    words = re.findall(r"\w+", question.lower())
+    numbers += [float(_NUMBER_WORDS[word]) for word in words if word in _NUMBER_WORDS]
+    directions = {_DIRECTIONS[word] for word in words if word in _DIRECTIONS}
+
+    return tuple(sorted(numbers, key=str)), tuple(sorted(directions))
+
+
+class SemanticSQLCache:
+    """
+    Cache de SQL gerado, indexado pelo embedding da pergunta.
+
+    Uma pergunta nova reaproveita o SQL de uma pergunta já respondida quando as
+    duas têm os mesmos números e palavras de direção (`question_constraints`) e
+    a similaridade de cosseno entre os embeddings é maior ou igual ao
+    `threshold`. As entradas expiram após `ttl` segundos e, ao atingir
+    `max_entries`, a menos usada recentemente é descartada.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, ttl: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def get(self, embedding: List[float], question: str) -> Optional[str]:
+        with self._lock:
+            key, score = self._best(embedding, question)
+
+            if key is None or score < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][2]
+
+    def match(self, embedding: List[float], question: str) -> Tuple[Optional[dict], float]:
+        """
+        A entrada mais parecida entre as que têm as mesmas constraints da
+        pergunta e a similaridade com ela, ou (None, -1.0), sem contar acerto
+        nem falha. Usado por `eval_direct_sql.py` para calibrar o threshold.
+        """
+        with self._lock:
+            key, score = self._best(embedding, question)
+            if key is None:
+                return None, score
+
+            _, cached_question, sql, _, _ = self._entries[key]
+            return {"question": cached_question, "sql": sql}, score
+
+    def set(self, embedding: List[float], question: str, sql: str):
+        with self._lock:
+            self._entries[self._next_key] = (
+                self._normalize(embedding),
+                question,
+                sql,
+                time.monotonic(),
+                question_constraints(question),
+            )
+            self._next_key += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
+
+    def _best(self, embedding: List[float], question: str) -> Tuple[Optional[int], float]:
+        self._evict_expired()
+
+        vector = self._normalize(embedding)
+        constraints = question_constraints(question)
+
+        best_key, best_score = None, -1.0
+        for key, (cached_vector, _, _, _, cached_constraints) in self._entries.items():
+            if cached_constraints != constraints:
+                continue
+            score = float(np.dot(vector, cached_vector))
+            if score > best_score:
+                best_key, best_score = key, score
+
+        return best_key, best_score
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [
+            key
+            for key, (_, _, _, created_at, _) in self._entries.items()
+            if now - created_at > self.ttl
+        ]
+        for key in expired:
+            del self._entries[key]
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticCacheMixin:
+    """
+    Coloca o `SemanticSQLCache` na frente de `generate_sql`, evitando uma nova
+    geração no Ollama para perguntas equivalentes às já respondidas. O cache é
+    limpo sempre que os dados de treinamento mudam. O threshold depende do
+    modelo de embedding e deve ser calibrado com `eval_direct_sql.py`.
+
+    Config:
+        - sql_cache: Liga ou desliga o cache. Padrão: True.
+        - sql_cache_threshold: Similaridade mínima para reaproveitar o SQL. Padrão: 0.95.
+        - sql_cache_max_entries: Máximo de perguntas em cache. Padrão: 512.
+        - sql_cache_ttl: Tempo de vida de uma entrada, em segundos. Padrão: 3600.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.sql_cache = None
+        if config.get("sql_cache", True):
+            self.sql_cache = SemanticSQLCache(
+                threshold=config.get("sql_cache_threshold", 0.95),
+                max_entries=config.get("sql_cache_max_entries", 512),
+                ttl=config.get("sql_cache_ttl", 3600),
+            )
+
+    def generate_sql(self, question: str, allow_llm_to_see_data=False, **kwargs) -> str:
+        if self.sql_cache is None:
+            return super().generate_sql(question, allow_llm_to_see_data=allow_llm_to_see_data, **kwargs)
+
+        embedding = self.generate_embedding(question)
+
+        sql = self.sql_cache.get(embedding, question)
+        if sql is not None:
+            self.log(title="Cache de SQL", message=f"Hit para a pergunta: {question}")
+            return sql
+
+        sql = super().generate_sql(question, allow_llm_to_see_data=allow_llm_to_see_data, **kwargs)
+
+        # Só guarda respostas que são SQL de fato, e não explicações ou erros do LLM
+        if self.is_sql_valid(sql):
+            self.sql_cache.set(embedding, question, sql)
+
+        return sql
+
+    def generate_sql_stream(self, question: str, allow_llm_to_see_data=False, **kwargs):
+        if self.sql_cache is None:
+            yield from super().generate_sql_stream(
+                question, allow_llm_to_see_data=allow_llm_to_see_data, **kwargs
+            )
+            return
+
+        embedding = self.generate_embedding(question)
+
+        sql = self.sql_cache.get(embedding, question)
+        if sql is not None:
+            self.log(title="Cache de SQL", message=f"Hit para a pergunta: {question}")
+            yield "sql", sql
+            return
+
+        for event, text in super().generate_sql_stream(
+            question, allow_llm_to_see_data=allow_llm_to_see_data, **kwargs
+        ):
+            if event == "sql" and self.is_sql_valid(text):
+                self.sql_cache.set(embedding, question, text)
+            yield event, text
+
+    def invalidate_sql_cache(self):
+        if self.sql_cache is not None:
+            self.sql_cache.clear()
+
+    def training_data_changed(self):
+        super().training_data_changed()
+        self.invalidate_sql_cache()
@@ -0,0 +1,143 @@
+import json
+from typing import Iterator, Tuple
+
+
+class StreamingMixin:
+    """
+    Geração de SQL com streaming dos tokens do Ollama.
+
+    `generate_sql_stream` produz eventos `("token", texto)` à medida que o modelo
+    gera a resposta e, ao final, um único `("sql", sql)` com o SQL extraído da
+    resposta completa, como em `generate_sql`. Se a resposta pede um SQL
+    intermediário, ele é executado e os tokens da geração final seguem no mesmo
+    stream.
+
+    As chamadas ao Ollama, com e sem streaming, passam a resposta final (com as
+    contagens de tokens e os tempos do modelo) para `llm_response_received`.
+    """
+
+    def llm_response_received(self, response):
+        """
+        Chamado com a resposta final de cada chamada ao Ollama. Não faz nada por
+        padrão; mixins como o de métricas sobrescrevem para registrar os tokens.
+        """
+        pass
+
+    def submit_prompt(self, prompt, **kwargs) -> str:
+        self.log(
+            f"Ollama parameters:\n"
+            f"model={self.model},\n"
+            f"options={self.ollama_options},\n"
+            f"keep_alive={self.keep_alive}"
+        )
+        self.log(f"Prompt Content:\n{json.dumps(prompt)}")
+
+        response = self.ollama_client.chat(
+            model=self.model,
+            messages=prompt,
+            stream=False,
+            options=self.ollama_options,
+            keep_alive=self.keep_alive,
+        )
+
+        self.log(f"Ollama Response:\n{str(response)}")
+        self.llm_response_received(response)
+
+        return response["message"]["content"]
+
+    def submit_prompt_stream(self, prompt, **kwargs) -> Iterator[str]:
+        self.log(title="Prompt Content (stream)", message=prompt)
+
+        for chunk in self.ollama_client.chat(
+            model=self.model,
+            messages=prompt,
+            stream=True,
+            options=self.ollama_options,
+            keep_alive=self.keep_alive,
+        ):
+            content = chunk["message"]["content"]
+            if content:
+                yield content
+
+            if chunk.get("done"):
+                self.llm_response_received(chunk)
+
+    def generate_sql_stream(
+        self, question: str, allow_llm_to_see_data=False, **kwargs
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        Example:
+        ```python
+        for event, text in vn.generate_sql_stream("Qual é o histórico de vendas por mês?"):
+            print(event, text)
+        ```
+        """
+        initial_prompt = self.config.get("initial_prompt", None)
+        context = kwargs.pop("related_context", None)
+        if context is None:
+            context = self.get_related_context(question)
+
+        question_sql_list = list(context.question_sql_list)
+        ddl_list = list(context.ddl_list)
+        doc_list = list(context.doc_list)
+
+        prompt = self.get_sql_prompt(
+            initial_prompt=initial_prompt,
+            question=question,
+            question_sql_list=question_sql_list,
+            ddl_list=ddl_list,
+            doc_list=doc_list,
+            related_context=context,
+            **kwargs,
+        )
+
+        llm_response = ""
+        for token in self.submit_prompt_stream(prompt, **kwargs):
+            llm_response += token
+            yield "token", token
+
+        self.log(title="LLM Response", message=llm_response)
+
+        # Como no generate_sql do Vanna: o SQL intermediário da resposta é executado
+        # e o resultado dele entra no prompt da geração final, também em streaming
+        if "intermediate_sql" in llm_response:
+            if not allow_llm_to_see_data:
+                yield "sql", (
+                    "The LLM is not allowed to see the data in your database. Your question requires database "
+                    "introspection to generate the necessary SQL. Please set allow_llm_to_see_data=True to "
+                    "enable this."
+                )
+                return
+
+            intermediate_sql = self.extract_sql(llm_response)
+            try:
+                self.log(title="Running Intermediate SQL", message=intermediate_sql)
+                df = self.run_sql(intermediate_sql)
+            except Exception as e:
+                yield "sql", f"Error running intermediate SQL: {e}"
+                return
+
+            # O resultado vai na frente da documentação: sem os scores da busca, o
+            # empacotador do prompt prioriza pela posição
+            prompt = self.get_sql_prompt(
+                initial_prompt=initial_prompt,
+                question=question,
+                question_sql_list=question_sql_list,
+                ddl_list=ddl_list,
+                doc_list=[
+                    f"The following is a pandas DataFrame with the results of the intermediate SQL query "
+                    f"{intermediate_sql}: \n" + df.to_markdown()
+                ]
+                + doc_list,
+                **kwargs,
+            )
+            self.log(title="Final SQL Prompt", message=prompt)
+
+            llm_response = ""
+            for token in self.submit_prompt_stream(prompt, **kwargs):
+                llm_response += token
+                yield "token", token
+
+            self.log(title="LLM Response", message=llm_response)
+
+        yield "sql", self.extract_sql(llm_response)
@@ -0,0 +1,41 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# Os módulos do app são importados sem pacote, como nos scripts de src/app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+@pytest.fixture(scope="session")
+def postgres_database():
+    """
+    Um banco vazio e descartável no Postgres do docker-compose.yml (ou no das
+    variáveis TEST_PG_*). Os testes que dependem dele são pulados se o Postgres
+    não estiver no ar.
+    """
+    psycopg2 = pytest.importorskip("psycopg2")
+
+    params = {
+        "host": os.getenv("TEST_PG_HOST", "localhost"),
+        "user": os.getenv("TEST_PG_USER", "admin"),
+        "password": os.getenv("TEST_PG_PASSWORD", "admin"),
+        "port": os.getenv("TEST_PG_PORT", "5432"),
+    }
+    try:
+        admin = psycopg2.connect(dbname=os.getenv("TEST_PG_ADMIN_DATABASE", "postgres"), connect_timeout=3, **params)
+    except psycopg2.Error as e:
+        pytest.skip(f"Postgres indisponível: {e}")
+
+    dbname = f"vanna_test_{uuid.uuid4().hex[:8]}"
+    admin.autocommit = True
+    with admin.cursor() as cs:
+        cs.execute(f"CREATE DATABASE {dbname} ENCODING 'UTF8' TEMPLATE template0")
+
+    try:
+        yield {"dbname": dbname, **params}
+    finally:
+        with admin.cursor() as cs:
+            cs.execute(f"DROP DATABASE IF EXISTS {dbname} WITH (FORCE)")
+        admin.close()
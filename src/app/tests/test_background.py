@@ -0,0 +1,98 @@
+import threading
+
+import pandas as pd
+import pytest
+from vanna.flask import MemoryCache
+
+from background import BackgroundGenerationMixin, dataframe_fingerprint
+from flask_app import MyVannaFlaskApp
+
+QUESTION = "Qual é o total de vendas por status?"
+SQL = "SELECT status, SUM(valor_total) AS total FROM compras GROUP BY status"
+
+
+class FakeVanna(BackgroundGenerationMixin):
+    # Os follow-ups e o resumo contam as chamadas em vez de chamar o Ollama
+    def __init__(self, config=None):
+        BackgroundGenerationMixin.__init__(self, config=config)
+        self.run_sql_is_set = True
+        self.calls = []
+        self.df = pd.DataFrame({"status": ["pago", "cancelado"], "total": [100.0, 50.0]})
+        self._calls_lock = threading.Lock()
+
+    def generate_followup_questions(self, question: str, sql: str, df: pd.DataFrame, **kwargs) -> list:
+        with self._calls_lock:
+            self.calls.append("followup_questions")
+        return [f"Follow-up com {len(df)} linhas"]
+
+    def generate_summary(self, question: str, df: pd.DataFrame, **kwargs) -> str:
+        with self._calls_lock:
+            self.calls.append("summary")
+        return f"Total {df['total'].sum()}"
+
+    def run_sql(self, sql: str, **kwargs) -> pd.DataFrame:
+        return self.df.copy()
+
+    def should_generate_chart(self, df: pd.DataFrame) -> bool:
+        return False
+
+
+def test_fingerprint_follows_the_data():
+    df = pd.DataFrame({"status": ["pago", "cancelado"], "total": [100.0, 50.0]})
+
+    assert dataframe_fingerprint(df) == dataframe_fingerprint(df.copy())
+    assert dataframe_fingerprint(df) != dataframe_fingerprint(df.assign(total=[100.0, 51.0]))
+    assert dataframe_fingerprint(df) != dataframe_fingerprint(df.rename(columns={"total": "soma"}))
+    assert dataframe_fingerprint(pd.DataFrame({"tags": [["a"], ["b"]]})) != dataframe_fingerprint(
+        pd.DataFrame({"tags": [["a"], ["c"]]})
+    )
+
+
+def test_jobs_are_regenerated_when_the_data_changes():
+    vn = FakeVanna()
+    df = vn.df
+
+    first = vn.summary_job(QUESTION, SQL, df).result()
+    assert vn.summary_job(QUESTION, SQL, df.copy()).result() == first
+
+    changed = df.assign(total=[10.0, 5.0])
+    assert vn.summary_job(QUESTION, SQL, changed).result() == "Total 15.0"
+    assert vn.calls == ["summary", "summary"]
+    assert vn.get_background_job("summary", QUESTION, SQL, changed).result() == "Total 15.0"
+    vn.background_jobs.close()
+
+
+@pytest.mark.parametrize(
+    "followup_questions, summarization, expected",
+    [
+        (True, True, {"followup_questions", "summary"}),
+        (True, False, {"followup_questions"}),
+        (False, True, {"summary"}),
+        (False, False, set()),
+    ],
+)
+def test_run_sql_prefetch_follows_flask_config(followup_questions, summarization, expected):
+    vn = FakeVanna()
+    app = MyVannaFlaskApp(
+        vn,
+        cache=MemoryCache(),
+        allow_llm_to_see_data=True,
+        followup_questions=followup_questions,
+        summarization=summarization,
+        debug=False,
+    )
+    id = app.cache.generate_id(question=QUESTION)
+    app.cache.set(id=id, field="question", value=QUESTION)
+    app.cache.set(id=id, field="sql", value=SQL)
+
+    response = app.flask_app.test_client().get(f"/api/v0/run_sql?id={id}")
+    assert response.get_json()["type"] == "df"
+
+    for kind in ("followup_questions", "summary"):
+        job = vn.get_background_job(kind, QUESTION, SQL, vn.df)
+        assert (job is not None) == (kind in expected)
+        if job is not None:
+            job.result(timeout=5)
+
+    assert set(vn.calls) == expected
+    vn.background_jobs.close()
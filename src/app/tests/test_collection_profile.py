@@ -0,0 +1,130 @@
+from types import SimpleNamespace
+
+from qdrant_client import models
+
+from collection_profile import PROFILES, CollectionProfileMixin, config_differs, quantization_config, resolve_profile
+
+COLLECTIONS = ("sql", "ddl", "documentation")
+
+
+class FakeClient:
+    # Guarda a configuração de cada collection como o get_collection do Qdrant servidor a devolve
+    def __init__(self):
+        self.collections = {}
+        self.calls = []
+
+    def collection_exists(self, collection_name):
+        return collection_name in self.collections
+
+    def create_collection(self, collection_name, vectors_config, hnsw_config, quantization_config, **kwargs):
+        self.calls.append(("create_collection", collection_name))
+        self.collections[collection_name] = SimpleNamespace(
+            config=SimpleNamespace(
+                params=SimpleNamespace(vectors=SimpleNamespace(on_disk=vectors_config.on_disk)),
+                hnsw_config=SimpleNamespace(
+                    m=hnsw_config.m if hnsw_config and hnsw_config.m else 16,
+                    ef_construct=hnsw_config.ef_construct if hnsw_config and hnsw_config.ef_construct else 100,
+                ),
+                quantization_config=quantization_config,
+            ),
+            payload_schema={},
+        )
+
+    def get_collection(self, collection_name):
+        self.calls.append(("get_collection", collection_name))
+        return self.collections[collection_name]
+
+    def update_collection(self, collection_name, **changes):
+        self.calls.append(("update_collection", collection_name, changes))
+        config = self.collections[collection_name].config
+        if "vectors_config" in changes:
+            config.params.vectors.on_disk = changes["vectors_config"][""].on_disk
+        if "hnsw_config" in changes:
+            config.hnsw_config.m = changes["hnsw_config"].m
+            config.hnsw_config.ef_construct = changes["hnsw_config"].ef_construct
+        if "quantization_config" in changes:
+            quantization = changes["quantization_config"]
+            config.quantization_config = None if quantization == models.Disabled.DISABLED else quantization
+
+    def create_payload_index(self, collection_name, field_name, field_schema):
+        self.calls.append(("create_payload_index", collection_name, field_name))
+        self.collections[collection_name].payload_schema[field_name] = field_schema
+
+
+class FakeVanna(CollectionProfileMixin):
+    def __init__(self, client, profile):
+        CollectionProfileMixin.__init__(self, config={"qdrant_profile": profile})
+        self._client = client
+        self.sql_collection_name, self.ddl_collection_name, self.documentation_collection_name = COLLECTIONS
+        self.embeddings_dimension = 384
+        self.distance_metric = models.Distance.COSINE
+        self.collection_params = {}
+        self.messages = []
+
+    def log(self, message, title="Info"):
+        self.messages.append(message)
+
+
+def setup(client, profile):
+    client.calls.clear()
+    FakeVanna(client, profile)._setup_collections()
+    return client.calls
+
+
+def updates(calls):
+    return [call for call in calls if call[0] == "update_collection"]
+
+
+def test_empty_profile_does_not_read_the_collections():
+    client = FakeClient()
+    setup(client, "memory")
+
+    assert setup(client, {}) == []
+
+
+def test_unchanged_profile_is_not_migrated():
+    client = FakeClient()
+    calls = setup(client, "memory")
+    assert [call[0] for call in calls].count("get_collection") == 0
+    assert [call[0] for call in calls].count("create_payload_index") == 2 * len(COLLECTIONS)
+
+    calls = setup(client, "memory")
+    assert [call[0] for call in calls] == ["get_collection"] * len(COLLECTIONS)
+
+
+def test_default_profile_resets_a_quantized_collection():
+    client = FakeClient()
+    setup(client, "memory")
+
+    calls = setup(client, "default")
+    assert len(updates(calls)) == len(COLLECTIONS)
+    assert set(updates(calls)[0][2]) == {"vectors_config", "quantization_config"}
+    assert updates(calls)[0][2]["quantization_config"] == models.Disabled.DISABLED
+
+    config = client.collections["sql"].config
+    assert config.quantization_config is None
+    assert config.params.vectors.on_disk is False
+    assert updates(setup(client, "default")) == []
+
+
+def test_quantization_is_compared_beyond_its_type():
+    client = FakeClient()
+    setup(client, "memory")
+
+    profile = {**PROFILES["memory"], "quantization_always_ram": False}
+    calls = setup(client, profile)
+    assert [set(call[2]) for call in updates(calls)] == [{"quantization_config"}] * len(COLLECTIONS)
+    assert client.collections["sql"].config.quantization_config.scalar.always_ram is False
+    assert updates(setup(client, profile)) == []
+
+
+def test_config_differs_ignores_fields_left_to_the_server():
+    desired = quantization_config(resolve_profile("binary"))
+    current = models.BinaryQuantization(
+        binary=models.BinaryQuantizationConfig(always_ram=True, encoding=models.BinaryQuantizationEncoding.ONE_BIT)
+    )
+
+    assert not config_differs(desired, current)
+    assert config_differs(desired, quantization_config(resolve_profile("memory")))
+    assert config_differs(desired, None)
+    assert not config_differs(None, None)
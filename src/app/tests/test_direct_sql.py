@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+from direct_sql import DirectSQLMixin
+
+TOP_5 = "Quais são os 5 vendedores que mais venderam em valor total?"
+TOP_5_SQL = "SELECT v.nome, SUM(c.valor_total) FROM vendedor v JOIN compras c USING (id_vendedor) GROUP BY 1 ORDER BY 2 DESC LIMIT 5"
+BOTTOM_5 = "Quais são os 5 vendedores que menos venderam em valor total?"
+BOTTOM_5_SQL = TOP_5_SQL.replace("DESC", "ASC")
+
+
+class LLM:
+    def generate_sql(self, question: str, allow_llm_to_see_data=False, **kwargs) -> str:
+        return "llm"
+
+
+class FakeVanna(DirectSQLMixin, LLM):
+    # Todas as perguntas têm o mesmo embedding: só as constraints separam os pares
+    def __init__(self, pairs: list, config=None):
+        DirectSQLMixin.__init__(self, config=config)
+        self.context = SimpleNamespace(question_sql_list=pairs)
+
+    def get_related_context(self, question: str):
+        return self.context
+
+    def generate_embedding(self, data: str, **kwargs) -> list:
+        return [0.1, 0.7, 0.2, 0.4]
+
+    def log(self, message: str, title: str = "Info"):
+        pass
+
+
+@pytest.fixture
+def vn():
+    return FakeVanna([{"question": TOP_5, "sql": TOP_5_SQL}])
+
+
+def test_same_constraints_use_the_trained_sql(vn):
+    assert vn.generate_sql("Quais os cinco vendedores que mais venderam em valor?") == TOP_5_SQL
+    assert vn.direct_sql_stats()["hits"] == 1
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        BOTTOM_5,
+        "Quais são os 10 vendedores que mais venderam em valor total?",
+        "Quais são os vendedores que mais venderam em valor total?",
+    ],
+    ids=["menos", "top_10", "no_number"],
+)
+def test_different_constraints_go_to_the_llm(vn, question):
+    assert vn.trained_sql_match(question, vn.context) == (None, 0.0)
+    assert vn.generate_sql(question) == "llm"
+    assert vn.direct_sql_stats()["misses"] == 1
+
+
+def test_skips_top_pair_with_other_constraints():
+    vn = FakeVanna([{"question": TOP_5, "sql": TOP_5_SQL}, {"question": BOTTOM_5, "sql": BOTTOM_5_SQL}])
+
+    pair, score = vn.trained_sql_match("Os 5 vendedores que menos venderam", vn.context)
+
+    assert pair["sql"] == BOTTOM_5_SQL
+    assert score == pytest.approx(1.0)
+
+
+def test_threshold_and_switch(vn):
+    vn.direct_sql_threshold = 1.01
+    assert vn.generate_sql(TOP_5) == "llm"
+
+    vn.direct_sql_threshold = 0.95
+    vn.direct_sql = False
+    assert vn.generate_sql(TOP_5) == "llm"
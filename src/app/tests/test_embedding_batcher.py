@@ -0,0 +1,167 @@
+import threading
+
+import pytest
+
+from embedding_batcher import EmbeddingBatcher, EmbeddingBatcherMixin
+
+
+class FakeModel:
+    """
+    Embeda cada texto como [tamanho, primeiro caractere] e guarda os lotes. Com
+    `hold`, o primeiro lote só termina quando o evento é liberado, para os
+    próximos textos se acumularem na fila.
+    """
+
+    def __init__(self, hold: bool = False, error: Exception = None):
+        self.batches = []
+        self.error = error
+        self.release = threading.Event()
+        self.running = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        self.running.set()
+        self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        return [[float(len(text)), float(ord(text[0]))] for text in texts]
+
+
+@pytest.fixture
+def model():
+    return FakeModel(hold=True)
+
+
+@pytest.fixture
+def batcher(model):
+    batcher = EmbeddingBatcher(model, max_batch_size=8, max_wait=0.05)
+    yield batcher
+    model.release.set()
+    batcher.close()
+
+
+def wait_for_queue(batcher, depth):
+    for _ in range(500):
+        if batcher.stats()["queue_depth"] == depth:
+            return
+        threading.Event().wait(0.01)
+    pytest.fail(f"queue did not reach {depth}")
+
+
+def test_results_go_back_to_their_callers(batcher, model):
+    first = batcher.submit("clientes")
+    assert model.running.wait(timeout=5)
+
+    texts = ["vendedor", "produtos", "vendedor", "compras", "ab"]
+    futures = [batcher.submit(text) for text in texts]
+    wait_for_queue(batcher, len(texts))
+    model.release.set()
+
+    assert first.result(timeout=5) == [8.0, float(ord("c"))]
+    assert [future.result(timeout=5) for future in futures] == [
+        [float(len(text)), float(ord(text[0]))] for text in texts
+    ]
+    # Os repetidos do lote são embedados uma vez só
+    assert model.batches == [["clientes"], ["vendedor", "produtos", "compras", "ab"]]
+    assert batcher.stats()["items"] == 6
+    assert batcher.stats()["largest_batch"] == 5
+
+
+def test_concurrent_callers_share_batches(batcher, model):
+    blocker = batcher.submit("x")
+    assert model.running.wait(timeout=5)
+
+    results = {}
+
+    def ask(i):
+        results[i] = batcher.embed("y" * i)
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(1, 17)]
+    for thread in threads:
+        thread.start()
+    wait_for_queue(batcher, 16)
+    model.release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert blocker.result(timeout=5) == [1.0, float(ord("x"))]
+    assert results == {i: [float(i), float(ord("y"))] for i in range(1, 17)}
+    # max_batch_size=8: os 16 textos viram dois lotes
+    assert [len(batch) for batch in model.batches] == [1, 8, 8]
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    model = FakeModel(hold=True, error=ValueError("model crashed"))
+    batcher = EmbeddingBatcher(model, max_wait=0.05)
+
+    first = batcher.submit("clientes")
+    assert model.running.wait(timeout=5)
+    futures = [batcher.submit(text) for text in ("vendedor", "produtos")]
+    wait_for_queue(batcher, 2)
+    model.release.set()
+
+    for future in (first, *futures):
+        with pytest.raises(ValueError, match="model crashed"):
+            future.result(timeout=5)
+
+    # A thread de trabalho continua atendendo depois do erro
+    model.error = None
+    assert batcher.embed("compras") == [7.0, float(ord("c"))]
+    batcher.close()
+
+
+def test_cancelled_futures_are_not_embedded(batcher, model):
+    batcher.submit("clientes")
+    assert model.running.wait(timeout=5)
+
+    cancelled = batcher.submit("vendedor")
+    kept = batcher.submit("produtos")
+    assert cancelled.cancel()
+    model.release.set()
+
+    assert kept.result(timeout=5) == [8.0, float(ord("p"))]
+    assert model.batches == [["clientes"], ["produtos"]]
+
+
+def test_close_finishes_the_queue_and_stops_the_workers():
+    model = FakeModel(hold=True)
+    batcher = EmbeddingBatcher(model, max_wait=0, workers=2)
+
+    futures = [batcher.submit(text) for text in ("clientes", "vendedor", "produtos")]
+    assert model.running.wait(timeout=5)
+    batcher.close()
+    batcher.close()
+    model.release.set()
+
+    assert [future.result(timeout=5)[0] for future in futures] == [8.0, 8.0, 8.0]
+    for worker in batcher._workers:
+        worker.join(timeout=5)
+        assert not worker.is_alive()
+
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.submit("compras")
+
+
+class Model:
+    def generate_embedding(self, data: str, **kwargs):
+        return ["direto", data]
+
+    def generate_embeddings(self, data: list, **kwargs):
+        return [[float(len(text))] for text in data]
+
+
+class BatchedModel(EmbeddingBatcherMixin, Model):
+    pass
+
+
+def test_mixin_batches_only_plain_calls():
+    model = BatchedModel(config={"embedding_batch_wait_ms": 0})
+
+    assert model.generate_embedding("clientes") == [8.0]
+    assert model.generate_embedding("clientes", batch_size=1) == ["direto", "clientes"]
+    assert model.embedding_batcher.stats()["batches"] == 1
+    model.embedding_batcher.close()
+
+    assert BatchedModel(config={"embedding_batching": False}).embedding_batcher is None
@@ -0,0 +1,110 @@
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache, EmbeddingCacheMixin, EmbeddingStore
+
+DIMENSION = 4
+
+
+def vector(i: int) -> list:
+    return [float(i), i + 0.5, -i, 1 / (i + 1)]
+
+
+class CountingModel:
+    # Faz o papel do modelo do fastembed, contando os textos embedados
+    fastembed_model = "BAAI/bge-small-en-v1.5"
+
+    def __init__(self):
+        self.embedded = []
+
+    def generate_embedding(self, data: str, **kwargs) -> list:
+        self.embedded.append(data)
+        return vector(len(data))
+
+    def generate_embeddings(self, data: list, **kwargs) -> list:
+        self.embedded.extend(data)
+        return [vector(len(text)) for text in data]
+
+
+class CachedModel(EmbeddingCacheMixin, CountingModel):
+    def __init__(self, config=None):
+        EmbeddingCacheMixin.__init__(self, config=config)
+        CountingModel.__init__(self)
+
+
+def test_store_reopens_and_reads_back(tmp_path):
+    store = EmbeddingStore(str(tmp_path), DIMENSION)
+    store.put_many([(f"k{i}", vector(i)) for i in range(10)])
+    store.put("k3", vector(99))
+
+    reopened = EmbeddingStore(str(tmp_path), DIMENSION)
+
+    assert len(reopened) == 10
+    for i in range(10):
+        np.testing.assert_array_equal(reopened.get(f"k{i}"), np.float32(vector(i)))
+    assert reopened.get("k10") is None
+
+
+def test_store_rejects_another_dimension(tmp_path):
+    EmbeddingStore(str(tmp_path), DIMENSION)
+
+    with pytest.raises(ValueError, match="dimension 4, expected 8"):
+        EmbeddingStore(str(tmp_path), 8)
+
+
+def test_concurrent_appends_from_two_stores(tmp_path):
+    stores = [EmbeddingStore(str(tmp_path), DIMENSION), EmbeddingStore(str(tmp_path), DIMENSION)]
+
+    # As duas instâncias gravam chaves próprias e uma faixa em comum
+    def write(store, prefix):
+        for i in range(0, 100, 5):
+            store.put_many([(f"{prefix}{j}", vector(j)) for j in range(i, i + 5)] + [(f"shared{i}", vector(i))])
+
+    threads = [threading.Thread(target=write, args=(store, prefix)) for store, prefix in zip(stores, "ab")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reopened = EmbeddingStore(str(tmp_path), DIMENSION)
+    assert len(reopened) == 220
+    assert (tmp_path / "vectors.f32").stat().st_size == 220 * DIMENSION * 4
+    for store in (*stores, reopened):
+        for key, i in (("a0", 0), ("b99", 99), ("shared95", 95)):
+            np.testing.assert_array_equal(store.get(key), np.float32(vector(i)))
+
+
+def test_lru_hits_skip_the_model():
+    model = CachedModel(config={"embedding_cache_path": None, "embedding_cache_max_entries": 2})
+
+    first = model.generate_embedding("clientes")
+    assert model.generate_embedding("clientes") == first
+    assert model.generate_embeddings(["clientes", "vendedor", "clientes"]) == [first, vector(8), first]
+    assert model.embedded == ["clientes", "vendedor"]
+
+    # "clientes" é o usado há mais tempo e sai do LRU
+    model.generate_embedding("produtos")
+    model.generate_embedding("clientes")
+    assert model.embedded == ["clientes", "vendedor", "produtos", "clientes"]
+    assert model.embedding_cache.stats()["memory_hits"] == 3
+
+
+def test_disk_hits_skip_the_model_after_a_restart(tmp_path):
+    CachedModel(config={"embedding_cache_path": str(tmp_path)}).generate_embeddings(["clientes", "vendedor"])
+
+    model = CachedModel(config={"embedding_cache_path": str(tmp_path)})
+    embedding = model.generate_embedding("vendedor")
+
+    np.testing.assert_array_equal(embedding, np.float32(vector(8)))
+    assert model.embedded == []
+    assert model.embedding_cache.stats()["disk_hits"] == 1
+
+
+def test_models_do_not_share_vectors(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put("modelo-a", "clientes", vector(1))
+
+    assert cache.get("modelo-b", "clientes") is None
+    assert cache.get("modelo-a", "clientes") == vector(1)
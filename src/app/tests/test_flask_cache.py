@@ -0,0 +1,161 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import flask_cache
+from flask_cache import COMPRESS_MIN_BYTES, SQLiteCache, dumps, loads
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(flask_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "flask_cache.sqlite")
+
+
+@pytest.fixture
+def cache(path, clock):
+    cache = SQLiteCache(path, ttl=60)
+    yield cache
+    cache.close()
+
+
+def test_dumps_compresses_only_large_values():
+    small = {"sql": "SELECT 1"}
+    large = pd.DataFrame({"status": ["pago", "cancelado"] * 1000, "total": range(2000)})
+
+    assert dumps(small)[:1] == b"p"
+    assert dumps(large)[:1] == b"z"
+    assert len(dumps(large)) < len(dumps(large.to_dict()))
+    assert loads(dumps(small)) == small
+    pd.testing.assert_frame_equal(loads(dumps(large)), large)
+
+
+def test_round_trip(cache):
+    df = pd.DataFrame({"status": ["pago", "cancelado"], "total": [100.0, 50.5]})
+    cache.set("a", "question", "Qual é o total por status?")
+    cache.set("a", "df", df)
+
+    assert cache.get("a", "question") == "Qual é o total por status?"
+    pd.testing.assert_frame_equal(cache.get("a", "df"), df)
+    assert cache.get("a", "sql") is None
+    assert cache.get("b", "question") is None
+    assert cache.get_all(["question", "sql"]) == [{"id": "a", "question": "Qual é o total por status?", "sql": None}]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+    cache.delete("a")
+    assert cache.get("a", "question") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_overwrite_keeps_the_size_in_sync(cache):
+    cache.set("a", "sql", "x" * COMPRESS_MIN_BYTES * 4)
+    cache.set("a", "sql", "SELECT 1")
+
+    assert cache.stats()["size_bytes"] == len(dumps("SELECT 1"))
+
+
+def test_ttl_expiry(cache, clock):
+    cache.set("a", "sql", "SELECT 1")
+    clock.now += 59
+    assert cache.get("a", "sql") == "SELECT 1"
+
+    # O ttl conta da criação, não do último acesso
+    clock.now += 2
+    assert cache.get("a", "sql") is None
+    assert cache.get_all(["sql"]) == []
+
+    cache.set("b", "sql", "SELECT 2")
+    assert cache.stats()["size"] == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evicts_least_recently_used_over_max_entries(path, clock):
+    cache = SQLiteCache(path, max_entries=2)
+    cache.set("a", "sql", "SELECT 1")
+    clock.now += 2
+    cache.set("b", "sql", "SELECT 2")
+    clock.now += 2
+    assert cache.get("a", "sql") == "SELECT 1"
+
+    clock.now += 2
+    cache.set("c", "sql", "SELECT 3")
+
+    assert cache.get("b", "sql") is None
+    assert cache.get("a", "sql") == "SELECT 1"
+    assert cache.get("c", "sql") == "SELECT 3"
+    assert cache.stats()["evictions"] == 1
+    cache.close()
+
+
+def test_evicts_over_max_bytes_but_keeps_the_current_id(path, clock):
+    value = "x" * 2000
+    size = len(dumps(value))
+    cache = SQLiteCache(path, max_bytes=size * 2)
+
+    for id in ("a", "b", "c"):
+        cache.set(id, "sql", value)
+        clock.now += 2
+
+    assert cache.get("a", "sql") is None
+    assert cache.stats()["size_bytes"] == size * 2
+
+    # Sozinho acima do limite, o id gravado por último fica
+    cache.set("d", "sql", "y" * size * 3)
+    assert cache.get("d", "sql") == "y" * size * 3
+    assert cache.stats()["size"] == 1
+    cache.close()
+
+
+def test_instances_share_the_file(path, clock):
+    first, second = SQLiteCache(path, max_entries=2), SQLiteCache(path, max_entries=2)
+
+    first.set("a", "sql", "SELECT 1")
+    assert second.get("a", "sql") == "SELECT 1"
+
+    clock.now += 2
+    second.set("b", "sql", "SELECT 2")
+    clock.now += 2
+    second.set("c", "sql", "SELECT 3")
+
+    # O despejo feito por uma instância vale para a outra
+    assert first.get("a", "sql") is None
+    assert first.get("c", "sql") == "SELECT 3"
+
+    first.close()
+    second.close()
+
+
+def test_concurrent_writes_from_two_instances(path):
+    caches = [SQLiteCache(path), SQLiteCache(path)]
+
+    def write(cache, prefix):
+        for i in range(50):
+            cache.set(f"{prefix}{i}", "sql", f"SELECT {i}")
+
+    threads = [threading.Thread(target=write, args=(cache, prefix)) for cache, prefix in zip(caches, "ab")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert caches[0].stats()["size"] == 100
+    assert caches[1].get("a49", "sql") == "SELECT 49"
+    assert caches[0].get("b0", "sql") == "SELECT 0"
+    for cache in caches:
+        cache.close()
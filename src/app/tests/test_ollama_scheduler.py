@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from ollama_scheduler import PRIORITY_BACKGROUND, PRIORITY_CHART, PRIORITY_SQL, OllamaScheduler
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("timeout esperando o agendador")
+        time.sleep(0.005)
+
+
+def hold_slot(scheduler: OllamaScheduler):
+    # Ocupa a única vaga até o evento ser liberado
+    release = threading.Event()
+    thread = threading.Thread(target=lambda: scheduler.run("holder", release.wait), daemon=True)
+    thread.start()
+    wait_for(lambda: scheduler.stats()["running"] == 1)
+    return release, thread
+
+
+def enqueue(scheduler: OllamaScheduler, name: str, priority: int, order: list) -> threading.Thread:
+    def call():
+        with scheduler.slot(priority):
+            order.append(name)
+
+    depth = scheduler.stats()["queue_depth"]
+    thread = threading.Thread(target=call, daemon=True)
+    thread.start()
+    # Um de cada vez, para a ordem de chegada ser a do teste
+    wait_for(lambda: scheduler.stats()["queue_depth"] > depth or not thread.is_alive())
+    return thread
+
+
+def test_priority_then_arrival_order():
+    scheduler = OllamaScheduler(max_concurrency=1)
+    release, holder = hold_slot(scheduler)
+
+    order = []
+    threads = [
+        enqueue(scheduler, name, priority, order)
+        for name, priority in [
+            ("summary", PRIORITY_BACKGROUND),
+            ("chart", PRIORITY_CHART),
+            ("sql_1", PRIORITY_SQL),
+            ("followup", PRIORITY_BACKGROUND),
+            ("sql_2", PRIORITY_SQL),
+        ]
+    ]
+
+    release.set()
+    for thread in [holder, *threads]:
+        thread.join(timeout=5)
+
+    assert order == ["sql_1", "sql_2", "chart", "summary", "followup"]
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+def test_concurrency_limit():
+    scheduler = OllamaScheduler(max_concurrency=2)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def generate():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+
+    threads = [threading.Thread(target=scheduler.run, args=(f"prompt {i}", generate)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert peak[0] == 2
+    assert scheduler.stats()["completed"] == 8
+
+
+def test_failed_wait_leaves_the_queue():
+    scheduler = OllamaScheduler(max_concurrency=1)
+    release, holder = hold_slot(scheduler)
+
+    wait = scheduler._condition.wait
+
+    def interrupted_wait(timeout=None):
+        if threading.current_thread().name == "interrupted":
+            raise KeyboardInterrupt
+        return wait(timeout)
+
+    scheduler._condition.wait = interrupted_wait
+
+    errors = []
+
+    def interrupted_call():
+        try:
+            with scheduler.slot(PRIORITY_SQL):
+                pass
+        except KeyboardInterrupt:
+            errors.append("interrupted")
+
+    # O ticket com a maior prioridade sai da fila quando a espera falha
+    interrupted = threading.Thread(target=interrupted_call, name="interrupted", daemon=True)
+    interrupted.start()
+    interrupted.join(timeout=5)
+    assert errors == ["interrupted"]
+    assert scheduler.stats()["queue_depth"] == 0
+
+    order = []
+    waiting = enqueue(scheduler, "chart", PRIORITY_CHART, order)
+    release.set()
+    holder.join(timeout=5)
+    waiting.join(timeout=5)
+
+    assert order == ["chart"]
+    assert scheduler.stats()["running"] == 0
@@ -0,0 +1,145 @@
+import psycopg2
+import pytest
+from vanna.flask import MemoryCache
+
+from flask_app import MyVannaFlaskApp
+from postgres import PostgresPoolMixin
+from query_guard import QueryGuardMixin, limit_sql
+
+SELECT_ALL = "SELECT i FROM guard_vendas ORDER BY i DESC"
+
+CASES = {
+    "order_by": (
+        "SELECT * FROM compras ORDER BY data_compra DESC;",
+        "select * from compras order by data_compra desc\nLIMIT 100",
+    ),
+    "no_order_by": ("SELECT * FROM compras", "select * from compras\nLIMIT 100"),
+    "cte": (
+        "WITH t AS (SELECT * FROM compras ORDER BY 1 LIMIT 5000) SELECT * FROM t ORDER BY valor_total",
+        "with t as (select * from compras order by 1 limit 5000) select * from t order by valor_total\nLIMIT 100",
+    ),
+    "union": (
+        "SELECT nome FROM clientes UNION ALL SELECT nome FROM vendedor ORDER BY 1",
+        "select nome from clientes union all select nome from vendedor order by 1\nLIMIT 100",
+    ),
+    "parenthesized_union": (
+        "(SELECT nome FROM clientes LIMIT 500) UNION (SELECT nome FROM vendedor)",
+        "(select nome from clientes limit 500) union (select nome from vendedor)\nLIMIT 100",
+    ),
+    "larger_limit": (
+        "SELECT * FROM compras ORDER BY 1 LIMIT 50000 OFFSET 10",
+        "select * from compras order by 1 limit 100 offset 10",
+    ),
+    "smaller_limit": ("SELECT * FROM compras ORDER BY 1 LIMIT 5", "select * from compras order by 1 limit 5"),
+    "limit_all": ("SELECT * FROM compras LIMIT ALL", "select * from compras limit 100"),
+    "limit_expression": (
+        "SELECT * FROM compras ORDER BY 1 OFFSET 3 LIMIT (SELECT COUNT(*) FROM produtos) FOR SHARE",
+        "select * from compras order by 1 offset 3 limit (LEAST((select count(*) from produtos), 100)) for share",
+    ),
+    "fetch_first": (
+        "SELECT * FROM compras ORDER BY 1 FETCH FIRST 50000 ROWS WITH TIES",
+        "select * from compras order by 1 fetch first 100 rows with ties",
+    ),
+    "fetch_one": (
+        "SELECT * FROM compras ORDER BY 1 FETCH NEXT ROW ONLY",
+        "select * from compras order by 1 fetch next row only",
+    ),
+    "quoted": (
+        "SELECT 'limit 5' AS \"limit\" FROM compras",
+        "select 'limit 5' as \"limit\" from compras\nLIMIT 100",
+    ),
+}
+
+
+@pytest.mark.parametrize("sql, expected", CASES.values(), ids=CASES.keys())
+def test_limit_sql(sql, expected):
+    assert limit_sql(sql, 100) == expected
+
+
+ORDERED = {
+    "order_by": "SELECT i, grupo FROM guard_numeros ORDER BY grupo DESC, i",
+    "cte": (
+        "WITH pares AS (SELECT * FROM guard_numeros WHERE i % 2 = 0 ORDER BY i LIMIT 80) "
+        "SELECT i, grupo FROM pares ORDER BY grupo, i DESC"
+    ),
+    "union": "SELECT i FROM guard_numeros WHERE grupo = 1 UNION SELECT i * 1000 FROM guard_numeros ORDER BY 1 DESC",
+    "existing_limit": "SELECT i FROM guard_numeros ORDER BY i DESC LIMIT 50 OFFSET 5",
+    "limit_expression": "SELECT i FROM guard_numeros ORDER BY i LIMIT (SELECT COUNT(*) FROM guard_numeros)",
+}
+
+
+@pytest.fixture(scope="module")
+def cursor(postgres_database):
+    conn = psycopg2.connect(**postgres_database)
+    with conn.cursor() as cs:
+        cs.execute("CREATE TABLE guard_numeros AS SELECT i, i % 7 AS grupo FROM generate_series(1, 300) AS t(i)")
+        yield cs
+    conn.rollback()
+    conn.close()
+
+
+@pytest.mark.parametrize("sql", ORDERED.values(), ids=ORDERED.keys())
+def test_limit_keeps_order(cursor, sql):
+    cursor.execute(sql)
+    expected = cursor.fetchall()[:10]
+
+    cursor.execute(limit_sql(sql, 10))
+
+    assert cursor.fetchall() == expected
+
+
+class GuardedVanna(QueryGuardMixin, PostgresPoolMixin):
+    # Só a guarda e o pool do MyVanna, sem Qdrant nem Ollama
+    def __init__(self, config=None):
+        QueryGuardMixin.__init__(self, config=config)
+        PostgresPoolMixin.__init__(self, config=config)
+
+    def log(self, message: str, title: str = "Info"):
+        pass
+
+
+@pytest.fixture(scope="module")
+def vn(postgres_database):
+    conn = psycopg2.connect(**postgres_database)
+    with conn.cursor() as cs:
+        cs.execute("CREATE TABLE guard_vendas AS SELECT i FROM generate_series(1, 300) AS t(i)")
+        cs.execute("ANALYZE guard_vendas")
+    conn.commit()
+    conn.close()
+
+    vn = GuardedVanna(config={"query_guard_max_rows": 50})
+    vn.connect_to_postgres(**postgres_database)
+    yield vn
+    vn.close()
+
+
+def run_sql_response(vn, sql):
+    app = MyVannaFlaskApp(vn, cache=MemoryCache(), chart=False, debug=False)
+    id = app.cache.generate_id(question="Quais vendas?")
+    app.cache.set(id=id, field="question", value="Quais vendas?")
+    app.cache.set(id=id, field="sql", value=sql)
+    return app.flask_app.test_client().get(f"/api/v0/run_sql?id={id}").get_json()
+
+
+def test_limited_result_carries_the_decision(vn):
+    df = vn.run_sql(SELECT_ALL)
+
+    assert df["i"].tolist() == list(range(300, 250, -1))
+    assert df.attrs["guard"]["action"] == "limit"
+    assert df.attrs["guard"]["sql"] == limit_sql(SELECT_ALL, 50)
+
+
+def test_run_sql_route_returns_the_limit_decision(vn):
+    body = run_sql_response(vn, SELECT_ALL)
+
+    assert body["type"] == "df"
+    assert body["guard"]["action"] == "limit"
+    assert body["guard"]["rows"] == 300
+    assert body["guard"]["max_rows"] == 50
+
+
+def test_allowed_result_has_no_guard_field(vn):
+    body = run_sql_response(vn, f"{SELECT_ALL} LIMIT 10")
+
+    assert body["type"] == "df"
+    assert "guard" not in body
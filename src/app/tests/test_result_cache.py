@@ -0,0 +1,99 @@
+import pandas as pd
+import pytest
+
+from result_cache import ResultCacheMixin, extract_tables
+
+TABLES = {
+    "from": ("SELECT * FROM compras", {"compras"}),
+    "join": (
+        "SELECT v.nome, SUM(c.valor_total) FROM vendedor v JOIN compras c ON c.id_vendedor = v.id_vendedor GROUP BY 1",
+        {"vendedor", "compras"},
+    ),
+    "comma_join": ("SELECT * FROM compras a, produtos b WHERE a.id_produto = b.id_produto", {"compras", "produtos"}),
+    "comma_after_join": (
+        "SELECT * FROM compras c JOIN produtos p ON p.id_produto = c.id_produto, vendedor v, clientes AS cl",
+        {"compras", "produtos", "vendedor", "clientes"},
+    ),
+    "extract": (
+        "SELECT EXTRACT(DOW FROM data_compra), COUNT(*) FROM compras GROUP BY 1",
+        {"compras"},
+    ),
+    "substring_trim": (
+        "SELECT SUBSTRING(nome FROM 1 FOR 3), TRIM(BOTH FROM email) FROM clientes",
+        {"clientes"},
+    ),
+    "is_distinct_from": ("SELECT * FROM compras WHERE status IS DISTINCT FROM 'pago'", {"compras"}),
+    "literal": ("SELECT 'from vendedor', nome FROM produtos", {"produtos"}),
+    "schema_and_quotes": ('SELECT * FROM public.compras, "Vendedor"', {"compras", "Vendedor"}),
+    "subquery": (
+        "SELECT * FROM (SELECT id_cliente, SUM(valor_total) AS total FROM compras GROUP BY 1) t, clientes c "
+        "WHERE t.id_cliente = c.id_cliente AND c.id_vendedor IN (SELECT id_vendedor FROM vendedor)",
+        {"compras", "clientes", "vendedor"},
+    ),
+    "cte": (
+        "WITH mensal (mes, total) AS (SELECT DATE_TRUNC('month', data_compra), SUM(valor_total) FROM compras GROUP BY 1), "
+        "top AS MATERIALIZED (SELECT * FROM mensal ORDER BY total DESC LIMIT 3) SELECT * FROM top",
+        {"compras"},
+    ),
+    "union": ("SELECT nome FROM clientes UNION SELECT nome FROM vendedor", {"clientes", "vendedor"}),
+    "no_table": ("SELECT 1", set()),
+}
+
+UNSURE = {
+    "table_function": "SELECT * FROM generate_series(1, 10) g",
+    "function_in_list": "SELECT * FROM compras c, unnest(ARRAY[1, 2]) AS u(x)",
+    "parenthesized_join": "SELECT * FROM (compras c JOIN produtos p ON p.id_produto = c.id_produto)",
+    "unbalanced": "SELECT * FROM (SELECT * FROM compras",
+    "truncated": "SELECT * FROM",
+}
+
+
+@pytest.mark.parametrize("sql, tables", TABLES.values(), ids=TABLES.keys())
+def test_extract_tables(sql, tables):
+    assert extract_tables(sql) == tables
+
+
+@pytest.mark.parametrize("sql", UNSURE.values(), ids=UNSURE.keys())
+def test_extract_tables_unsure(sql):
+    assert extract_tables(sql) is None
+
+
+class Database:
+    def __init__(self):
+        self.pg_pool = None
+        self.executed = []
+
+    def run_sql(self, sql: str, **kwargs) -> pd.DataFrame:
+        self.executed.append(sql)
+        return pd.DataFrame({"n": [len(self.executed)]})
+
+
+class CachedDatabase(ResultCacheMixin, Database):
+    def __init__(self, config=None):
+        ResultCacheMixin.__init__(self, config=config)
+        Database.__init__(self)
+
+    def log(self, message: str, title: str = "Info"):
+        pass
+
+
+def test_run_sql_caches_known_tables():
+    vn = CachedDatabase()
+    sql = "SELECT * FROM compras a, produtos b WHERE a.id_produto = b.id_produto"
+
+    vn.run_sql(sql)
+    vn.run_sql(sql)
+    vn.invalidate_result_cache({"produtos"})
+    vn.run_sql(sql)
+
+    assert len(vn.executed) == 2
+
+
+@pytest.mark.parametrize("sql", [UNSURE["table_function"], TABLES["no_table"][0]], ids=["unsure", "no_table"])
+def test_run_sql_skips_cache_without_tables(sql):
+    vn = CachedDatabase()
+
+    vn.run_sql(sql)
+    vn.run_sql(sql)
+
+    assert len(vn.executed) == 2
@@ -0,0 +1,200 @@
+import re
+import time
+
+import psycopg2
+import pytest
+from vanna.exceptions import ValidationError
+
+import corpus
+from benchmark_e2e import SEED_SQL
+from benchmark_rollups import RollupBenchmark, same_result
+from rollups import FACT_TABLE, analyze_query
+
+COMPRAS = 20000
+
+# Colunas da compras do SEED_SQL, como o `get_fact_columns` as lê do catálogo
+FACT_COLUMNS = {
+    "id_compra": {"category": "N", "type": "int4", "not_null": True, "primary_key": True, "foreign_key": False},
+    "id_cliente": {"category": "N", "type": "int4", "not_null": False, "primary_key": False, "foreign_key": True},
+    "id_produto": {"category": "N", "type": "int4", "not_null": False, "primary_key": False, "foreign_key": True},
+    "id_vendedor": {"category": "N", "type": "int4", "not_null": False, "primary_key": False, "foreign_key": True},
+    "quantidade": {"category": "N", "type": "int4", "not_null": True, "primary_key": False, "foreign_key": False},
+    "valor_total": {"category": "N", "type": "numeric", "not_null": True, "primary_key": False, "foreign_key": False},
+    "data_compra": {"category": "D", "type": "timestamp", "not_null": True, "primary_key": False, "foreign_key": False},
+    "status": {"category": "S", "type": "varchar", "not_null": False, "primary_key": False, "foreign_key": False},
+    "metodo_pagamento": {"category": "S", "type": "varchar", "not_null": False, "primary_key": False, "foreign_key": False},
+}
+
+CASES = {
+    "comma_join": """
+        SELECT v.nome, SUM(c.valor_total) AS total
+        FROM compras c, vendedor v
+        WHERE c.id_vendedor = v.id_vendedor
+        GROUP BY v.nome
+        ORDER BY total DESC
+    """,
+    "having": """
+        SELECT id_cliente, COUNT(*) AS n_compras
+        FROM compras
+        GROUP BY id_cliente
+        HAVING SUM(valor_total) > 5000
+    """,
+    "avg": """
+        SELECT p.categoria, AVG(c.valor_total) AS ticket_medio
+        FROM compras c
+        JOIN produtos p ON p.id_produto = c.id_produto
+        GROUP BY p.categoria
+    """,
+    "count_star": """
+        SELECT EXTRACT(DOW FROM data_compra) AS dia_semana, COUNT(*)
+        FROM compras
+        WHERE status = 'pago'
+        GROUP BY 1
+    """,
+    "int_sum": """
+        SELECT DATE_TRUNC('month', data_compra) AS mes, SUM(quantidade) AS itens
+        FROM compras
+        GROUP BY mes
+        ORDER BY mes
+    """,
+    "min_max": """
+        SELECT c.metodo_pagamento, COUNT(c.valor_total), MIN(c.valor_total), MAX(c.data_compra)::date
+        FROM compras AS c
+        GROUP BY c.metodo_pagamento
+    """,
+    "unaliased_dimensions": """
+        SELECT DATE_TRUNC('week', data_compra), EXTRACT(HOUR FROM data_compra), data_compra::date, SUM(valor_total)
+        FROM compras
+        GROUP BY 1, 2, 3
+    """,
+}
+
+UNSUPPORTED = {
+    "cte": """
+        WITH mensal AS (SELECT DATE_TRUNC('month', data_compra) AS mes, SUM(valor_total) AS total FROM compras GROUP BY 1)
+        SELECT mes, total FROM mensal
+    """,
+    "union": """
+        SELECT status, COUNT(*) FROM compras GROUP BY status
+        UNION ALL
+        SELECT 'total', COUNT(*) FROM compras
+    """,
+    "left_join": """
+        SELECT v.nome, COUNT(c.id_compra)
+        FROM vendedor v LEFT JOIN compras c ON c.id_vendedor = v.id_vendedor
+        GROUP BY v.nome
+    """,
+    "full_outer_join": """
+        SELECT p.nome, SUM(c.valor_total)
+        FROM compras c FULL OUTER JOIN produtos p ON p.id_produto = c.id_produto
+        GROUP BY p.nome
+    """,
+    "subquery": """
+        SELECT id_vendedor, SUM(valor_total) FROM compras
+        WHERE id_cliente IN (SELECT id_cliente FROM clientes WHERE regiao = 'Sul')
+        GROUP BY id_vendedor
+    """,
+    "count_nullable": "SELECT metodo_pagamento, COUNT(id_vendedor) FROM compras GROUP BY metodo_pagamento",
+    "no_aggregate": "SELECT id_compra, valor_total FROM compras WHERE valor_total > 500",
+    "sum_expression": "SELECT id_vendedor, SUM(quantidade * valor_total) FROM compras GROUP BY id_vendedor",
+    "primary_key": "SELECT id_compra, SUM(valor_total) FROM compras GROUP BY id_compra",
+}
+
+CORPUS = {
+    pair["question"]: pair["sql"]
+    for pair in corpus.QUESTION_SQL
+    if analyze_query(pair["sql"], FACT_COLUMNS) is not None
+}
+
+
+@pytest.mark.parametrize("sql", UNSUPPORTED.values(), ids=UNSUPPORTED.keys())
+def test_unsupported_queries_are_not_rewritten(sql):
+    assert analyze_query(sql, FACT_COLUMNS) is None
+
+
+@pytest.mark.parametrize("sql", CASES.values(), ids=CASES.keys())
+def test_supported_queries_are_rewritten(sql):
+    query = analyze_query(sql, FACT_COLUMNS)
+
+    assert query is not None
+    assert re.search(rf"\b(from|join) {FACT_TABLE}\b", query.template) is None
+
+
+def test_int_sum_keeps_bigint():
+    query = analyze_query(CASES["int_sum"], FACT_COLUMNS)
+
+    assert "sum(compras.sum_quantidade)::bigint" in query.template
+
+
+@pytest.fixture(scope="module")
+def vn(postgres_database):
+    # O seed roda em uma conexão própria: ao fechar, ela publica os contadores de
+    # pg_stat_user_tables, e a assinatura da compras fica estável durante os testes
+    conn = psycopg2.connect(**postgres_database)
+    with conn.cursor() as cs:
+        cs.execute(SEED_SQL.format(clientes=200, compras=COMPRAS))
+        cs.execute("ANALYZE vendedor, clientes, produtos, compras")
+    conn.commit()
+    conn.close()
+
+    vn = RollupBenchmark(config={"result_cache": False, "rollups": True, "rollup_reload_interval": 0})
+    vn.connect_to_postgres(**postgres_database)
+
+    deadline = time.monotonic() + 30
+    while vn._get_tables_signature({FACT_TABLE})[0][2] < COMPRAS:
+        if time.monotonic() > deadline:
+            pytest.fail("pg_stat_user_tables não registrou o seed da compras")
+        time.sleep(0.2)
+
+    yield vn
+    vn.close()
+
+
+def assert_same_result(vn, sql):
+    query = analyze_query(sql, vn.get_fact_columns())
+    assert query is not None
+    vn.create_rollup(query.dims)
+    assert vn.rewrite_with_rollup(sql) is not None
+
+    vn.rollups = False
+    try:
+        expected = vn.run_sql(sql)
+    except ValidationError as e:
+        pytest.skip(f"O SQL falha sem rollups: {e}")
+    vn.rollups = True
+    actual = vn.run_sql(sql)
+
+    assert same_result(expected, actual), f"\n{expected}\n!=\n{actual}"
+    assert list(expected.dtypes) == list(actual.dtypes)
+
+
+def test_fact_columns_match_catalog(vn):
+    catalog = vn.get_fact_columns()
+
+    assert {name: {key: column[key] for key in FACT_COLUMNS[name]} for name, column in catalog.items()} == FACT_COLUMNS
+
+
+@pytest.mark.parametrize("sql", CASES.values(), ids=CASES.keys())
+def test_rewritten_cases_return_same_result(vn, sql):
+    assert_same_result(vn, sql)
+
+
+@pytest.mark.parametrize("sql", CORPUS.values(), ids=CORPUS.keys())
+def test_rewritten_corpus_returns_same_result(vn, sql):
+    assert_same_result(vn, sql)
+
+
+def test_stale_rollup_is_not_used(vn):
+    sql = CASES["count_star"]
+    vn.create_rollup(analyze_query(sql, FACT_COLUMNS).dims)
+
+    with vn.pg_connection() as conn:
+        with conn.cursor() as cs:
+            cs.execute("TRUNCATE compras")
+        conn.commit()
+
+    try:
+        assert vn.rewrite_with_rollup(sql) is None
+        assert vn.run_sql(sql).empty
+    finally:
+        vn.refresh_rollups()
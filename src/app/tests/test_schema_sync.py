@@ -0,0 +1,112 @@
+import psycopg2
+import pytest
+from vanna.base import VannaBase
+
+from postgres import PostgresPoolMixin
+from schema_sync import SchemaSyncMixin
+
+pytest.importorskip("tabulate")
+
+
+class FakeClient:
+    def __init__(self):
+        self.deleted = []
+
+    def delete(self, collection_name, points_selector):
+        conditions = points_selector.filter.must
+        self.deleted.append(conditions[1].match.any if len(conditions) > 1 else None)
+
+
+class SchemaSync(SchemaSyncMixin, PostgresPoolMixin):
+    # Só a parte do MyVanna que lê o catálogo; os pontos ficam em listas em vez do Qdrant
+    documentation_collection_name = "documentation"
+    get_training_plan_generic = VannaBase.get_training_plan_generic
+
+    def __init__(self, config=None):
+        SchemaSyncMixin.__init__(self, config=config)
+        PostgresPoolMixin.__init__(self, config=config)
+        self._client = FakeClient()
+        self.upserted = []
+
+    def _upsert_training_points(self, points_by_collection: dict):
+        self.upserted.extend(payload["table"] for _, _, payload in points_by_collection["documentation"])
+
+    def training_data_changed(self):
+        pass
+
+    def log(self, message: str, title: str = "Info"):
+        pass
+
+
+def execute(postgres_database, sql):
+    conn = psycopg2.connect(**postgres_database)
+    with conn.cursor() as cs:
+        cs.execute(sql)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def vn(postgres_database, tmp_path):
+    execute(postgres_database, "CREATE SCHEMA sync_test")
+
+    vn = SchemaSync(
+        config={"schema_manifest_path": str(tmp_path / "schema_manifest.json"), "schema_sync_schemas": ["sync_test"]}
+    )
+    vn.connect_to_postgres(**postgres_database)
+    yield vn
+    vn.close()
+    execute(postgres_database, "DROP SCHEMA sync_test CASCADE")
+
+
+def test_only_changed_tables_are_synced(vn, postgres_database):
+    execute(postgres_database, "CREATE TABLE sync_test.clientes (id int PRIMARY KEY, nome text)")
+    execute(postgres_database, "CREATE TABLE sync_test.compras (id int PRIMARY KEY, valor numeric)")
+
+    assert vn.sync_schema()["added"] == ["sync_test.clientes", "sync_test.compras"]
+    assert sorted(vn.upserted) == ["sync_test.clientes", "sync_test.compras"]
+
+    vn.upserted.clear()
+    execute(postgres_database, "COMMENT ON COLUMN sync_test.compras.valor IS 'Valor em reais'")
+    result = vn.sync_schema()
+
+    assert result == {"added": [], "altered": ["sync_test.compras"], "dropped": [], "unchanged": 1}
+    assert vn.upserted == ["sync_test.compras"]
+    assert vn._client.deleted == [["sync_test.compras"]]
+
+
+def test_dropping_the_last_table_removes_its_documentation(vn, postgres_database):
+    execute(postgres_database, "CREATE TABLE sync_test.vendedor (id int PRIMARY KEY)")
+    vn.sync_schema()
+
+    execute(postgres_database, "DROP TABLE sync_test.vendedor")
+    result = vn.sync_schema()
+
+    assert result["dropped"] == ["sync_test.vendedor"]
+    assert vn._client.deleted == [["sync_test.vendedor"]]
+    assert vn._load_schema_manifest() == {postgres_database["dbname"]: {}}
+    assert vn.sync_schema()["dropped"] == []
+
+
+def test_other_schema_lists_keep_their_tables(vn, postgres_database):
+    execute(postgres_database, "CREATE SCHEMA sync_outro")
+    try:
+        execute(postgres_database, "CREATE TABLE sync_test.clientes (id int PRIMARY KEY)")
+        execute(postgres_database, "CREATE TABLE sync_outro.produtos (id int PRIMARY KEY)")
+
+        assert vn.sync_schema()["added"] == ["sync_test.clientes"]
+        assert vn.sync_schema(["sync_outro"])["added"] == ["sync_outro.produtos"]
+
+        for schemas in (None, ["sync_outro"], ["sync_test", "sync_outro"]):
+            assert vn.sync_schema(schemas)["dropped"] == []
+        assert vn._client.deleted == []
+
+        result = vn.sync_schema(["sync_outro"], full=True)
+        assert result["added"] == ["sync_outro.produtos"]
+        assert vn._client.deleted == [["sync_outro.produtos"]]
+        assert set(vn._load_schema_manifest()[postgres_database["dbname"]]) == {
+            "sync_test.clientes",
+            "sync_outro.produtos",
+        }
+    finally:
+        execute(postgres_database, "DROP SCHEMA sync_outro CASCADE")
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def test_master_does_not_import_the_app_stack():
+    pytest.importorskip("gunicorn")
+
+    # Processo novo: os outros testes já importaram o vanna neste
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, serve; print(sorted(m for m in ('vanna', 'pandas', 'qdrant_client') if m in sys.modules))",
+        ],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,73 @@
+import pytest
+
+from sql_cache import SemanticSQLCache, question_constraints
+
+TOP_5 = "SELECT v.nome, SUM(c.valor_total) FROM vendedor v JOIN compras c USING (id_vendedor) GROUP BY 1 ORDER BY 2 DESC LIMIT 5"
+EMBEDDING = [0.1, 0.7, 0.2, 0.4]
+
+
+@pytest.fixture
+def cache():
+    cache = SemanticSQLCache(threshold=0.95)
+    cache.set(EMBEDDING, "Quais são os 5 vendedores que mais venderam em valor total?", TOP_5)
+    return cache
+
+
+def test_same_constraints_hit(cache):
+    assert cache.get(EMBEDDING, "Quais os 5 vendedores que mais venderam em valor?") == TOP_5
+    assert cache.get(EMBEDDING, "Quais são os cinco vendedores que mais venderam?") == TOP_5
+    assert cache.stats()["hits"] == 2
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "Quais são os 10 vendedores que mais venderam em valor total?",
+        "Quais são os 5 vendedores que menos venderam em valor total?",
+        "Quais são os vendedores que mais venderam em valor total?",
+    ],
+    ids=["top_10", "menos", "no_number"],
+)
+def test_different_constraints_miss(cache, question):
+    # Mesmo embedding: só as constraints separam as perguntas
+    assert cache.get(EMBEDDING, question) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_below_threshold_miss(cache):
+    assert cache.get([0.7, 0.1, 0.4, -0.2], "Quais são os 5 vendedores que mais venderam em valor total?") is None
+
+
+def test_match_skips_entries_with_other_constraints(cache):
+    cache.set([0.1, 0.7, 0.2, 0.3], "Quais são os 10 vendedores que mais venderam em valor total?", "top 10")
+
+    entry, score = cache.match(EMBEDDING, "Top 10 vendedores que mais venderam")
+
+    assert entry["sql"] == "top 10"
+    assert score < 1.0
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("Clientes que gastaram mais de 10.000 reais", "Clientes com gasto acima de 10000 reais"),
+        ("Produtos com ticket maior que 2,5", "Produtos com ticket superior a 2.5"),
+        ("Top cinco produtos mais vendidos", "Os 5 produtos mais vendidos"),
+        ("Vendas dos últimos 7 dias", "Vendas nos ultimos 7 dias"),
+    ],
+)
+def test_equivalent_constraints(a, b):
+    assert question_constraints(a) == question_constraints(b)
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("Estoque maior que 100", "Estoque menor que 100"),
+        ("Vendas dos últimos 7 dias", "Vendas dos últimos 30 dias"),
+        ("Qual foi a primeira compra do cliente?", "Qual foi a última compra do cliente?"),
+    ],
+)
+def test_different_constraints(a, b):
+    assert question_constraints(a) != question_constraints(b)
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import pandas as pd
+from vanna.base import VannaBase
+
+from streaming import StreamingMixin
+
+INTERMEDIATE = "intermediate_sql\n```sql\nSELECT DISTINCT status FROM compras\n```"
+FINAL = "```sql\nSELECT COUNT(*) FROM compras WHERE status = 'pago'\n```"
+
+
+class ScriptedVanna(StreamingMixin):
+    # O mínimo do MyVanna que o generate_sql_stream usa, com as respostas do LLM roteirizadas
+    def __init__(self, responses: list):
+        self.config = {}
+        self.responses = list(responses)
+        self.prompts = []
+        self.executed = []
+
+    def log(self, message: str, title: str = "Info"):
+        pass
+
+    def get_related_context(self, question: str):
+        return SimpleNamespace(question_sql_list=[], ddl_list=["CREATE TABLE compras (status VARCHAR(20))"], doc_list=[])
+
+    def get_sql_prompt(self, initial_prompt, question, question_sql_list, ddl_list, doc_list, **kwargs):
+        self.prompts.append({"question": question, "ddl_list": ddl_list, "doc_list": doc_list})
+        return [{"role": "user", "content": question}]
+
+    def submit_prompt_stream(self, prompt, **kwargs):
+        response = self.responses.pop(0)
+        yield from (response[i : i + 8] for i in range(0, len(response), 8))
+
+    def generate_sql(self, question: str, allow_llm_to_see_data=False, **kwargs):
+        raise AssertionError("generate_sql não pode gerar a primeira resposta de novo")
+
+    def run_sql(self, sql: str, **kwargs) -> pd.DataFrame:
+        self.executed.append(sql)
+        return pd.DataFrame({"status": ["pago", "cancelado", "pendente"]})
+
+    def extract_sql(self, llm_response: str) -> str:
+        return VannaBase.extract_sql(self, llm_response).strip()
+
+
+def test_stream_without_intermediate_sql():
+    vn = ScriptedVanna([FINAL])
+
+    events = list(vn.generate_sql_stream("Quantas compras pagas?"))
+
+    assert "".join(text for event, text in events if event == "token") == FINAL
+    assert events[-1] == ("sql", "SELECT COUNT(*) FROM compras WHERE status = 'pago'")
+
+
+def test_intermediate_sql_reuses_first_response():
+    vn = ScriptedVanna([INTERMEDIATE, FINAL])
+
+    events = list(vn.generate_sql_stream("Quantas compras pagas?", allow_llm_to_see_data=True))
+
+    assert vn.executed == ["SELECT DISTINCT status FROM compras"]
+    assert len(vn.prompts) == 2 and not vn.responses
+    assert "SELECT DISTINCT status FROM compras" in vn.prompts[1]["doc_list"][0]
+    assert "cancelado" in vn.prompts[1]["doc_list"][0]
+    assert vn.prompts[1]["ddl_list"] == vn.prompts[0]["ddl_list"]
+    assert "".join(text for event, text in events if event == "token") == INTERMEDIATE + FINAL
+    assert events[-1] == ("sql", "SELECT COUNT(*) FROM compras WHERE status = 'pago'")
+
+
+def test_intermediate_sql_requires_permission():
+    vn = ScriptedVanna([INTERMEDIATE, FINAL])
+
+    event, text = list(vn.generate_sql_stream("Quantas compras pagas?"))[-1]
+
+    assert event == "sql" and "allow_llm_to_see_data=True" in text
+    assert vn.executed == [] and len(vn.prompts) == 1
+
+
+def test_intermediate_sql_error():
+    vn = ScriptedVanna([INTERMEDIATE, FINAL])
+
+    def run_sql(sql, **kwargs):
+        raise ValueError("relation does not exist")
+
+    vn.run_sql = run_sql
+
+    event, text = list(vn.generate_sql_stream("Quantas compras pagas?", allow_llm_to_see_data=True))[-1]
+
+    assert (event, text) == ("sql", "Error running intermediate SQL: relation does not exist")
+    assert len(vn.prompts) == 1
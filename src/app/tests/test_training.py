@@ -0,0 +1,89 @@
+import pytest
+from vanna.qdrant import Qdrant_VectorStore
+from vanna.utils import deterministic_uuid
+
+from benchmark_e2e import HashEmbeddingQdrantClient
+from training import TrainingMixin
+
+PAIRS = [
+    {"question": "Quantos clientes temos?", "sql": "SELECT COUNT(*) FROM clientes"},
+    {"question": "Quantos produtos temos?", "sql": "SELECT COUNT(*) FROM produtos"},
+    {"question": "Quantos vendedores temos?", "sql": "SELECT COUNT(*) FROM vendedor"},
+]
+DDL = ["CREATE TABLE clientes (id_cliente SERIAL PRIMARY KEY)"]
+
+
+class CorpusVanna(TrainingMixin, Qdrant_VectorStore):
+    # O treinamento e o Qdrant do MyVanna, com embeddings por hash e sem LLM
+    def __init__(self, config=None):
+        TrainingMixin.__init__(self, config=config)
+        Qdrant_VectorStore.__init__(self, config=config)
+        self.changes = 0
+
+    def training_data_changed(self):
+        self.changes += 1
+
+    def log(self, message: str, title: str = "Info"):
+        pass
+
+    def system_message(self, message: str):
+        return message
+
+    def user_message(self, message: str):
+        return message
+
+    def assistant_message(self, message: str):
+        return message
+
+    def submit_prompt(self, prompt, **kwargs) -> str:
+        raise NotImplementedError
+
+
+@pytest.fixture
+def vn():
+    vn = CorpusVanna(config={"client": HashEmbeddingQdrantClient(":memory:")})
+    yield vn
+    vn._client.close()
+
+
+def sql_ids(vn):
+    records, _ = vn._client.scroll(vn.sql_collection_name, limit=100, with_payload=True)
+    return {str(record.id): record.payload for record in records}
+
+
+def pair_id(pair):
+    return deterministic_uuid(f"Question: {pair['question']}\n\nSQL: {pair['sql']}")
+
+
+def test_sync_adds_removes_and_skips_unchanged(vn):
+    assert vn.sync_training(question_sql=PAIRS[:2], ddl=DDL) == {"added": 3, "removed": 0, "unchanged": 0}
+    assert vn.sync_training(question_sql=PAIRS[:2], ddl=DDL) == {"added": 0, "removed": 0, "unchanged": 3}
+    assert vn.changes == 1
+
+    altered = {**PAIRS[1], "sql": "SELECT COUNT(*) FROM produtos WHERE estoque > 0"}
+    result = vn.sync_training(question_sql=[PAIRS[0], altered, PAIRS[2]], ddl=DDL)
+
+    assert result == {"added": 2, "removed": 1, "unchanged": 2}
+    assert set(sql_ids(vn)) == {pair_id(PAIRS[0]), pair_id(altered), pair_id(PAIRS[2])}
+    assert vn.changes == 2
+
+
+def test_sync_keeps_points_outside_the_corpus(vn):
+    vn.sync_training(question_sql=PAIRS[:1])
+    trained = vn.add_question_sql("Qual é o ticket médio?", "SELECT AVG(valor_total) FROM compras")
+
+    assert vn.sync_training(question_sql=[])["removed"] == 1
+    assert set(sql_ids(vn)) == {trained.rsplit("-", 1)[0]}
+
+
+def test_sync_adopts_points_trained_before_it(vn):
+    # vn.train() grava o mesmo id do corpus, mas sem `source`
+    vn.add_question_sql(**PAIRS[0])
+    vn.add_question_sql("Qual é o ticket médio?", "SELECT AVG(valor_total) FROM compras")
+
+    assert vn.sync_training(question_sql=PAIRS[:1]) == {"added": 0, "removed": 0, "unchanged": 1}
+    assert sql_ids(vn)[pair_id(PAIRS[0])]["source"] == "corpus"
+
+    assert vn.sync_training(question_sql=[])["removed"] == 1
+    assert pair_id(PAIRS[0]) not in sql_ids(vn)
+    assert len(sql_ids(vn)) == 1
@@ -0,0 +1,314 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List
+
+from qdrant_client import grpc, models
+from vanna.types import TrainingPlan, TrainingPlanItem
+from vanna.qdrant.qdrant import SCROLL_SIZE
+from vanna.utils import deterministic_uuid
+
+# Marca os pontos criados a partir do corpus, para que a sincronização saiba o que pode remover
+CORPUS_SOURCE = "corpus"
+
+
+class TrainingMixin:
+    """
+    Treinamento em lote para o MyVanna.
+
+    Em vez de um embedding e um upsert por item (como em `vn.train()`), os textos
+    são embedados em lotes grandes e enviados ao Qdrant em upserts agrupados, com
+    um número limitado de escritas em paralelo.
+
+    Config:
+        - train_batch_size: Quantos textos embedar por lote. Padrão: 256.
+        - train_upsert_batch_size: Quantos pontos enviar por upsert. Padrão: 64.
+        - train_concurrency: Máximo de upserts simultâneos. Padrão: 4.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = {}
+
+        self.train_batch_size = config.get("train_batch_size", 256)
+        self.train_upsert_batch_size = config.get("train_upsert_batch_size", 64)
+        self.train_concurrency = config.get("train_concurrency", 4)
+
+    def training_data_changed(self):
+        """
+        Hook chamado sempre que pontos são adicionados ou removidos do Qdrant.
+        Mixins que guardam estado derivado do treinamento (caches) sobrescrevem
+        este método para se invalidar.
+        """
+        pass
+
+    def add_question_sql(self, question: str, sql: str, **kwargs) -> str:
+        id = super().add_question_sql(question, sql, **kwargs)
+        self.training_data_changed()
+        return id
+
+    def add_ddl(self, ddl: str, **kwargs) -> str:
+        id = super().add_ddl(ddl, **kwargs)
+        self.training_data_changed()
+        return id
+
+    def add_documentation(self, documentation: str, **kwargs) -> str:
+        id = super().add_documentation(documentation, **kwargs)
+        self.training_data_changed()
+        return id
+
+    def remove_training_data(self, id: str, **kwargs) -> bool:
+        removed = super().remove_training_data(id, **kwargs)
+        self.training_data_changed()
+        return removed
+
+    def remove_collection(self, collection_name: str) -> bool:
+        removed = super().remove_collection(collection_name)
+        self.training_data_changed()
+        return removed
+
+    def generate_embeddings(self, data: List[str], **kwargs) -> List[List[float]]:
+        embedding_model = self._client._get_or_init_model(
+            model_name=self.fastembed_model
+        )
+        embeddings = embedding_model.embed(data, batch_size=self.train_batch_size)
+
+        return [embedding.tolist() for embedding in embeddings]
+
+    def bulk_train(
+        self,
+        question_sql: list = None,
+        ddl: list = None,
+        documentation: list = None,
+        plan: TrainingPlan = None,
+    ) -> List[str]:
+        """
+        Example:
+        ```python
+        vn.bulk_train(
+            question_sql=[{"question": "Quantos clientes temos?", "sql": "SELECT COUNT(*) FROM clientes"}],
+            ddl=["CREATE TABLE clientes (id_cliente SERIAL PRIMARY KEY)"],
+            plan=vn.get_training_plan_generic(df_information_schema),
+        )
+        ```
+
+        Treina o corpus inteiro de uma vez. Os ids gerados são os mesmos de
+        `vn.train()`, então rodar de novo sobrescreve os pontos em vez de duplicá-los.
+
+        Args:
+            question_sql (list): Lista de dicts com as chaves "question" e "sql".
+            ddl (list): Lista de DDLs.
+            documentation (list): Lista de textos de documentação.
+            plan (TrainingPlan): Plano gerado por `get_training_plan_generic()`.
+
+        Returns:
+            List[str]: Os ids dos itens treinados.
+        """
+        points = self._get_training_points(question_sql, ddl, documentation, plan)
+        total = sum(len(items) for items in points.values())
+        if total == 0:
+            return []
+
+        start = time.perf_counter()
+        ids = self._upsert_training_points(points)
+        self.training_data_changed()
+
+        elapsed = time.perf_counter() - start
+        self.log(
+            title="Treinamento em lote",
+            message=f"{total} itens em {elapsed:.2f}s ({total / elapsed:.1f} itens/s)",
+        )
+
+        return ids
+
+    def sync_training(
+        self,
+        question_sql: list = None,
+        ddl: list = None,
+        documentation: list = None,
+        plan: TrainingPlan = None,
+    ) -> dict:
+        """
+        Example:
+        ```python
+        vn.sync_training(question_sql=corpus.QUESTION_SQL, ddl=corpus.DDL, plan=plan)
+        ```
+
+        Sincroniza o Qdrant com o corpus desejado, embedando apenas o que mudou.
+
+        O id de cada ponto é derivado do hash do seu conteúdo, então o próprio
+        Qdrant funciona como manifesto: itens cujo id já existe são pulados, itens
+        novos ou alterados são embedados e enviados, e itens do corpus que sumiram
+        são removidos. Só são removidos pontos marcados com `source: corpus`; o que
+        foi treinado pela interface ou por `vn.train()` não é tocado. Pontos sem
+        `source` com o mesmo conteúdo de um item do corpus (treinados com
+        `vn.train()` antes da sincronização existir) passam a ser marcados, para
+        saírem do Qdrant quando saírem do corpus.
+
+        Args:
+            question_sql (list): Lista de dicts com as chaves "question" e "sql".
+            ddl (list): Lista de DDLs.
+            documentation (list): Lista de textos de documentação.
+            plan (TrainingPlan): Plano gerado por `get_training_plan_generic()`.
+
+        Returns:
+            dict: Quantidade de itens adicionados, removidos e inalterados.
+        """
+        start = time.perf_counter()
+        points = self._get_training_points(question_sql, ddl, documentation, plan)
+
+        to_add = {}
+        added = removed = unchanged = 0
+
+        for collection_name, items in points.items():
+            existing, managed, untagged = self._get_existing_point_ids(collection_name)
+            desired = {id for id, _, _ in items}
+
+            to_add[collection_name] = [item for item in items if item[0] not in existing]
+            to_remove = list(managed - desired)
+
+            to_tag = list(desired & untagged)
+            if to_tag:
+                self._client.set_payload(
+                    collection_name,
+                    payload={"source": CORPUS_SOURCE},
+                    points=models.PointIdsList(points=to_tag),
+                )
+
+            if to_remove:
+                self._client.delete(
+                    collection_name,
+                    points_selector=models.PointIdsList(points=to_remove),
+                )
+
+            added += len(to_add[collection_name])
+            removed += len(to_remove)
+            unchanged += len(desired & existing)
+
+        if added:
+            self._upsert_training_points(to_add)
+
+        if added or removed:
+            self.training_data_changed()
+
+        elapsed = time.perf_counter() - start
+        self.log(
+            title="Sincronização do treinamento",
+            message=f"{added} adicionados, {removed} removidos, {unchanged} inalterados em {elapsed:.2f}s",
+        )
+
+        return {"added": added, "removed": removed, "unchanged": unchanged}
+
+    def _get_existing_point_ids(self, collection_name: str):
+        # Retorna todos os ids da collection e, separadamente, os que vieram do corpus e os sem `source`
+        existing, managed, untagged = set(), set(), set()
+        next_offset = None
+
+        while True:
+            records, next_offset = self._client.scroll(
+                collection_name,
+                limit=SCROLL_SIZE,
+                offset=next_offset,
+                with_payload=["source"],
+                with_vectors=False,
+            )
+
+            for record in records:
+                existing.add(str(record.id))
+                source = (record.payload or {}).get("source")
+                if source == CORPUS_SOURCE:
+                    managed.add(str(record.id))
+                elif source is None:
+                    untagged.add(str(record.id))
+
+            if next_offset is None or (
+                isinstance(next_offset, grpc.PointId)
+                and next_offset.num == 0
+                and next_offset.uuid == ""
+            ):
+                break
+
+        return existing, managed, untagged
+
+    def _upsert_training_points(self, points: dict) -> List[str]:
+        ids = []
+
+        with ThreadPoolExecutor(max_workers=self.train_concurrency) as executor:
+            pending = set()
+
+            for collection_name, items in points.items():
+                for i in range(0, len(items), self.train_batch_size):
+                    batch = items[i:i + self.train_batch_size]
+                    vectors = self.generate_embeddings([text for _, text, _ in batch])
+
+                    for j in range(0, len(batch), self.train_upsert_batch_size):
+                        chunk = [
+                            models.PointStruct(id=id, vector=vector, payload=payload)
+                            for (id, _, payload), vector in zip(
+                                batch[j:j + self.train_upsert_batch_size],
+                                vectors[j:j + self.train_upsert_batch_size],
+                            )
+                        ]
+
+                        # Limita as escritas em andamento para não acumular lotes na memória
+                        if len(pending) >= self.train_concurrency * 2:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                future.result()
+
+                        pending.add(
+                            executor.submit(
+                                self._client.upsert, collection_name, points=chunk
+                            )
+                        )
+
+                    ids.extend(
+                        self._format_point_id(id, collection_name) for id, _, _ in batch
+                    )
+
+            for future in pending:
+                future.result()
+
+        return ids
+
+    def _get_training_points(self, question_sql, ddl, documentation, plan) -> dict:
+        # Cada item vira (id, texto a embedar, payload), no mesmo formato do Qdrant_VectorStore
+        points = {
+            self.sql_collection_name: [],
+            self.ddl_collection_name: [],
+            self.documentation_collection_name: [],
+        }
+
+        question_sql = list(question_sql or [])
+        ddl = list(ddl or [])
+        documentation = list(documentation or [])
+
+        if plan:
+            for item in plan._plan:
+                if item.item_type == TrainingPlanItem.ITEM_TYPE_DDL:
+                    ddl.append(item.item_value)
+                elif item.item_type == TrainingPlanItem.ITEM_TYPE_IS:
+                    documentation.append(item.item_value)
+                elif item.item_type == TrainingPlanItem.ITEM_TYPE_SQL:
+                    question_sql.append({"question": item.item_name, "sql": item.item_value})
+
+        for pair in question_sql:
+            question_answer = "Question: {0}\n\nSQL: {1}".format(pair["question"], pair["sql"])
+            points[self.sql_collection_name].append(
+                (
+                    deterministic_uuid(question_answer),
+                    question_answer,
+                    {"question": pair["question"], "sql": pair["sql"], "source": CORPUS_SOURCE},
+                )
+            )
+
+        for statement in ddl:
+            points[self.ddl_collection_name].append(
+                (deterministic_uuid(statement), statement, {"ddl": statement, "source": CORPUS_SOURCE})
+            )
+
+        for doc in documentation:
+            points[self.documentation_collection_name].append(
+                (deterministic_uuid(doc), doc, {"documentation": doc, "source": CORPUS_SOURCE})
+            )
+
+        return points
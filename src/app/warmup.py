@@ -0,0 +1,112 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """
+    Tempo de cada fase da inicialização, do import dos módulos até o app estar
+    pronto para a primeira pergunta.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.failed = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def total(self) -> float:
+        return time.perf_counter() - self._start
+
+    def report(self) -> str:
+        phases = ", ".join(
+            f"{name} {seconds:.2f}s" + (" (falhou)" if name in self.failed else "")
+            for name, seconds in self.phases.items()
+        )
+        return f"Pronto em {self.total():.2f}s: {phases}"
+
+
+class WarmupMixin:
+    """
+    Aquece o que deixaria a primeira pergunta lenta: o modelo do Ollama é
+    carregado na memória (com as mesmas `options` das gerações, para o Ollama não
+    recarregá-lo com outro `num_ctx`, e o `keep_alive` configurado), o modelo de
+    embedding é inicializado, cada collection do Qdrant recebe uma busca e, se
+    houver banco conectado, uma conexão do pool é usada.
+
+    A carga do modelo no Ollama, que é a fase mais longa, roda em paralelo com as
+    demais. Uma fase que falha é registrada no log e não impede as outras.
+    """
+
+    def warm_up(self, timer: StartupTimer = None) -> StartupTimer:
+        """
+        Example:
+        ```python
+        vn = MyVanna()
+        vn.warm_up()
+        ```
+
+        Aquece o Ollama, o modelo de embedding, o Qdrant e o banco.
+
+        Args:
+            timer (StartupTimer): Onde registrar o tempo de cada fase, junto com as
+              fases anteriores da inicialização. Padrão: um novo.
+
+        Returns:
+            StartupTimer: O tempo de cada fase.
+        """
+        timer = timer or StartupTimer()
+
+        ollama = threading.Thread(
+            target=self._warm_up_phase, args=(timer, "ollama", self._warm_up_ollama), name="warmup-ollama"
+        )
+        ollama.start()
+
+        embedding = self._warm_up_phase(timer, "embedding", self._warm_up_embedding)
+        if embedding is not None:
+            self._warm_up_phase(timer, "qdrant", lambda: self._warm_up_qdrant(embedding))
+        if self.pg_pool is not None:
+            self._warm_up_phase(timer, "database", self._warm_up_database)
+
+        ollama.join()
+        return timer
+
+    def _warm_up_phase(self, timer: StartupTimer, name: str, fn):
+        with timer.phase(name):
+            try:
+                return fn()
+            except Exception as e:
+                timer.failed.append(name)
+                self.log(title="Aquecimento", message=f"Falha ao aquecer {name}: {e}")
+                return None
+
+    def _warm_up_ollama(self):
+        # Sem prompt, o Ollama só carrega o modelo e o mantém pelo keep_alive
+        self.ollama_client.generate(
+            model=self.model, prompt="", options=self.ollama_options, keep_alive=self.keep_alive
+        )
+
+    def _warm_up_embedding(self) -> list:
+        # Direto no modelo: pelo cache de embeddings o modelo poderia nem ser carregado
+        embedding_model = self._client._get_or_init_model(model_name=self.fastembed_model)
+        return next(iter(embedding_model.embed(["aquecimento"]))).tolist()
+
+    def _warm_up_qdrant(self, embedding: list):
+        for collection_name in (
+            self.sql_collection_name,
+            self.ddl_collection_name,
+            self.documentation_collection_name,
+        ):
+            self._search_collection(collection_name, embedding)
+
+    def _warm_up_database(self):
+        with self.pg_connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute("SELECT 1")